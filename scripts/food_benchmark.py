@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Generator and Pipeline Benchmarks
+Times the stages every build goes through, at 200 / 10k / 1M foods:
+- generate:  TaiwanHKFoodGenerator.generate_complete_database(), topped up
+             with seeded synthetic foods past the 209 built-in items;
+- serialize: the json.dump(..., indent=2) that main() writes the database with;
+- load:      json.load() of that file, as clients and scripts read data/*.json;
+- load-data: json.load() of every data/*.json file in the repo, once.
+
+Each (stage, size) runs in its own child process so peak RSS belongs to
+that stage alone. Wall time is the best of a few untraced runs; a separate
+run under tracemalloc records peak and retained Python allocations.
+Results are written as JSON and compared against a stored baseline: any
+stage slower or hungrier than the baseline plus tolerance fails the run.
+"""
+
+import argparse
+import gc
+import glob
+import importlib.util
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPTS_DIR, '..', 'data')
+BENCHMARK_DIR = os.path.join(SCRIPTS_DIR, 'benchmarks')
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+DEFAULT_RESULTS = os.path.join(BENCHMARK_DIR, 'latest.json')
+
+DEFAULT_SIZES = "200,10k,1m"
+SIZED_STAGES = ("generate", "serialize", "load")
+DATA_STAGE = "load-data"
+SEED = 42
+# Small stages are repeated and the best run kept; large ones run once
+REPEAT_BELOW = 100000
+REPEATS = 5
+TIME_TOLERANCE = 0.30
+MEMORY_TOLERANCE = 0.15
+# Differences below these are noise whatever the ratio
+TIME_SLACK_SECONDS = 0.01
+MEMORY_SLACK_BYTES = 4 * 1024 * 1024
+
+def parse_size(text: str) -> int:
+    """200, 10k, 1m -> item count"""
+    text = text.strip().lower()
+    for suffix, factor in (("k", 1000), ("m", 1000000)):
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * factor)
+    return int(text)
+
+def size_label(size: Optional[int]) -> str:
+    if size is None:
+        return "data"
+    if size >= 1000000 and size % 1000000 == 0:
+        return f"{size // 1000000}m"
+    if size >= 1000 and size % 1000 == 0:
+        return f"{size // 1000}k"
+    return str(size)
+
+_generator_class = None
+
+def generator_class():
+    """TaiwanHKFoodGenerator, loaded once by path since generate-food-database.py is not an importable name"""
+    global _generator_class
+    if _generator_class is None:
+        spec = importlib.util.spec_from_file_location(
+            "generate_food_database", os.path.join(SCRIPTS_DIR, "generate-food-database.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _generator_class = module.TaiwanHKFoodGenerator
+    return _generator_class
+
+def builtin_count() -> int:
+    return sum(1 for _ in generator_class()().iter_foods())
+
+def build_database(size: int, builtin: int) -> Dict[str, Any]:
+    """The built-in catalog, topped up with synthetic foods to ``size`` items"""
+    generator = generator_class()()
+    if size > builtin:
+        generator.add_synthetic_foods(size - builtin, SEED)
+    return generator.generate_complete_database()
+
+def database_path(workdir: str, size: int) -> str:
+    return os.path.join(workdir, f"foods-{size_label(size)}.json")
+
+def _serialize(database: Dict[str, Any], path: str):
+    # Exactly what main() does for the JSON format
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(database, f, ensure_ascii=False, indent=2)
+
+def _load(paths: List[str]) -> int:
+    loaded = 0
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            json.load(f)
+        loaded += 1
+    return loaded
+
+def setup_stage(stage: str, size: Optional[int], workdir: str) -> Tuple[Callable[[], Any], Dict[str, Any]]:
+    """Untimed preparation; returns the callable to measure plus facts about its input"""
+    if stage in ("generate", "serialize"):
+        builtin = builtin_count()
+    if stage == "generate":
+        return (lambda: build_database(size, builtin)), {"items": max(size, builtin)}
+    if stage == "serialize":
+        database = build_database(size, builtin)
+        path = database_path(workdir, size)
+        return (lambda: _serialize(database, path)), {"items": len(database["foods"])}
+    if stage == "load":
+        path = database_path(workdir, size)
+        if not os.path.exists(path):
+            _serialize(build_database(size, builtin_count()), path)
+        return (lambda: _load([path])), {"bytes": os.path.getsize(path)}
+    if stage == DATA_STAGE:
+        paths = sorted(glob.glob(os.path.join(DATA_DIR, "*.json")))
+        return (lambda: _load(paths)), {"files": len(paths), "bytes": sum(os.path.getsize(p) for p in paths)}
+    raise ValueError(f"unknown stage {stage!r}")
+
+def measure(stage: str, size: Optional[int], workdir: str, trace: bool = True) -> Dict[str, Any]:
+    """Run one stage in this process; meant to be called in a fresh child"""
+    run, facts = setup_stage(stage, size, workdir)
+    gc.collect()
+    rss_setup = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    repeats = REPEATS if size is None or size < REPEAT_BELOW else 1
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = run()
+        timings.append(time.perf_counter() - started)
+        del result
+        gc.collect()
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    record = {
+        "stage": stage,
+        "size": size_label(size),
+        **facts,
+        "seconds": round(min(timings), 6),
+        "runs": repeats,
+        "rss_setup_bytes": rss_setup,
+        "rss_peak_bytes": rss_peak,
+    }
+    if size:
+        record["items_per_second"] = round(size / max(min(timings), 1e-9), 1)
+    if trace:
+        tracemalloc.start()
+        result = run()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        record["alloc_peak_bytes"] = peak
+        record["alloc_retained_bytes"] = current
+    return record
+
+def run_child(stage: str, size: Optional[int], workdir: str, trace: bool) -> Dict[str, Any]:
+    command = [sys.executable, os.path.abspath(__file__), "--child", stage, size_label(size), "--workdir", workdir]
+    if not trace:
+        command.append("--no-tracemalloc")
+    completed = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def machine_info() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any],
+            time_tolerance: float = TIME_TOLERANCE, memory_tolerance: float = MEMORY_TOLERANCE) -> List[str]:
+    """Regressions of ``results`` against ``baseline`` as messages; empty when within tolerance"""
+    previous = {(record["stage"], record["size"]): record for record in baseline.get("results", [])}
+    checks = [
+        ("seconds", time_tolerance, TIME_SLACK_SECONDS),
+        ("rss_peak_bytes", memory_tolerance, MEMORY_SLACK_BYTES),
+        ("alloc_peak_bytes", memory_tolerance, MEMORY_SLACK_BYTES),
+    ]
+    regressions = []
+    for record in results["results"]:
+        before = previous.get((record["stage"], record["size"]))
+        if before is None:
+            continue
+        for metric, tolerance, slack in checks:
+            if metric not in record or metric not in before:
+                continue
+            limit = before[metric] * (1 + tolerance) + slack
+            if record[metric] > limit:
+                regressions.append(
+                    f"{record['stage']}@{record['size']} {metric}: {_format_metric(metric, record[metric])} vs "
+                    f"baseline {_format_metric(metric, before[metric])} (+{record[metric] / max(before[metric], 1e-9) - 1:.0%})")
+    return regressions
+
+def _format_metric(metric: str, value: float) -> str:
+    if metric == "seconds":
+        return f"{value:.3f}s" if value >= 0.01 else f"{value * 1000:.2f}ms"
+    return f"{value / 1024 / 1024:.1f}MiB"
+
+def format_results(results: Dict[str, Any]) -> List[str]:
+    lines = [f"   {'stage':<10} {'size':>5} {'time':>10} {'items/s':>12} {'RSS peak':>10} {'alloc peak':>11}"]
+    for record in results["results"]:
+        rate = f"{record['items_per_second']:,.0f}" if "items_per_second" in record else ""
+        alloc = _format_metric("bytes", record["alloc_peak_bytes"]) if "alloc_peak_bytes" in record else ""
+        lines.append(f"   {record['stage']:<10} {record['size']:>5} {_format_metric('seconds', record['seconds']):>10} "
+                     f"{rate:>12} {_format_metric('bytes', record['rss_peak_bytes']):>10} {alloc:>11}")
+    return lines
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark food generation, serialization and loading")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma-separated item counts (default: {DEFAULT_SIZES})")
+    parser.add_argument("--stages", default=",".join(SIZED_STAGES + (DATA_STAGE,)),
+                        help="comma-separated stages to run (default: all)")
+    parser.add_argument("--output", default=DEFAULT_RESULTS, help="machine-readable results JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE,
+                        help=f"allowed slowdown before failing (default: {TIME_TOLERANCE:.0%})")
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE,
+                        help=f"allowed RSS/allocation growth before failing (default: {MEMORY_TOLERANCE:.0%})")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="skip the allocation-tracing run")
+    parser.add_argument("--workdir", help="scratch directory for serialized databases (default: a temp dir)")
+    parser.add_argument("--child", nargs=2, metavar=("STAGE", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    trace = not args.no_tracemalloc
+
+    if args.child:
+        stage, size = args.child
+        print(json.dumps(measure(stage, None if size == "data" else parse_size(size), args.workdir, trace)))
+        return 0
+
+    sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in SIZED_STAGES + (DATA_STAGE,)]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    started = time.perf_counter()
+    records = []
+    with tempfile.TemporaryDirectory(prefix="diet-daily-bench-") as scratch:
+        workdir = args.workdir or scratch
+        plan = [(stage, size) for size in sizes for stage in SIZED_STAGES if stage in stages]
+        if DATA_STAGE in stages:
+            plan.append((DATA_STAGE, None))
+        for stage, size in plan:
+            print(f"⏱️  {stage} @ {size_label(size)}...", flush=True)
+            records.append(run_child(stage, size, workdir, trace))
+
+    results = {
+        "created": datetime.now().isoformat(),
+        "machine": machine_info(),
+        "tracemalloc": trace,
+        "seconds": round(time.perf_counter() - started, 2),
+        "results": records,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print(f"\n📊 Benchmark results ({results['seconds']:.1f}s): {args.output}")
+    for line in format_results(results):
+        print(line)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"📌 Baseline updated: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"⚠️  No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get("machine") != results["machine"]:
+        print(f"⚠️  Baseline was recorded on {baseline.get('machine', {}).get('platform')} "
+              f"({baseline.get('machine', {}).get('cpus')} CPUs); timings may not be comparable")
+    regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regressions against {args.baseline}:")
+        for line in regressions:
+            print(f"   {line}")
+        return 1
+    print(f"✅ No regressions against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Binary Food Database
+Memory-mappable export of the food database: a fixed-width record table, a
+deduplicated UTF-8 string heap and an open-addressing id -> record hash
+index. Readers mmap the file and decode single fields on access, so startup
+parses nothing and a lookup by food id costs the same at any catalog size.
+
+Layout (little-endian):
+    header    HEADER_FORMAT, padded to HEADER_SIZE bytes
+    records   record_count x RECORD_FORMAT
+    heap      UTF-8 strings referenced by (offset, length) pairs; list
+              fields hold a compact JSON array of strings
+    index     index_slots x SLOT_FORMAT: (id hash, record number)
+"""
+
+import hashlib
+import json
+import mmap
+import struct
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+MAGIC = b"DDFB"
+FORMAT_VERSION = 2
+
+HEADER_FORMAT = "<4sHHIIQQQQI"
+HEADER_SIZE = 64
+
+# String/list reference fields, in record order
+REF_FIELDS = [
+    "id", "name_zh", "name_en", "category", "chemo_safety", "fodmap_level",
+    "created", "seasonal", "ibd_risk_factors", "major_allergens",
+    "cooking_methods", "alternatives", "extra",
+]
+LIST_REF_FIELDS = {"ibd_risk_factors", "major_allergens", "cooking_methods", "alternatives"}
+RECORD_FORMAT = "<" + "II" * len(REF_FIELDS) + "hBB"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+SLOT_FORMAT = "<QII"
+SLOT_SIZE = struct.calcsize(SLOT_FORMAT)
+
+# Reference to a missing value / missing ibd_score
+NULL_LENGTH = 0xFFFFFFFF
+NO_SCORE = -32768
+
+FLAG_TAIWAN = 1
+FLAG_HONG_KONG = 2
+FLAG_VALIDATED = 4
+
+KNOWN_KEYS = {"id", "name_zh", "name_en", "category", "medical_scores", "availability",
+              "cooking_methods", "alternatives", "created", "medical_validated"}
+KNOWN_SCORE_KEYS = {"ibd_score", "ibd_risk_factors", "chemo_safety", "major_allergens", "fodmap_level"}
+KNOWN_AVAILABILITY_KEYS = {"taiwan", "hong_kong", "seasonal"}
+
+def id_hash(food_id: str) -> int:
+    """Stable 64-bit hash of a food id; never 0, which marks an empty slot"""
+    digest = hashlib.blake2b(food_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+class _StringHeap:
+    """Deduplicating UTF-8 heap"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.refs: Dict[str, Tuple[int, int]] = {}
+
+    def add(self, value: Optional[str]) -> Tuple[int, int]:
+        if value is None:
+            return (0, NULL_LENGTH)
+        ref = self.refs.get(value)
+        if ref is None:
+            encoded = value.encode("utf-8")
+            ref = (len(self.data), len(encoded))
+            self.data += encoded
+            self.refs[value] = ref
+        return ref
+
+def _extra_fields(food: Dict[str, Any]) -> Optional[str]:
+    """Anything outside the generator schema, kept as a JSON blob decoded on access"""
+    extra = {key: value for key, value in food.items() if key not in KNOWN_KEYS}
+    scores = food.get("medical_scores") or {}
+    score_extra = {key: value for key, value in scores.items() if key not in KNOWN_SCORE_KEYS}
+    if score_extra:
+        extra["medical_scores"] = score_extra
+    availability = food.get("availability") or {}
+    availability_extra = {key: value for key, value in availability.items() if key not in KNOWN_AVAILABILITY_KEYS}
+    if availability_extra:
+        extra["availability"] = availability_extra
+    if not extra:
+        return None
+    return json.dumps(extra, ensure_ascii=False, separators=(",", ":"))
+
+def _list_value(values: Any) -> Optional[str]:
+    if values is None:
+        return None
+    # JSON rather than a separator byte: items may contain any character, and [] differs from [""]
+    return json.dumps([str(value) for value in values], ensure_ascii=False, separators=(",", ":"))
+
+def write_food_binary(foods: Iterable[Dict[str, Any]], path: str) -> int:
+    """Write foods to the binary format and return the record count"""
+    heap = _StringHeap()
+    records = bytearray()
+    ids: List[str] = []
+
+    for food in foods:
+        scores = food.get("medical_scores") or {}
+        availability = food.get("availability") or {}
+        food_id = str(food.get("id"))
+        ids.append(food_id)
+        seasonal = availability.get("seasonal")
+        values = {
+            "id": food_id,
+            "name_zh": food.get("name_zh"),
+            "name_en": food.get("name_en"),
+            "category": food.get("category"),
+            "chemo_safety": scores.get("chemo_safety"),
+            "fodmap_level": scores.get("fodmap_level"),
+            "created": food.get("created"),
+            "seasonal": None if seasonal is None else str(seasonal),
+            "ibd_risk_factors": _list_value(scores.get("ibd_risk_factors")),
+            "major_allergens": _list_value(scores.get("major_allergens")),
+            "cooking_methods": _list_value(food.get("cooking_methods")),
+            "alternatives": _list_value(food.get("alternatives")),
+            "extra": _extra_fields(food),
+        }
+        refs: List[int] = []
+        for field in REF_FIELDS:
+            refs.extend(heap.add(values[field]))
+        ibd_score = scores.get("ibd_score")
+        flags = (
+            (FLAG_TAIWAN if availability.get("taiwan") else 0)
+            | (FLAG_HONG_KONG if availability.get("hong_kong") else 0)
+            | (FLAG_VALIDATED if food.get("medical_validated") else 0)
+        )
+        records += struct.pack(RECORD_FORMAT, *refs,
+                               NO_SCORE if ibd_score is None else int(ibd_score), flags, 0)
+
+    # Open addressing with linear probing at load factor <= 0.5
+    slots = 1
+    while slots < max(2 * len(ids), 8):
+        slots <<= 1
+    table = [None] * slots
+    for record_number, food_id in enumerate(ids):
+        hashed = id_hash(food_id)
+        slot = hashed & (slots - 1)
+        while table[slot] is not None:
+            slot = (slot + 1) & (slots - 1)
+        table[slot] = (hashed, record_number)
+    index = bytearray()
+    for entry in table:
+        hashed, record_number = entry if entry is not None else (0, 0)
+        index += struct.pack(SLOT_FORMAT, hashed, record_number, 0)
+
+    records_offset = HEADER_SIZE
+    heap_offset = records_offset + len(records)
+    index_offset = heap_offset + len(heap.data)
+    header = struct.pack(HEADER_FORMAT, MAGIC, FORMAT_VERSION, 0, len(ids), RECORD_SIZE,
+                         records_offset, heap_offset, len(heap.data), index_offset, slots)
+    with open(path, 'wb') as f:
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        f.write(records)
+        f.write(heap.data)
+        f.write(index)
+    return len(ids)
+
+class FoodRecordView:
+    """Lazy view of one record; fields are decoded from the mapping on access"""
+
+    __slots__ = ("_reader", "_offset")
+
+    def __init__(self, reader: "FoodBinaryReader", offset: int):
+        self._reader = reader
+        self._offset = offset
+
+    def _ref(self, field: str) -> Optional[str]:
+        position = self._offset + _REF_POSITIONS[field]
+        start, length = struct.unpack_from("<II", self._reader._map, position)
+        return self._reader._string(start, length)
+
+    def _list(self, field: str) -> Optional[List[str]]:
+        value = self._ref(field)
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def _tail(self) -> Tuple[int, int]:
+        ibd_score, flags, _ = struct.unpack_from("<hBB", self._reader._map, self._offset + _TAIL_POSITION)
+        return ibd_score, flags
+
+    @property
+    def id(self) -> str:
+        return self._ref("id")
+
+    @property
+    def name_zh(self) -> Optional[str]:
+        return self._ref("name_zh")
+
+    @property
+    def name_en(self) -> Optional[str]:
+        return self._ref("name_en")
+
+    @property
+    def category(self) -> Optional[str]:
+        return self._ref("category")
+
+    @property
+    def chemo_safety(self) -> Optional[str]:
+        return self._ref("chemo_safety")
+
+    @property
+    def fodmap_level(self) -> Optional[str]:
+        return self._ref("fodmap_level")
+
+    @property
+    def created(self) -> Optional[str]:
+        return self._ref("created")
+
+    @property
+    def ibd_score(self) -> Optional[int]:
+        score = self._tail()[0]
+        return None if score == NO_SCORE else score
+
+    @property
+    def ibd_risk_factors(self) -> Optional[List[str]]:
+        return self._list("ibd_risk_factors")
+
+    @property
+    def major_allergens(self) -> Optional[List[str]]:
+        return self._list("major_allergens")
+
+    @property
+    def cooking_methods(self) -> Optional[List[str]]:
+        return self._list("cooking_methods")
+
+    @property
+    def alternatives(self) -> Optional[List[str]]:
+        return self._list("alternatives")
+
+    @property
+    def taiwan(self) -> bool:
+        return bool(self._tail()[1] & FLAG_TAIWAN)
+
+    @property
+    def hong_kong(self) -> bool:
+        return bool(self._tail()[1] & FLAG_HONG_KONG)
+
+    @property
+    def medical_validated(self) -> bool:
+        return bool(self._tail()[1] & FLAG_VALIDATED)
+
+    @property
+    def extra(self) -> Dict[str, Any]:
+        blob = self._ref("extra")
+        return json.loads(blob) if blob else {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Decode the whole record into the generator's dict shape"""
+        extra = self.extra
+        medical_scores = {
+            key: value for key, value in (
+                ("ibd_score", self.ibd_score),
+                ("ibd_risk_factors", self.ibd_risk_factors),
+                ("chemo_safety", self.chemo_safety),
+                ("major_allergens", self.major_allergens),
+                ("fodmap_level", self.fodmap_level),
+            ) if value is not None
+        }
+        medical_scores.update(extra.pop("medical_scores", {}))
+        availability = {"taiwan": self.taiwan, "hong_kong": self.hong_kong, "seasonal": self._ref("seasonal")}
+        availability.update(extra.pop("availability", {}))
+        food = {
+            "id": self.id,
+            "name_zh": self.name_zh,
+            "name_en": self.name_en,
+            "category": self.category,
+            "medical_scores": medical_scores,
+            "availability": availability,
+            "cooking_methods": self.cooking_methods,
+            "alternatives": self.alternatives,
+            "created": self.created,
+            "medical_validated": self.medical_validated,
+        }
+        food.update(extra)
+        return food
+
+_REF_POSITIONS = {field: 8 * i for i, field in enumerate(REF_FIELDS)}
+_TAIL_POSITION = 8 * len(REF_FIELDS)
+
+class FoodBinaryReader:
+    """mmap-backed reader; use as a context manager or call close()"""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, self.record_count, self.record_size, self.records_offset,
+         self.heap_offset, self.heap_size, self.index_offset, self.index_slots) = \
+            struct.unpack_from(HEADER_FORMAT, self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a Diet Daily binary food database")
+        if version != FORMAT_VERSION or self.record_size != RECORD_SIZE:
+            self.close()
+            raise ValueError(f"{path} uses unsupported format version {version}")
+
+    def __enter__(self) -> "FoodBinaryReader":
+        return self
+
+    def __exit__(self, *exc_info: Any):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self.record_count
+
+    def __iter__(self) -> Iterator[FoodRecordView]:
+        for record_number in range(self.record_count):
+            yield self.record(record_number)
+
+    def _string(self, start: int, length: int) -> Optional[str]:
+        if length == NULL_LENGTH:
+            return None
+        position = self.heap_offset + start
+        return self._map[position:position + length].decode("utf-8")
+
+    def record(self, record_number: int) -> FoodRecordView:
+        if not 0 <= record_number < self.record_count:
+            raise IndexError(record_number)
+        return FoodRecordView(self, self.records_offset + record_number * self.record_size)
+
+    def get(self, food_id: str) -> Optional[FoodRecordView]:
+        """O(1) lookup by food id"""
+        hashed = id_hash(food_id)
+        mask = self.index_slots - 1
+        slot = hashed & mask
+        encoded = food_id.encode("utf-8")
+        while True:
+            slot_hash, record_number, _ = struct.unpack_from(SLOT_FORMAT, self._map, self.index_offset + slot * SLOT_SIZE)
+            if slot_hash == 0:
+                return None
+            if slot_hash == hashed:
+                view = self.record(record_number)
+                start, length = struct.unpack_from("<II", self._map, view._offset)
+                position = self.heap_offset + start
+                if self._map[position:position + length] == encoded:
+                    return view
+            slot = (slot + 1) & mask
+
+    def __contains__(self, food_id: str) -> bool:
+        return self.get(food_id) is not None
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - PostgreSQL COPY Export
+Writes the catalog and user food history as chunked COPY ... FROM STDIN
+files for diet_daily_foods and food_entries (supabase/schema.sql column
+layout), plus a load.sql that streams every chunk through psql's \\copy.
+Chunks hold disjoint rows and each is one self-contained \\copy line in
+load.sql, so ``psql "$DB" -f seed/load.sql`` loads serially and the lines
+of one table can be split across psql sessions to load in parallel
+(diet_daily_foods before food_entries, which references it).
+
+Ids that are not UUIDs (af_001, demo-user) are mapped to stable uuid5
+values so foreign keys between the two tables still line up. Rows with an
+id already written are skipped: COPY cannot upsert. An entry whose
+food_id is not among the exported foods (e.g. a history recorded against
+an older catalog) is written with a NULL food_id, keeping its food_name,
+and counted in the manifest. food_entries.user_id references
+diet_daily_users, so those users must exist before loading.
+
+Run this module directly to validate a directory of chunks without a
+database:
+
+    python scripts/food_copy.py seed/
+"""
+
+import csv
+import io
+import json
+import os
+import re
+import sys
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from food_sqlite import ENTRY_COLUMNS, FOOD_COLUMNS, entry_row, food_row
+
+COPY_FORMATS = ["text", "csv"]
+DEFAULT_CHUNK_ROWS = 100000
+COPY_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "copy.diet-daily")
+
+# Postgres column types for the exported columns; everything else is TEXT
+COLUMN_TYPES = {
+    "diet_daily_foods": {
+        "id": "uuid",
+        "calories": "numeric", "protein": "numeric", "carbohydrates": "numeric", "fat": "numeric",
+        "fiber": "numeric", "sugar": "numeric", "sodium": "numeric",
+        "nutrition_data": "jsonb", "medical_scores": "jsonb", "allergens": "jsonb",
+        "tags": "jsonb", "properties": "jsonb",
+        "is_custom": "boolean",
+        "created_at": "timestamptz", "updated_at": "timestamptz",
+    },
+    "food_entries": {
+        "id": "uuid", "user_id": "uuid", "food_id": "uuid",
+        "amount": "numeric", "calories": "numeric", "medical_score": "numeric", "symptom_severity": "numeric",
+        "nutrition_data": "jsonb", "medical_analysis": "jsonb", "symptoms_before": "jsonb", "symptoms_after": "jsonb",
+        "consumed_at": "timestamptz",
+        "created_at": "timestamptz", "updated_at": "timestamptz",
+    },
+}
+TABLE_COLUMNS = {"diet_daily_foods": FOOD_COLUMNS, "food_entries": ENTRY_COLUMNS}
+NOT_NULL = {
+    "diet_daily_foods": {"id", "name", "category"},
+    "food_entries": {"id", "user_id", "food_name", "consumed_at"},
+}
+# Foreign keys checked within the export; user_id -> diet_daily_users is not exported
+FOREIGN_KEYS = {
+    "food_entries": {"food_id": "diet_daily_foods"},
+}
+CHECKS = {
+    "diet_daily_foods": {"verification_status": {"pending", "approved", "rejected"}},
+    "food_entries": {
+        "meal_type": {"breakfast", "lunch", "dinner", "snack"},
+        "sync_status": {"pending", "synced", "error"},
+    },
+}
+
+_TEXT_ESCAPES = {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"}
+_TEXT_SPECIAL = re.compile(r"[\\\t\n\r]")
+_TEXT_UNESCAPE = re.compile(r"\\(.)")
+_UNESCAPED = {"t": "\t", "n": "\n", "r": "\r", "b": "\b", "f": "\f", "v": "\v", "\\": "\\"}
+
+def pg_uuid(value: Any) -> Optional[str]:
+    """UUIDs pass through; any other id maps to a stable uuid5"""
+    if value is None:
+        return None
+    text = str(value)
+    try:
+        return str(uuid.UUID(text))
+    except ValueError:
+        return str(uuid.uuid5(COPY_ID_NAMESPACE, text))
+
+def copy_text_field(value: Optional[str]) -> str:
+    """One field in COPY text format: \\N for NULL, backslash escapes for the rest"""
+    if value is None:
+        return "\\N"
+    if _TEXT_SPECIAL.search(value):
+        return _TEXT_SPECIAL.sub(lambda match: _TEXT_ESCAPES[match.group()], value)
+    return value
+
+def copy_statement(table: str, columns: List[str], copy_format: str, source: str = "STDIN") -> str:
+    options = "FORMAT csv" if copy_format == "csv" else "FORMAT text"
+    return f"COPY {table} ({', '.join(columns)}) FROM {source} WITH ({options})"
+
+class CopyTableWriter:
+    """Writes one table's rows into COPY chunk files of at most chunk_rows rows"""
+
+    def __init__(self, directory: str, table: str, copy_format: str = "text", chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                 now: Optional[str] = None, references: Optional[Dict[str, set]] = None):
+        if copy_format not in COPY_FORMATS:
+            raise ValueError(f"copy format must be one of {COPY_FORMATS}")
+        self.directory = directory
+        self.table = table
+        self.columns = TABLE_COLUMNS[table]
+        self.copy_format = copy_format
+        self.chunk_rows = chunk_rows
+        self.now = now or datetime.now().isoformat()
+        self.files: List[Dict[str, Any]] = []
+        self.rows = 0
+        self.skipped_duplicates = 0
+        self.ids = set()
+        # column -> ids it may reference; other values are written as NULL and counted
+        self._references = [(self.columns.index(column), ids) for column, ids in (references or {}).items()]
+        self.dangling_references = {column: 0 for column in references or {}}
+        self._file = None
+        self._chunk_rows = 0
+
+        types = COLUMN_TYPES[table]
+        self._converters: List[Callable[[Any], Optional[str]]] = [
+            self._converter(types.get(column, "text"), column) for column in self.columns
+        ]
+
+    def _converter(self, column_type: str, column: str) -> Callable[[Any], Optional[str]]:
+        if column_type == "uuid":
+            return pg_uuid
+        if column_type == "boolean":
+            return lambda value: None if value is None else ("t" if value else "f")
+        if column_type == "timestamptz" and column in ("created_at", "updated_at"):
+            # COPY writes NULL rather than the column DEFAULT NOW(), so fill it in here
+            return lambda value: self.now if value is None else str(value)
+        return lambda value: None if value is None else str(value)
+
+    def _open_chunk(self):
+        self._close_chunk()
+        extension = "csv" if self.copy_format == "csv" else "copy"
+        name = f"{self.table}.{len(self.files) + 1:04d}.{extension}"
+        path = os.path.join(self.directory, name)
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self.files.append({"table": self.table, "file": name, "rows": 0})
+        self._chunk_rows = 0
+
+    def _close_chunk(self):
+        if self._file is not None:
+            self.files[-1]["rows"] = self._chunk_rows
+            self._file.close()
+            self._file = None
+
+    def write(self, row: Tuple[Any, ...]) -> bool:
+        """Write one row in self.columns order; returns False for a duplicate id"""
+        fields = [convert(value) for convert, value in zip(self._converters, row)]
+        if fields[0] in self.ids:
+            self.skipped_duplicates += 1
+            return False
+        self.ids.add(fields[0])
+        for position, ids in self._references:
+            if fields[position] is not None and fields[position] not in ids:
+                fields[position] = None
+                self.dangling_references[self.columns[position]] += 1
+
+        if self._file is None or self._chunk_rows >= self.chunk_rows:
+            self._open_chunk()
+        if self.copy_format == "csv":
+            # CSV: NULL is an unquoted empty field, so empty strings must be quoted
+            self._file.write(",".join(_csv_field(field) for field in fields) + "\n")
+        else:
+            self._file.write("\t".join(copy_text_field(field) for field in fields) + "\n")
+        self._chunk_rows += 1
+        self.rows += 1
+        return True
+
+    def write_all(self, rows: Iterable[Tuple[Any, ...]]) -> int:
+        for row in rows:
+            self.write(row)
+        return self.rows
+
+    def close(self):
+        self._close_chunk()
+
+def _csv_field(value: Optional[str]) -> str:
+    if value is None:
+        return ""
+    if value == "" or any(ch in value for ch in ',"\n\r') or value.strip() != value:
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+def export_copy(
+    directory: str,
+    foods: Iterable[Dict[str, Any]],
+    entries: Iterable[Dict[str, Any]] = (),
+    copy_format: str = "text",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS
+) -> Dict[str, Any]:
+    """Write COPY chunks for both tables plus load.sql and manifest.json into directory"""
+    os.makedirs(directory, exist_ok=True)
+    now = datetime.now().isoformat()
+    tables: Dict[str, CopyTableWriter] = {}
+    for table, records, to_row in (
+        ("diet_daily_foods", foods, food_row),
+        ("food_entries", entries, entry_row),
+    ):
+        references = {column: tables[target].ids for column, target in FOREIGN_KEYS.get(table, {}).items()}
+        writer = CopyTableWriter(directory, table, copy_format, chunk_rows, now, references)
+        try:
+            writer.write_all(to_row(record) for record in records)
+        finally:
+            writer.close()
+        tables[table] = writer
+
+    # Foods first: food_entries.food_id references diet_daily_foods(id)
+    with open(os.path.join(directory, "load.sql"), 'w', encoding='utf-8') as f:
+        f.write("-- Diet Daily seed data; run with: psql \"$DATABASE_URL\" -f load.sql\n")
+        f.write("\\set ON_ERROR_STOP on\n")
+        for table, writer in tables.items():
+            for chunk in writer.files:
+                source = "'" + os.path.abspath(os.path.join(directory, chunk["file"])).replace("'", "''") + "'"
+                f.write("\\" + copy_statement(table, writer.columns, copy_format, source).replace("COPY", "copy", 1) + "\n")
+
+    manifest = {
+        "format": copy_format,
+        "tables": {
+            table: {
+                "columns": writer.columns,
+                "copy": copy_statement(table, writer.columns, copy_format),
+                "rows": writer.rows,
+                "skipped_duplicates": writer.skipped_duplicates,
+                "dangling_references": writer.dangling_references,
+                "files": writer.files,
+            }
+            for table, writer in tables.items()
+        },
+    }
+    with open(os.path.join(directory, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+def _parse_text_line(line: str) -> List[Optional[str]]:
+    fields = []
+    for raw in line.split("\t"):
+        if raw == "\\N":
+            fields.append(None)
+        elif "\\" in raw:
+            fields.append(_TEXT_UNESCAPE.sub(lambda match: _UNESCAPED.get(match.group(1), match.group(1)), raw))
+        else:
+            fields.append(raw)
+    return fields
+
+_NULL_SENTINEL = "\x00NULL\x00"
+
+def _mark_csv_nulls(lines: Iterable[str]) -> Iterator[str]:
+    """Replace unquoted empty CSV fields with a sentinel before csv.reader sees them
+
+    COPY reads an unquoted empty field as NULL and "" as an empty string; the
+    stdlib reader returns '' for both, so the distinction is marked here.
+    Quote state carries across lines for fields with embedded newlines.
+    """
+    in_quotes = False
+    field_start, quoted = True, False
+    for line in lines:
+        out = []
+        for ch in line:
+            if in_quotes:
+                if ch == '"':
+                    in_quotes = False
+                out.append(ch)
+            elif ch == '"':
+                in_quotes = quoted = True
+                field_start = False
+                out.append(ch)
+            elif ch in ",\n":
+                if field_start and not quoted:
+                    out.append(_NULL_SENTINEL)
+                out.append(ch)
+                field_start, quoted = True, False
+            else:
+                field_start = False
+                out.append(ch)
+        yield "".join(out)
+
+def _iter_csv_rows(f: io.TextIOBase) -> Iterator[List[Optional[str]]]:
+    for row in csv.reader(_mark_csv_nulls(f), strict=True):
+        yield [None if field == _NULL_SENTINEL else field for field in row]
+
+def _check_value(column_type: str, value: str) -> Optional[str]:
+    if column_type == "uuid":
+        try:
+            uuid.UUID(value)
+        except ValueError:
+            return "not a uuid"
+    elif column_type == "numeric":
+        try:
+            float(value)
+        except ValueError:
+            return "not numeric"
+    elif column_type == "boolean":
+        if value.lower() not in ("t", "f", "true", "false", "1", "0", "yes", "no", "on", "off"):
+            return "not a boolean"
+    elif column_type == "timestamptz":
+        try:
+            datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return "not an ISO timestamp"
+    elif column_type == "jsonb":
+        if "\\u0000" in value:
+            return "jsonb cannot hold \\u0000"
+        try:
+            json.loads(value)
+        except ValueError as error:
+            return f"invalid json ({error})"
+    return None
+
+def validate_copy_directory(directory: str, max_errors: int = 50) -> Tuple[Dict[str, int], List[str]]:
+    """Re-parse every chunk listed in manifest.json the way COPY would and check
+    column counts, NULLs, types, CHECK values, primary key uniqueness and
+    foreign keys between the exported tables"""
+    with open(os.path.join(directory, "manifest.json"), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    copy_format = manifest["format"]
+    errors: List[str] = []
+    counts: Dict[str, int] = {}
+    table_ids: Dict[str, set] = {}
+
+    for table, spec in manifest["tables"].items():
+        columns = spec["columns"]
+        types = COLUMN_TYPES[table]
+        seen_ids = table_ids[table] = set()
+        # Referenced tables come first in the manifest, as in load.sql
+        references = {column: table_ids[target] for column, target in FOREIGN_KEYS.get(table, {}).items()
+                      if target in table_ids}
+        counts[table] = 0
+        for chunk in spec["files"]:
+            path = os.path.join(directory, chunk["file"])
+            rows_in_chunk = 0
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                if copy_format == "csv":
+                    rows = _iter_csv_rows(f)
+                else:
+                    rows = (_parse_text_line(line.rstrip("\n")) for line in f)
+                for line_number, fields in enumerate(rows, 1):
+                    rows_in_chunk += 1
+                    where = f"{chunk['file']}:{line_number}"
+                    if len(fields) != len(columns):
+                        errors.append(f"{where}: {len(fields)} fields, expected {len(columns)}")
+                        continue
+                    for column, value in zip(columns, fields):
+                        if value is None:
+                            if column in NOT_NULL[table]:
+                                errors.append(f"{where}: {column} is NULL")
+                            continue
+                        problem = _check_value(types.get(column, "text"), value)
+                        if problem is None and column in CHECKS[table] and value not in CHECKS[table][column]:
+                            problem = f"{value!r} violates CHECK"
+                        if problem is None and column in references and value not in references[column]:
+                            problem = f"{value} is not in {FOREIGN_KEYS[table][column]}"
+                        if problem:
+                            errors.append(f"{where}: {column} {problem}")
+                    if fields[0] in seen_ids:
+                        errors.append(f"{where}: duplicate id {fields[0]}")
+                    seen_ids.add(fields[0])
+                    if len(errors) >= max_errors:
+                        return counts, errors
+            if rows_in_chunk != chunk["rows"]:
+                errors.append(f"{chunk['file']}: {rows_in_chunk} rows, manifest says {chunk['rows']}")
+            counts[table] += rows_in_chunk
+    return counts, errors
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) != 1:
+        print("usage: food_copy.py DIRECTORY", file=sys.stderr)
+        return 2
+    counts, errors = validate_copy_directory(args[0])
+    for error in errors:
+        print(f"❌ {error}")
+    if errors:
+        return 1
+    for table, rows in counts.items():
+        print(f"✅ {table}: {rows} rows")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Food-Symptom Correlation Engine
+Answers "which foods precede symptoms" without the nested loop over
+entries and symptoms. food_entries.consumed_at and
+symptom_tracking.recorded_at are turned into NumPy arrays and sorted by
+(user, time). Each user's timeline is then shifted onto its own stretch of
+one global axis, so a single np.searchsorted call per window finds, for
+every meal, the symptoms recorded min_lag..max_lag hours later without
+ever crossing into another user's history.
+
+For every lag window (default 2-48 h) and every food and IBD risk factor:
+- exposures: how many meals contained it;
+- followed: how many of those meals had at least one symptom in the window;
+- rate and lift: the followed share, and that share over the rate for
+  all meals;
+- phi: the 2x2 correlation between "ate it" and "symptom followed";
+- z: how many standard errors the rate sits above the overall rate;
+- time to onset, symptom types and mean severity of the linked symptoms.
+
+Per-food rows use the FoodSymptomCorrelation fields of
+src/lib/medical/symptom-tracker.ts (food_id, food_name, symptom_types,
+correlation_strength, confidence_level, occurrences, time_to_onset), plus
+the statistics above.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from food_sqlite import load_history_entries, symptom_rows
+
+DEFAULT_WINDOWS = ((2.0, 48.0),)
+# Foods or factors seen in fewer meals than this are reported but not ranked
+MIN_EXPOSURES = 5
+TOP_SYMPTOM_TYPES = 3
+EPOCH = np.datetime64("1970-01-01T00:00:00", "s")
+
+def _has_offset(stamp: str) -> bool:
+    """True for stamps like 2025-09-15T07:44:05+08:00 whose time is not UTC"""
+    return not stamp.endswith("Z") and ("+" in stamp[19:] or "-" in stamp[19:])
+
+def _epoch_seconds(stamps: Sequence[str]) -> np.ndarray:
+    """ISO timestamps -> int64 UTC seconds
+
+    UTC "Z" and naive stamps are parsed in one vectorized call; stamps with
+    an explicit offset are then re-parsed one by one.
+    """
+    seconds = (np.array([stamp[:19] for stamp in stamps], dtype="datetime64[s]") - EPOCH).astype(np.int64)
+    for row, stamp in enumerate(stamps):
+        if _has_offset(stamp):
+            seconds[row] = int(datetime.fromisoformat(stamp.replace("Z", "+00:00")).timestamp())
+    return seconds
+
+class _Vocabulary:
+    """String -> dense int code"""
+
+    def __init__(self):
+        self.codes: Dict[Any, int] = {}
+        self.values: List[Any] = []
+
+    def code(self, value: Any) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+class TimelineBuilder:
+    """Collects meals and symptoms into columns; build() returns a sorted Timeline"""
+
+    def __init__(self):
+        self.users = _Vocabulary()
+        self.foods = _Vocabulary()
+        self.factors = _Vocabulary()
+        self.symptom_types = _Vocabulary()
+        self.food_names: Dict[int, str] = {}
+        self.food_factors: Dict[int, List[int]] = {}
+        self.meal_users: List[int] = []
+        self.meal_times: List[str] = []
+        self.meal_foods: List[int] = []
+        self.symptom_users: List[int] = []
+        self.symptom_times: List[str] = []
+        self.symptom_codes: List[int] = []
+        self.symptom_severity: List[float] = []
+
+    def add_meal(self, user_id: str, consumed_at: str, food_id: str, food_name: str, risk_factors: Iterable[str]):
+        food = self.foods.code(food_id)
+        if food not in self.food_names:
+            self.food_names[food] = food_name
+            self.food_factors[food] = [self.factors.code(factor) for factor in risk_factors]
+        self.meal_users.append(self.users.code(user_id))
+        self.meal_times.append(consumed_at)
+        self.meal_foods.append(food)
+
+    def add_symptom(self, user_id: str, recorded_at: str, symptom_type: str, severity: Optional[float]):
+        self.symptom_users.append(self.users.code(user_id))
+        self.symptom_times.append(recorded_at)
+        self.symptom_codes.append(self.symptom_types.code(symptom_type))
+        self.symptom_severity.append(float(severity or 0))
+
+    def add_history_entry(self, entry: Dict[str, Any]):
+        """A FoodHistoryEntry: the meal itself plus the symptom_tracking rows it implies"""
+        user_id, consumed_at = entry.get("userId"), entry.get("consumedAt")
+        if not user_id or not consumed_at:
+            return
+        food = entry.get("foodData") or {}
+        self.add_meal(user_id, consumed_at, entry.get("foodId") or food.get("id"),
+                      food.get("name_zh") or food.get("name_en") or "",
+                      (food.get("medical_scores") or {}).get("ibd_risk_factors") or ())
+        for row in symptom_rows(entry):
+            self.add_symptom(user_id, row[4], row[2], row[3])
+
+    def build(self) -> "Timeline":
+        return Timeline(self)
+
+class Timeline:
+    """Meals and symptoms of every user as (user, time)-sorted NumPy columns"""
+
+    def __init__(self, builder: TimelineBuilder):
+        self.users = builder.users.values
+        self.food_ids = builder.foods.values
+        self.food_names = [builder.food_names[food] for food in range(len(self.food_ids))]
+        self.factor_names = builder.factors.values
+        self.symptom_types = builder.symptom_types.values
+
+        # Food -> risk factor membership as CSR arrays
+        lengths = np.array([len(builder.food_factors[food]) for food in range(len(self.food_ids))], dtype=np.int64)
+        self.factor_offsets = np.concatenate(([0], np.cumsum(lengths)))
+        self.factor_codes = np.array([code for food in range(len(self.food_ids))
+                                      for code in builder.food_factors[food]], dtype=np.int32)
+
+        meal_users = np.array(builder.meal_users, dtype=np.int64)
+        meal_times = _epoch_seconds(builder.meal_times) if builder.meal_times else np.empty(0, np.int64)
+        symptom_users = np.array(builder.symptom_users, dtype=np.int64)
+        symptom_times = _epoch_seconds(builder.symptom_times) if builder.symptom_times else np.empty(0, np.int64)
+
+        # Give every user a disjoint stretch of one axis so windows never cross users
+        all_times = np.concatenate((meal_times, symptom_times))
+        self.origin = int(all_times.min()) if all_times.size else 0
+        span = int(all_times.max()) - self.origin if all_times.size else 0
+        self.stride = span + 366 * 86400
+
+        meal_order = np.lexsort((meal_times, meal_users))
+        self.meal_users = meal_users[meal_order]
+        self.meal_times = meal_times[meal_order]
+        self.meal_foods = np.array(builder.meal_foods, dtype=np.int64)[meal_order]
+        self.meal_keys = self.meal_users * self.stride + (self.meal_times - self.origin)
+
+        symptom_order = np.lexsort((symptom_times, symptom_users))
+        self.symptom_users = symptom_users[symptom_order]
+        self.symptom_times = symptom_times[symptom_order]
+        self.symptom_codes = np.array(builder.symptom_codes, dtype=np.int64)[symptom_order]
+        self.symptom_severity = np.array(builder.symptom_severity, dtype=np.float64)[symptom_order]
+        self.symptom_keys = self.symptom_users * self.stride + (self.symptom_times - self.origin)
+
+    @property
+    def meals(self) -> int:
+        return int(self.meal_keys.size)
+
+    @property
+    def symptoms(self) -> int:
+        return int(self.symptom_keys.size)
+
+    def join(self, min_lag_hours: float, max_lag_hours: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Every (meal, symptom) pair with the symptom min..max hours after the meal
+
+        Returns (meal index, symptom index, lag in hours), all in sorted order.
+        """
+        low = np.searchsorted(self.symptom_keys, self.meal_keys + int(min_lag_hours * 3600), side="left")
+        high = np.searchsorted(self.symptom_keys, self.meal_keys + int(max_lag_hours * 3600), side="right")
+        counts = high - low
+        total = int(counts.sum())
+        meal_index = np.repeat(np.arange(self.meals), counts)
+        # Position within each meal's run of symptoms, added to where the run starts
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        symptom_index = np.repeat(low, counts) + (np.arange(total) - starts)
+        lag_hours = (self.symptom_keys[symptom_index] - self.meal_keys[meal_index]) / 3600.0
+        return meal_index, symptom_index, lag_hours
+
+def _phi(a: np.ndarray, b: np.ndarray, c: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """Phi coefficient of 2x2 tables [[a, b], [c, d]], 0 where a margin is empty"""
+    denominator = np.sqrt((a + b) * (c + d) * (a + c) * (b + d))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, (a * d - b * c) / denominator, 0.0)
+
+def _group_stats(groups: np.ndarray, followed: np.ndarray, size: int, base_rate: float, total_meals: int,
+                 total_followed: int) -> Dict[str, np.ndarray]:
+    """Exposure/followed counts and association statistics for meals grouped by ``groups``"""
+    exposures = np.bincount(groups, minlength=size).astype(np.float64)
+    hits = np.bincount(groups, weights=followed, minlength=size)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(exposures > 0, hits / exposures, 0.0)
+        lift = rate / base_rate if base_rate else np.zeros(size)
+        standard_error = np.sqrt(base_rate * (1 - base_rate) / exposures)
+        z = np.where(standard_error > 0, (rate - base_rate) / standard_error, 0.0)
+    # a: ate & followed, b: ate & not, c: didn't & followed, d: didn't & not
+    a = hits
+    b = exposures - hits
+    c = total_followed - hits
+    d = (total_meals - exposures) - c
+    return {"exposures": exposures, "followed": hits, "rate": rate, "lift": lift,
+            "phi": _phi(a, b, c, d), "z": z}
+
+def _confidence(occurrences: int, z: float) -> str:
+    if occurrences >= 3 and z >= 2:
+        return "high"
+    if occurrences >= 2 and z >= 1:
+        return "medium"
+    return "low"
+
+def analyze_window(timeline: Timeline, min_lag_hours: float, max_lag_hours: float,
+                   min_exposures: int = MIN_EXPOSURES, top: Optional[int] = None) -> Dict[str, Any]:
+    """Per-food and per-risk-factor statistics for one lag window"""
+    meal_index, symptom_index, lag_hours = timeline.join(min_lag_hours, max_lag_hours)
+    meals = timeline.meals
+    followed = np.zeros(meals, dtype=np.float64)
+    followed[meal_index] = 1.0
+    total_followed = int(followed.sum())
+    base_rate = total_followed / meals if meals else 0.0
+    food_count = len(timeline.food_ids)
+
+    foods = _group_stats(timeline.meal_foods, followed, food_count, base_rate, meals, total_followed)
+    pair_foods = timeline.meal_foods[meal_index]
+    pairs_per_food = np.bincount(pair_foods, minlength=food_count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        onset = np.where(pairs_per_food > 0, np.bincount(pair_foods, weights=lag_hours, minlength=food_count) /
+                         pairs_per_food, 0.0)
+        severity = np.where(pairs_per_food > 0, np.bincount(pair_foods, weights=timeline.symptom_severity[symptom_index],
+                                                              minlength=food_count) / pairs_per_food, 0.0)
+    type_count = len(timeline.symptom_types)
+    food_types = np.bincount(pair_foods * max(type_count, 1) + timeline.symptom_codes[symptom_index],
+                             minlength=food_count * max(type_count, 1)).reshape(food_count, max(type_count, 1))
+
+    # Factor rows: each meal counts once for every risk factor of its food
+    factor_lengths = np.diff(timeline.factor_offsets)[timeline.meal_foods]
+    meal_factor_positions = (np.repeat(timeline.factor_offsets[timeline.meal_foods], factor_lengths) +
+                             np.arange(int(factor_lengths.sum())) -
+                             np.repeat(np.cumsum(factor_lengths) - factor_lengths, factor_lengths))
+    factors = _group_stats(timeline.factor_codes[meal_factor_positions], np.repeat(followed, factor_lengths),
+                           len(timeline.factor_names), base_rate, meals, total_followed)
+
+    food_rows = []
+    for food in np.argsort(-foods["phi"], kind="stable"):
+        exposures = int(foods["exposures"][food])
+        if exposures == 0:
+            continue
+        occurrences = int(foods["followed"][food])
+        top_types = [timeline.symptom_types[code] for code in np.argsort(-food_types[food], kind="stable")[:TOP_SYMPTOM_TYPES]
+                     if food_types[food][code] > 0]
+        food_rows.append({
+            "food_id": timeline.food_ids[food],
+            "food_name": timeline.food_names[food],
+            "symptom_types": top_types,
+            "correlation_strength": round(max(float(foods["phi"][food]), 0.0), 4),
+            "confidence_level": _confidence(occurrences, float(foods["z"][food])),
+            "occurrences": occurrences,
+            "time_to_onset": round(float(onset[food]), 2),
+            "exposures": exposures,
+            "rate": round(float(foods["rate"][food]), 4),
+            "lift": round(float(foods["lift"][food]), 3),
+            "phi": round(float(foods["phi"][food]), 4),
+            "z": round(float(foods["z"][food]), 2),
+            "mean_severity": round(float(severity[food]), 2),
+            "ranked": exposures >= min_exposures,
+        })
+    food_rows.sort(key=lambda row: (not row["ranked"], -row["phi"]))
+
+    factor_rows = [{
+        "risk_factor": timeline.factor_names[factor],
+        "exposures": int(factors["exposures"][factor]),
+        "followed": int(factors["followed"][factor]),
+        "rate": round(float(factors["rate"][factor]), 4),
+        "lift": round(float(factors["lift"][factor]), 3),
+        "phi": round(float(factors["phi"][factor]), 4),
+        "z": round(float(factors["z"][factor]), 2),
+    } for factor in np.argsort(-factors["phi"], kind="stable") if factors["exposures"][factor] > 0]
+
+    return {
+        "window_hours": [min_lag_hours, max_lag_hours],
+        "meals": meals,
+        "symptoms": timeline.symptoms,
+        "pairs": int(meal_index.size),
+        "followed_meals": total_followed,
+        "base_rate": round(base_rate, 4),
+        "foods": food_rows[:top] if top else food_rows,
+        "risk_factors": factor_rows,
+    }
+
+def read_timeline(path: str) -> Timeline:
+    """Meals and symptoms from a history JSON/NDJSON/compact file or a --sqlite export"""
+    builder = TimelineBuilder()
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                "SELECT e.user_id, e.consumed_at, e.food_id, e.food_name, f.medical_scores FROM food_entries e "
+                "LEFT JOIN diet_daily_foods f ON f.id = e.food_id")
+            for user_id, consumed_at, food_id, food_name, scores in rows:
+                factors = json.loads(scores or "{}").get("ibd_risk_factors") or ()
+                builder.add_meal(user_id, consumed_at, food_id or food_name, food_name or "", factors)
+            for row in conn.execute("SELECT user_id, recorded_at, symptom_type, severity FROM symptom_tracking"):
+                builder.add_symptom(*row)
+        finally:
+            conn.close()
+    else:
+        for entry in load_history_entries(path):
+            builder.add_history_entry(entry)
+    return builder.build()
+
+def parse_window(text: str) -> Tuple[float, float]:
+    """"2:48" -> (2.0, 48.0) hours"""
+    low, _, high = text.partition(":")
+    window = (float(low), float(high))
+    if not 0 <= window[0] <= window[1]:
+        raise argparse.ArgumentTypeError(f"window {text!r} must be MIN:MAX hours with 0 <= MIN <= MAX")
+    return window
+
+def correlations_path(source: str) -> str:
+    """Results next to the source, e.g. user-food-history.correlations.json"""
+    root, _ = os.path.splitext(source)
+    return f"{root}.correlations.json"
+
+def main(argv: Optional[List[str]] = None) -> int:
+    root = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(description="Correlate foods with the symptoms that follow them")
+    parser.add_argument("--history", default=str(root / "data" / "user-food-history.json"),
+                        help="history JSON, NDJSON/compact history, or a --sqlite export")
+    parser.add_argument("--window", action="append", type=parse_window, metavar="MIN:MAX",
+                        help="lag window in hours; repeat for several (default: 2:48)")
+    parser.add_argument("--min-exposures", type=int, default=MIN_EXPOSURES,
+                        help=f"meals needed before a food is ranked (default: {MIN_EXPOSURES})")
+    parser.add_argument("--top", type=int, default=10, help="foods to print per window (default: 10)")
+    parser.add_argument("--output", help="results JSON (default: <history>.correlations.json)")
+    args = parser.parse_args(argv)
+    windows = args.window or list(DEFAULT_WINDOWS)
+
+    started = time.perf_counter()
+    timeline = read_timeline(args.history)
+    load_seconds = time.perf_counter() - started
+    print(f"📥 {timeline.meals} meals and {timeline.symptoms} symptoms for {len(timeline.users)} users "
+          f"loaded in {load_seconds:.2f}s")
+
+    started = time.perf_counter()
+    results = [analyze_window(timeline, low, high, args.min_exposures) for low, high in windows]
+    analysis_seconds = time.perf_counter() - started
+    print(f"🔗 {len(windows)} windows analyzed in {analysis_seconds:.2f}s "
+          f"({sum(result['pairs'] for result in results)} meal-symptom pairs)")
+
+    for result in results:
+        low, high = result["window_hours"]
+        print(f"\n⏱️  {low:g}-{high:g}h: {result['followed_meals']}/{result['meals']} meals followed by symptoms "
+              f"(base rate {result['base_rate']:.1%})")
+        for row in [row for row in result["foods"] if row["ranked"]][:args.top]:
+            types = ", ".join(row["symptom_types"]) or "-"
+            print(f"   {row['food_name']:<12} phi {row['phi']:+.3f}  lift {row['lift']:.2f}  "
+                  f"{row['occurrences']}/{row['exposures']} meals  onset {row['time_to_onset']:.1f}h  "
+                  f"[{row['confidence_level']}] {types}")
+        factors = ", ".join(f"{row['risk_factor']} ({row['phi']:+.3f})" for row in result["risk_factors"][:5])
+        print(f"   Risk factors: {factors or '-'}")
+
+    output = args.output or correlations_path(args.history)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            "users": len(timeline.users),
+            "load_seconds": round(load_seconds, 3),
+            "analysis_seconds": round(analysis_seconds, 3),
+            "windows": results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n📄 Results: {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Near-Duplicate Food Detection
+Finds foods that are the same dish under slightly different names once
+catalogs are merged (滷肉飯 / 魯肉飯, "Braised Pork Rice" / "Braised pork over
+rice"). Both names are reduced to feature sets, MinHash signatures are
+banded into LSH buckets, and only foods sharing a bucket are compared, so
+the pass stays near-linear instead of checking every pair. Verified pairs
+are clustered and the earliest food of each cluster becomes canonical.
+"""
+
+import hashlib
+import json
+import re
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from food_index import sidecar_path
+from food_search import zh_grams
+
+REPORT_FORMAT = "diet-daily-dedupe-report"
+REPORT_VERSION = 1
+
+# Words that do not tell two dishes apart: "pork rice" == "pork over rice"
+EN_STOPWORDS = {"a", "an", "and", "the", "with", "over", "on", "in", "of", "served"}
+_EN_WORD = re.compile(r"[a-z0-9]+")
+
+# MinHash over a Mersenne prime keeps a*x+b inside uint64 for 31-bit inputs
+_PRIME = (1 << 31) - 1
+_CHUNK_TOKENS = 1 << 18
+
+def dedupe_report_path(database_path: str) -> str:
+    """Sidecar path for a database file, e.g. taiwan-hk-foods.dedupe.json"""
+    return sidecar_path(database_path, "dedupe")
+
+def en_words(text: str) -> Set[str]:
+    """Lowercase content words with a naive plural strip (dumplings -> dumpling, potatoes -> potato)"""
+    words = set()
+    for word in _EN_WORD.findall((text or "").lower()):
+        if word in EN_STOPWORDS:
+            continue
+        if len(word) > 4 and word.endswith("oes"):
+            word = word[:-2]
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.add(word)
+    return words
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def name_similarity(zh_a: Set[str], en_a: Set[str], zh_b: Set[str], en_b: Set[str]) -> float:
+    """Mean Jaccard over the names both foods have; 0.0 if they share no name field"""
+    scores = []
+    if zh_a and zh_b:
+        scores.append(jaccard(zh_a, zh_b))
+    if en_a and en_b:
+        scores.append(jaccard(en_a, en_b))
+    return sum(scores) / len(scores) if scores else 0.0
+
+def iter_food_catalog(path: str) -> Iterator[Dict[str, Any]]:
+    """Foods from any catalog the repo writes: database JSON, additional-foods,
+    a user food history (its foodData), a plain list, or NDJSON"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(".ndjson"):
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if item.get("record") in ("header", "footer"):
+                    continue
+                yield item
+            return
+        data = json.load(f)
+    if isinstance(data, list):
+        yield from data
+    elif "foods" in data:
+        yield from data["foods"]
+    elif "additional_foods" in data:
+        yield from data["additional_foods"]
+    elif "entries" in data:
+        for entry in data["entries"]:
+            if entry.get("foodData"):
+                yield entry["foodData"]
+    else:
+        raise ValueError(f"{path}: no foods, additional_foods or entries list")
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: int, b: int):
+        root_a, root_b = self.find(a), self.find(b)
+        # The lower ordinal stays root so the earliest food is canonical
+        if root_a < root_b:
+            self.parent[root_b] = root_a
+        elif root_b < root_a:
+            self.parent[root_a] = root_b
+
+class NearDuplicateDetector:
+    """Collects foods from one or more sources and clusters near-duplicate names
+
+    ``num_perm`` hash functions are split into ``bands`` LSH bands per name
+    field; two foods become candidates when any band of either name collides.
+    The defaults (64 hashes, 16 bands of 4) put the LSH threshold near a
+    Jaccard of 0.5, a little below the verification ``threshold``, because
+    food names are only a handful of features long and MinHash estimates are
+    noisy there.
+    """
+
+    def __init__(self, threshold: float = 0.6, num_perm: int = 64, bands: int = 16, max_bucket: int = 256):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.max_bucket = max_bucket
+
+        rng = np.random.default_rng(20250915)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self._token_hashes: Dict[str, int] = {}
+
+        self.ids: List[Any] = []
+        self.names_zh: List[str] = []
+        self.names_en: List[str] = []
+        self.categories: List[Any] = []
+        self.sources: List[str] = []
+        self.zh_features: List[Set[str]] = []
+        self.en_features: List[Set[str]] = []
+        self.stats: Dict[str, Any] = {}
+
+    def add(self, food: Dict[str, Any], source: str = "") -> int:
+        ordinal = len(self.ids)
+        self.ids.append(food.get("id"))
+        self.names_zh.append(food.get("name_zh") or "")
+        self.names_en.append(food.get("name_en") or "")
+        self.categories.append(food.get("category"))
+        self.sources.append(source)
+        self.zh_features.append(set(zh_grams(self.names_zh[-1])))
+        self.en_features.append(en_words(self.names_en[-1]))
+        return ordinal
+
+    def add_all(self, foods: Iterable[Dict[str, Any]], source: str = "") -> int:
+        count = 0
+        for food in foods:
+            self.add(food, source)
+            count += 1
+        return count
+
+    def _hash_token(self, token: str) -> int:
+        value = self._token_hashes.get(token)
+        if value is None:
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest()
+            value = self._token_hashes[token] = int.from_bytes(digest, "little") % _PRIME
+        return value
+
+    def _signatures(self, features: List[Set[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """MinHash signatures (num_perm, items) for the foods that have this feature"""
+        ordinals = np.array([n for n, tokens in enumerate(features) if tokens], dtype=np.int64)
+        signatures = np.empty((self.num_perm, len(ordinals)), dtype=np.uint64)
+        a, b = self._a[:, None], self._b[:, None]
+
+        start = 0
+        while start < len(ordinals):
+            # Chunks bound the (num_perm, tokens) intermediate on large catalogs
+            values, offsets, end, total = [], [], start, 0
+            while end < len(ordinals) and (total < _CHUNK_TOKENS or end == start):
+                tokens = features[ordinals[end]]
+                offsets.append(total)
+                values.extend(self._hash_token(token) for token in tokens)
+                total += len(tokens)
+                end += 1
+            x = np.array(values, dtype=np.uint64)[None, :]
+            hashed = (a * x + b) % _PRIME
+            signatures[:, start:end] = np.minimum.reduceat(hashed, np.array(offsets, dtype=np.int64), axis=1)
+            start = end
+        return ordinals, signatures
+
+    def candidate_pairs(self) -> Set[Tuple[int, int]]:
+        """(i, j) ordinal pairs sharing at least one LSH bucket, i < j"""
+        pairs: Set[Tuple[int, int]] = set()
+        rows = self.num_perm // self.bands
+        skipped = 0
+        for features in (self.zh_features, self.en_features):
+            ordinals, signatures = self._signatures(features)
+            if len(ordinals) < 2:
+                continue
+            for band in range(self.bands):
+                keys = np.zeros(len(ordinals), dtype=np.uint64)
+                for row in signatures[band * rows:(band + 1) * rows]:
+                    keys = keys * np.uint64(1000003) ^ row
+                order = np.argsort(keys, kind="stable")
+                sorted_keys = keys[order]
+                boundaries = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+                starts = np.concatenate(([0], boundaries))
+                sizes = np.diff(np.concatenate((starts, [len(order)])))
+                for start, size in zip(starts[sizes > 1].tolist(), sizes[sizes > 1].tolist()):
+                    if size > self.max_bucket:
+                        # A bucket this size means a feature shared by a whole family
+                        # of dishes (e.g. 肉飯); another band still pairs real duplicates
+                        skipped += 1
+                        continue
+                    bucket = order[start:start + size]
+                    members = sorted(ordinals[bucket].tolist())
+                    for i, first in enumerate(members):
+                        for second in members[i + 1:]:
+                            pairs.add((first, second))
+        self.stats["skipped_buckets"] = skipped
+        return pairs
+
+    def similarity(self, first: int, second: int) -> float:
+        return name_similarity(self.zh_features[first], self.en_features[first],
+                               self.zh_features[second], self.en_features[second])
+
+    def clusters(self) -> List[List[int]]:
+        """Clusters of two or more ordinals, each sorted so the canonical food comes first"""
+        started = time.perf_counter()
+        candidates = self.candidate_pairs()
+        union = _UnionFind(len(self.ids))
+        verified = 0
+        for first, second in candidates:
+            if self.similarity(first, second) >= self.threshold:
+                union.union(first, second)
+                verified += 1
+
+        groups: Dict[int, List[int]] = {}
+        for ordinal in range(len(self.ids)):
+            groups.setdefault(union.find(ordinal), []).append(ordinal)
+        clusters = sorted((members for members in groups.values() if len(members) > 1), key=lambda m: m[0])
+
+        self.stats.update({
+            "total_items": len(self.ids),
+            "candidate_pairs": len(candidates),
+            "verified_pairs": verified,
+            "clusters": len(clusters),
+            "duplicates": sum(len(members) - 1 for members in clusters),
+            "seconds": round(time.perf_counter() - started, 4),
+        })
+        return clusters
+
+    def _describe(self, ordinal: int) -> Dict[str, Any]:
+        return {
+            "id": self.ids[ordinal],
+            "name_zh": self.names_zh[ordinal],
+            "name_en": self.names_en[ordinal],
+            "category": self.categories[ordinal],
+            "source": self.sources[ordinal],
+        }
+
+    def report(self, clusters: Optional[List[List[int]]] = None) -> Dict[str, Any]:
+        """Merge report: every cluster with its canonical food and scored duplicates"""
+        if clusters is None:
+            clusters = self.clusters()
+        entries = []
+        for canonical, *duplicates in clusters:
+            entries.append({
+                "canonical": self._describe(canonical),
+                "duplicates": [
+                    dict(self._describe(ordinal), similarity=round(self.similarity(canonical, ordinal), 3))
+                    for ordinal in duplicates
+                ],
+            })
+        return {
+            "format": REPORT_FORMAT,
+            "version": REPORT_VERSION,
+            "threshold": self.threshold,
+            "stats": dict(self.stats),
+            "clusters": entries,
+        }
+
+    def canonical_map(self, clusters: Optional[List[List[int]]] = None) -> Dict[str, Any]:
+        """Duplicate id -> canonical id; foods that already share the canonical id are left out"""
+        if clusters is None:
+            clusters = self.clusters()
+        mapping = {}
+        for canonical, *duplicates in clusters:
+            canonical_id = self.ids[canonical]
+            for ordinal in duplicates:
+                food_id = self.ids[ordinal]
+                if food_id is not None and food_id != canonical_id and food_id not in mapping:
+                    mapping[food_id] = canonical_id
+        return mapping
+
+def write_dedupe_report(report: Dict[str, Any], path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Versioned Delta Feed
+Every --release run publishes the catalog as a new patch version (1.0.0,
+1.0.1, ...) into a release directory and writes the changeset from the
+previous version, so clients holding version N download only N -> N+1 ->
+... -> latest instead of the whole catalog.
+
+Release directory layout:
+- releases.json            version chain: per release its item count,
+                           catalog hash and the delta that reaches it
+- catalog.json             the latest full catalog (needed for the next diff
+                           and for clients too far behind the chain)
+- delta-<from>-<to>.json   ops keyed by food id:
+    {"op": "add",    "id": ..., "food": {...}}
+    {"op": "update", "id": ..., "set": {"medical_scores.ibd_score": 3}, "unset": [...]}
+    {"op": "delete", "id": ...}
+  Nested objects are diffed into dotted field paths; lists are replaced
+  whole.
+
+apply_delta() patches a catalog held as {id: food} in place, touching only
+the foods named in the ops, so syncing costs time proportional to churn.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DELTA_FORMAT = "diet-daily-delta"
+RELEASES_FORMAT = "diet-daily-releases"
+RELEASES_NAME = "releases.json"
+CATALOG_NAME = "catalog.json"
+INITIAL_VERSION = "1.0.0"
+
+_canonical_json = json.JSONEncoder(ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode
+_compact_json = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+def next_version(version: str) -> str:
+    """Bump the patch number: 1.0.4 -> 1.0.5"""
+    major, minor, patch = (int(part) for part in version.split("."))
+    return f"{major}.{minor}.{patch + 1}"
+
+def delta_name(from_version: str, to_version: str) -> str:
+    return f"delta-{from_version}-{to_version}.json"
+
+def catalog_hash(foods: Iterable[Dict[str, Any]]) -> str:
+    """Order-independent SHA-256 of a catalog, for checking a patched copy against the release"""
+    digest = hashlib.sha256()
+    for encoded in sorted(_canonical_json(food) for food in foods):
+        digest.update(encoded.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+def _diff_fields(old: Dict[str, Any], new: Dict[str, Any], prefix: str,
+                 changed: Dict[str, Any], removed: List[str]):
+    for key, value in new.items():
+        path = prefix + key
+        if key not in old:
+            changed[path] = value
+        elif old[key] != value:
+            if isinstance(value, dict) and isinstance(old[key], dict):
+                _diff_fields(old[key], value, path + ".", changed, removed)
+            else:
+                changed[path] = value
+    for key in old:
+        if key not in new:
+            removed.append(prefix + key)
+
+def diff_catalogs(old_by_id: Dict[str, Dict[str, Any]], new_foods: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Field-level ops that turn the old catalog into the new one"""
+    ops = []
+    seen = set()
+    for food in new_foods:
+        food_id = food["id"]
+        seen.add(food_id)
+        previous = old_by_id.get(food_id)
+        if previous is None:
+            ops.append({"op": "add", "id": food_id, "food": food})
+        elif previous != food:
+            changed: Dict[str, Any] = {}
+            removed: List[str] = []
+            _diff_fields(previous, food, "", changed, removed)
+            op = {"op": "update", "id": food_id, "set": changed}
+            if removed:
+                op["unset"] = removed
+            ops.append(op)
+    ops.extend({"op": "delete", "id": food_id} for food_id in old_by_id if food_id not in seen)
+    return ops
+
+def _parent(food: Dict[str, Any], path: str, create: bool) -> Tuple[Optional[Dict[str, Any]], str]:
+    *parents, leaf = path.split(".")
+    node = food
+    for key in parents:
+        child = node.get(key)
+        if not isinstance(child, dict):
+            if not create:
+                return None, leaf
+            child = node[key] = {}
+        node = child
+    return node, leaf
+
+def apply_delta(foods_by_id: Dict[str, Dict[str, Any]], delta: Dict[str, Any],
+                version: Optional[str] = None) -> str:
+    """Patch ``foods_by_id`` in place and return the version it now holds
+
+    Only the foods named in the ops are touched. Raises ValueError when the
+    delta does not start at ``version`` or names a food the copy lacks.
+    """
+    if delta.get("format") != DELTA_FORMAT:
+        raise ValueError("not a Diet Daily delta")
+    if version is not None and delta["from_version"] != version:
+        raise ValueError(f"delta {delta['from_version']} -> {delta['to_version']} does not apply to {version}")
+    for op in delta["ops"]:
+        kind, food_id = op["op"], op["id"]
+        if kind == "add":
+            foods_by_id[food_id] = op["food"]
+        elif kind == "delete":
+            foods_by_id.pop(food_id, None)
+        elif kind == "update":
+            food = foods_by_id.get(food_id)
+            if food is None:
+                raise ValueError(f"update for unknown food {food_id}")
+            for path, value in op["set"].items():
+                node, leaf = _parent(food, path, create=True)
+                node[leaf] = value
+            for path in op.get("unset", ()):
+                node, leaf = _parent(food, path, create=False)
+                if node is not None:
+                    node.pop(leaf, None)
+        else:
+            raise ValueError(f"unknown op {kind!r}")
+    return delta["to_version"]
+
+def delta_chain(releases: Dict[str, Any], version: str) -> Optional[List[str]]:
+    """Delta files that bring ``version`` up to the latest release; None when a full download is needed"""
+    versions = [release["version"] for release in releases["releases"]]
+    if version not in versions:
+        return None
+    chain = []
+    for release in releases["releases"][versions.index(version) + 1:]:
+        if not release.get("delta"):
+            return None
+        chain.append(release["delta"])
+    return chain
+
+def load_releases(directory: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """(releases index, latest catalog) of a release directory, or (None, None) before the first release"""
+    index_path = os.path.join(directory, RELEASES_NAME)
+    if not os.path.exists(index_path):
+        return None, None
+    with open(index_path, 'r', encoding='utf-8') as f:
+        releases = json.load(f)
+    with open(os.path.join(directory, CATALOG_NAME), 'r', encoding='utf-8') as f:
+        catalog = json.load(f)
+    return releases, catalog
+
+def publish_release(directory: str, database: Dict[str, Any],
+                    previous: Optional[Dict[str, Any]] = None,
+                    releases: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Publish ``database`` as the next version; sets its metadata.version and returns the release entry
+
+    Nothing is written when the catalog equals the previous release, and
+    the returned entry is the previous one with ``unchanged`` set.
+    """
+    os.makedirs(directory, exist_ok=True)
+    foods = database["foods"]
+    ops: List[Dict[str, Any]] = []
+    if previous is None:
+        version = database["metadata"].get("version") or INITIAL_VERSION
+        releases = {"format": RELEASES_FORMAT, "latest": None, "releases": []}
+    else:
+        ops = diff_catalogs({food["id"]: food for food in previous["foods"]}, foods)
+        if not ops:
+            database["metadata"]["version"] = releases["latest"]
+            return dict(releases["releases"][-1], unchanged=True)
+        version = next_version(releases["latest"])
+
+    database["metadata"]["version"] = version
+    entry = {
+        "version": version,
+        "created": datetime.now().isoformat(),
+        "items": len(foods),
+        "catalog_sha256": catalog_hash(foods),
+        "delta": None,
+    }
+    if previous is not None:
+        counts = {kind: sum(1 for op in ops if op["op"] == kind) for kind in ("add", "update", "delete")}
+        delta = {
+            "format": DELTA_FORMAT,
+            "from_version": releases["latest"],
+            "to_version": version,
+            "catalog_sha256": entry["catalog_sha256"],
+            "counts": counts,
+            "ops": ops,
+        }
+        data = _compact_json(delta).encode("utf-8")
+        entry.update(delta=delta_name(releases["latest"], version), delta_bytes=len(data), ops=counts)
+        with open(os.path.join(directory, entry["delta"]), 'wb') as f:
+            f.write(data)
+
+    with open(os.path.join(directory, CATALOG_NAME), 'w', encoding='utf-8') as f:
+        f.write(_compact_json(database))
+    releases["releases"].append(entry)
+    releases["latest"] = version
+    with open(os.path.join(directory, RELEASES_NAME), 'w', encoding='utf-8') as f:
+        json.dump(releases, f, ensure_ascii=False, indent=2)
+    return entry
+
+def sync_catalog(foods_by_id: Dict[str, Dict[str, Any]], version: str, directory: str) -> Tuple[str, int]:
+    """Bring a local {id: food} copy up to the latest release by applying the delta chain
+
+    Returns (new version, ops applied). Raises ValueError when the copy is
+    too old for the chain, in which case the client re-downloads catalog.json.
+    """
+    with open(os.path.join(directory, RELEASES_NAME), 'r', encoding='utf-8') as f:
+        releases = json.load(f)
+    chain = delta_chain(releases, version)
+    if chain is None:
+        raise ValueError(f"version {version} is not reachable by deltas; download {CATALOG_NAME}")
+    applied = 0
+    for name in chain:
+        with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+            delta = json.load(f)
+        version = apply_delta(foods_by_id, delta, version)
+        applied += len(delta["ops"])
+    return version, applied
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Update a local catalog copy from a release directory's delta feed")
+    parser.add_argument("local", help="local catalog JSON (as downloaded from a release); rewritten in place")
+    parser.add_argument("releases", help="release directory written by generate-food-database.py --release")
+    parser.add_argument("--verify", action="store_true", help="check the patched catalog against the release hash")
+    args = parser.parse_args(argv)
+
+    with open(args.local, 'r', encoding='utf-8') as f:
+        local = json.load(f)
+    version = local["metadata"]["version"]
+    foods_by_id = {food["id"]: food for food in local["foods"]}
+
+    started = time.perf_counter()
+    try:
+        latest, applied = sync_catalog(foods_by_id, version, args.releases)
+    except ValueError as error:
+        print(f"❌ {error}", file=sys.stderr)
+        return 1
+    seconds = time.perf_counter() - started
+    if latest == version:
+        print(f"✔️  {args.local} is already at {version}")
+        return 0
+    print(f"🔄 {version} -> {latest}: {applied} ops applied in {seconds * 1000:.1f}ms")
+
+    if args.verify:
+        with open(os.path.join(args.releases, RELEASES_NAME), 'r', encoding='utf-8') as f:
+            expected = json.load(f)["releases"][-1]["catalog_sha256"]
+        if catalog_hash(foods_by_id.values()) != expected:
+            print(f"❌ Patched catalog does not match release {latest}", file=sys.stderr)
+            return 1
+        print(f"✅ Matches release {latest} ({len(foods_by_id)} foods)")
+
+    local["metadata"]["version"] = latest
+    local["metadata"]["total_items"] = len(foods_by_id)
+    local["foods"] = list(foods_by_id.values())
+    with open(args.local, 'w', encoding='utf-8') as f:
+        json.dump(local, f, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
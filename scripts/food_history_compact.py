@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Compact History Format
+A normalized encoding of user food histories. data/user-food-history.json
+embeds a full foodData snapshot in every entry; here each distinct snapshot
+is stored once in a per-file food table and entries point at it. Repeated
+strings (user ids, notes, tags), repeated objects (medicalScore, portion)
+and entry key layouts are dictionary-encoded the same way, and canonical
+timestamps become integer millisecond deltas.
+
+The file is line-oriented JSON: a header line, then blocks that each add
+the dictionary items their entries first use, then a footer. Each block
+only needs the dictionaries read so far, so loading streams block by
+block. Conversion is lossless: expanding a compacted file gives back the
+same entries, metadata and key order, byte for byte for files this repo
+writes (indent=2 JSON or NDJSON).
+
+    python scripts/food_history_compact.py compact data/user-food-history.json history.chist
+    python scripts/food_history_compact.py expand history.chist user-food-history.json
+    python scripts/food_history_compact.py verify data/user-food-history.json
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+COMPACT_FORMAT = "diet-daily-history-compact"
+COMPACT_VERSION = 1
+DEFAULT_BLOCK_SIZE = 1000
+
+# How each known entry key is encoded; other keys are stored as-is, except that objects are wrapped (see RAW)
+STRING_KEYS = {"userId", "foodId", "notes", "photoUrl", "location", "mealType"}
+OBJECT_KEYS = {"medicalScore", "portion", "tags", "symptoms"}
+FOOD_KEY = "foodData"
+CONSUMED_KEY = "consumedAt"
+TIMESTAMP_KEYS = {"createdAt", "updatedAt"}
+# A known key whose value does not fit its encoding, and any other key holding an object, is wrapped as
+# {"$": value}; every object in an entry row is such a wrapper
+RAW = "$"
+
+# Also the dedupe key for foods and objects: it keeps key order, so equal objects with different key order
+# are stored separately and each entry gets its own order back
+_compact_json = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+def timestamp_ms(value: Any) -> Optional[int]:
+    """Milliseconds since the epoch for "YYYY-MM-DDTHH:MM:SS.mmmZ", None for anything that would not round-trip"""
+    if type(value) is not str or len(value) != 24 or value[-1] != "Z" or value[19] != ".":
+        return None
+    try:
+        moment = datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+        millis = int(value[20:23])
+    except ValueError:
+        return None
+    ms = int(moment.timestamp()) * 1000 + millis
+    return ms if format_timestamp(ms) == value else None
+
+_DAY_PREFIXES: Dict[int, str] = {}
+
+def format_timestamp(ms: int) -> str:
+    """Inverse of timestamp_ms; the date part is cached per day since histories cluster in time"""
+    day, ms_of_day = divmod(ms, 86400000)
+    prefix = _DAY_PREFIXES.get(day)
+    if prefix is None:
+        prefix = _DAY_PREFIXES[day] = datetime.fromtimestamp(day * 86400, timezone.utc).strftime("%Y-%m-%dT")
+    seconds, millis = divmod(ms_of_day, 1000)
+    minutes, second = divmod(seconds, 60)
+    hour, minute = divmod(minutes, 60)
+    return f"{prefix}{hour:02d}:{minute:02d}:{second:02d}.{millis:03d}Z"
+
+class _Table:
+    """Append-only dictionary: value -> index, plus the values added since the last flush"""
+
+    def __init__(self, key=None):
+        self.key = key
+        self.index: Dict[Any, int] = {}
+        self.pending: List[Any] = []
+
+    def ref(self, value: Any) -> int:
+        key = value if self.key is None else self.key(value)
+        ref = self.index.get(key)
+        if ref is None:
+            ref = self.index[key] = len(self.index)
+            self.pending.append(value)
+        return ref
+
+    def flush(self) -> List[Any]:
+        pending, self.pending = self.pending, []
+        return pending
+
+class CompactHistoryWriter:
+    """Streams history entries into the compact format"""
+
+    def __init__(self, stream: TextIO, document: Optional[Dict[str, Any]] = None, source_format: str = "json",
+                 block_size: int = DEFAULT_BLOCK_SIZE):
+        self.stream = stream
+        self.block_size = block_size
+        self.strings = _Table()
+        self.objects = _Table(_compact_json)
+        self.foods = _Table(_compact_json)
+        self.shapes = _Table(tuple)
+        self.rows: List[List[Any]] = []
+        self.total = 0
+        self._previous_consumed = 0
+
+        # Everything around the entries list, with the list's position so key order survives
+        document = document or {}
+        keys = list(document)
+        header = {
+            "record": "header",
+            "format": COMPACT_FORMAT,
+            "version": COMPACT_VERSION,
+            "source_format": source_format,
+            "document": {key: value for key, value in document.items() if key != "entries"},
+            "entries_position": keys.index("entries") if "entries" in keys else None,
+        }
+        stream.write(_compact_json(header) + "\n")
+
+    def _encode(self, key: str, value: Any, consumed: Optional[int]) -> Any:
+        if key in STRING_KEYS:
+            return self.strings.ref(value) if type(value) is str else {RAW: value}
+        if key in OBJECT_KEYS:
+            return self.objects.ref(value) if isinstance(value, (dict, list)) else {RAW: value}
+        if key == FOOD_KEY:
+            return self.foods.ref(value) if isinstance(value, dict) else {RAW: value}
+        if key in TIMESTAMP_KEYS:
+            ms = timestamp_ms(value)
+            return ms - consumed if ms is not None and consumed is not None else {RAW: value}
+        return {RAW: value} if type(value) is dict else value
+
+    def write(self, entry: Dict[str, Any]):
+        keys = tuple(entry)
+        row: List[Any] = [self.shapes.ref(keys)]
+        consumed = timestamp_ms(entry.get(CONSUMED_KEY))
+        for key in keys:
+            if key == CONSUMED_KEY:
+                if consumed is None:
+                    row.append({RAW: entry[key]})
+                else:
+                    # Entries are mostly in time order, so deltas stay small
+                    row.append(consumed - self._previous_consumed)
+                    self._previous_consumed = consumed
+            else:
+                row.append(self._encode(key, entry[key], consumed))
+        self.rows.append(row)
+        self.total += 1
+        if len(self.rows) >= self.block_size:
+            self.flush()
+
+    def write_all(self, entries: Iterable[Dict[str, Any]]) -> int:
+        for entry in entries:
+            self.write(entry)
+        return self.total
+
+    def flush(self):
+        if not self.rows:
+            return
+        block = {"record": "block"}
+        for name, table in (("strings", self.strings), ("objects", self.objects),
+                            ("foods", self.foods), ("shapes", self.shapes)):
+            added = table.flush()
+            if added:
+                block[name] = [list(shape) for shape in added] if name == "shapes" else added
+        block["entries"] = self.rows
+        self.stream.write(_compact_json(block) + "\n")
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        footer = {
+            "record": "footer",
+            "total_entries": self.total,
+            "foods": len(self.foods.index),
+            "strings": len(self.strings.index),
+            "objects": len(self.objects.index),
+        }
+        self.stream.write(_compact_json(footer) + "\n")
+
+class CompactHistoryReader:
+    """Streams entries back out of a compact history; only the dictionaries stay in memory
+
+    Entries that used the same food or object share one dict, which is what
+    makes loading cheap; copy an entry's foodData/medicalScore before
+    editing it in place.
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        header = json.loads(stream.readline() or "{}")
+        if header.get("format") != COMPACT_FORMAT or header.get("version") != COMPACT_VERSION:
+            raise ValueError("not a compact history this version can read")
+        self.header = header
+        self.source_format = header["source_format"]
+        self.document = header["document"]
+        self.entries_position = header["entries_position"]
+        self.footer: Optional[Dict[str, Any]] = None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        strings: List[str] = []
+        objects: List[Any] = []
+        foods: List[Dict[str, Any]] = []
+        shapes: List[List[str]] = []
+        previous_consumed = 0
+        for line in self.stream:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("record") == "footer":
+                self.footer = record
+                break
+            strings.extend(record.get("strings", ()))
+            objects.extend(record.get("objects", ()))
+            foods.extend(record.get("foods", ()))
+            shapes.extend(record.get("shapes", ()))
+
+            for row in record["entries"]:
+                entry = {}
+                consumed = None
+                relative = []
+                for key, value in zip(shapes[row[0]], row[1:]):
+                    if type(value) is dict:
+                        entry[key] = value[RAW]
+                    elif key == CONSUMED_KEY:
+                        consumed = previous_consumed = previous_consumed + value
+                        entry[key] = format_timestamp(consumed)
+                    elif key in STRING_KEYS:
+                        entry[key] = strings[value]
+                    elif key in OBJECT_KEYS:
+                        entry[key] = objects[value]
+                    elif key == FOOD_KEY:
+                        entry[key] = foods[value]
+                    elif key in TIMESTAMP_KEYS:
+                        entry[key] = value
+                        relative.append(key)
+                    else:
+                        entry[key] = value
+                for key in relative:
+                    entry[key] = format_timestamp(consumed + entry[key])
+                yield entry
+        if self.footer is None:
+            raise ValueError("compact history ends without a footer; the file is truncated")
+
+    def document_with(self, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """The original top-level document with ``entries`` back in its place"""
+        items = list(self.document.items())
+        if self.entries_position is not None:
+            items.insert(self.entries_position, ("entries", entries))
+        return dict(items)
+
+def is_compact_history(path: str) -> bool:
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.readline(4096)
+    return f'"format":"{COMPACT_FORMAT}"' in first
+
+def iter_compact_history(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from CompactHistoryReader(f)
+
+def _read_source(path: str) -> Tuple[str, Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """(source format, document without entries, entries) for a JSON or NDJSON history"""
+    if path.endswith(".ndjson"):
+        def ndjson_entries() -> Iterator[Dict[str, Any]]:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        return "ndjson", {"entries": None}, ndjson_entries()
+    with open(path, 'r', encoding='utf-8') as f:
+        document = json.load(f)
+    return "json", document, iter(document.get("entries", []))
+
+def compact_history(source: str, destination: str, block_size: int = DEFAULT_BLOCK_SIZE) -> int:
+    """Convert a JSON or NDJSON history to the compact format; returns the entry count"""
+    source_format, document, entries = _read_source(source)
+    with open(destination, 'w', encoding='utf-8') as f:
+        writer = CompactHistoryWriter(f, document, source_format, block_size)
+        writer.write_all(entries)
+        writer.close()
+    return writer.total
+
+def expand_history(source: str, destination: str) -> int:
+    """Convert a compact history back to the JSON or NDJSON it was made from"""
+    with open(source, 'r', encoding='utf-8') as f:
+        reader = CompactHistoryReader(f)
+        with open(destination, 'w', encoding='utf-8') as out:
+            if reader.source_format == "ndjson":
+                total = 0
+                for entry in reader:
+                    out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                    total += 1
+                return total
+            entries = list(reader)
+            json.dump(reader.document_with(entries), out, ensure_ascii=False, indent=2)
+            return len(entries)
+
+def dumps_compact(history: Dict[str, Any]) -> str:
+    """Compact a history document in memory, e.g. for a sync payload"""
+    buffer = io.StringIO()
+    writer = CompactHistoryWriter(buffer, history, "json")
+    writer.write_all(history.get("entries", []))
+    writer.close()
+    return buffer.getvalue()
+
+def loads_compact(text: str) -> Dict[str, Any]:
+    reader = CompactHistoryReader(io.StringIO(text))
+    return reader.document_with(list(reader))
+
+def verify(source: str) -> Dict[str, Any]:
+    """Round-trip a history through the compact format and compare sizes, parse times and content"""
+    compact_path = source + ".verify.chist"
+    expanded_path = source + ".verify.expanded"
+    try:
+        compact_history(source, compact_path)
+        expand_history(compact_path, expanded_path)
+
+        started = time.perf_counter()
+        _, document, entries = _read_source(source)
+        original = list(entries)
+        original_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        restored = list(iter_compact_history(compact_path))
+        compact_seconds = time.perf_counter() - started
+
+        with open(source, 'rb') as a, open(expanded_path, 'rb') as b:
+            identical_bytes = a.read() == b.read()
+        return {
+            "entries": len(original),
+            "lossless": original == restored,
+            "identical_bytes": identical_bytes,
+            "original_bytes": os.path.getsize(source),
+            "compact_bytes": os.path.getsize(compact_path),
+            "original_parse_seconds": round(original_seconds, 4),
+            "compact_parse_seconds": round(compact_seconds, 4),
+        }
+    finally:
+        for path in (compact_path, expanded_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert user food histories to and from the compact format")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compact_command = commands.add_parser("compact", help="JSON/NDJSON history -> compact")
+    compact_command.add_argument("source")
+    compact_command.add_argument("destination")
+    compact_command.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    expand_command = commands.add_parser("expand", help="compact -> the original JSON/NDJSON history")
+    expand_command.add_argument("source")
+    expand_command.add_argument("destination")
+    verify_command = commands.add_parser("verify", help="round-trip a history and report sizes and parse times")
+    verify_command.add_argument("source")
+    args = parser.parse_args(argv)
+
+    if args.command == "compact":
+        total = compact_history(args.source, args.destination, args.block_size)
+        ratio = os.path.getsize(args.source) / max(1, os.path.getsize(args.destination))
+        print(f"🗜️  Compacted {total} entries: {args.destination} ({ratio:.1f}x smaller)")
+    elif args.command == "expand":
+        total = expand_history(args.source, args.destination)
+        print(f"📄 Expanded {total} entries: {args.destination}")
+    else:
+        result = verify(args.source)
+        ratio = result["original_bytes"] / max(1, result["compact_bytes"])
+        speedup = result["original_parse_seconds"] / max(1e-9, result["compact_parse_seconds"])
+        status = "✅" if result["lossless"] else "❌"
+        print(f"{status} {result['entries']} entries round-trip {'losslessly' if result['lossless'] else 'WITH CHANGES'}"
+              f"{' (byte-identical)' if result['identical_bytes'] else ''}")
+        print(f"   Size: {result['original_bytes']:,} -> {result['compact_bytes']:,} bytes ({ratio:.1f}x smaller)")
+        print(f"   Parse: {result['original_parse_seconds']:.3f}s -> {result['compact_parse_seconds']:.3f}s ({speedup:.1f}x)")
+        return 0 if result["lossless"] else 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Streaming Food Import
+Bulk CSV/TSV import built on TaiwanHKFoodGenerator.generate_food_item.
+Rows flow one at a time through parse -> normalize -> validate -> dedupe ->
+write generator stages, so memory stays bounded on very large files. A bad
+row is written to a quarantine file with its reason instead of aborting the
+run, and every stage keeps throughput counters.
+
+Expected columns (aliases in COLUMN_ALIASES; list fields split on ; or |):
+name_zh, name_en, category, ibd_score, ibd_risk_factors, chemo_safety,
+major_allergens, fodmap_level, taiwan, hong_kong, cooking_methods, alternatives
+"""
+
+import csv
+import json
+import re
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+# CSV header -> generate_food_item argument
+COLUMN_ALIASES = {
+    "name_zh": "name_zh", "name": "name_zh", "中文名稱": "name_zh",
+    "name_en": "name_en", "english_name": "name_en", "英文名稱": "name_en",
+    "category": "category", "分類": "category",
+    "ibd_score": "ibd_score",
+    "ibd_risks": "ibd_risks", "ibd_risk_factors": "ibd_risks",
+    "chemo_safety": "chemo_safety",
+    "allergens": "allergens", "major_allergens": "allergens",
+    "fodmap": "fodmap", "fodmap_level": "fodmap",
+    "taiwan": "taiwan_available", "taiwan_available": "taiwan_available",
+    "hong_kong": "hk_available", "hk_available": "hk_available",
+    "cooking_methods": "cooking_methods",
+    "alternatives": "alternatives",
+}
+REQUIRED_FIELDS = ["name_zh", "name_en", "category", "ibd_score", "chemo_safety", "fodmap"]
+LIST_FIELDS = ["ibd_risks", "allergens", "cooking_methods", "alternatives"]
+BOOL_FIELDS = ["taiwan_available", "hk_available"]
+
+TRUE_VALUES = {"1", "true", "yes", "y", "t", "是"}
+FALSE_VALUES = {"0", "false", "no", "n", "f", "否"}
+_LIST_SEPARATOR = re.compile(r"\s*[;|]\s*")
+
+class ImportRowError(Exception):
+    """A row that cannot be imported; it is quarantined with this message"""
+
+class ImportRow:
+    """One source row moving through the pipeline"""
+
+    __slots__ = ("source", "line", "raw", "fields", "food")
+
+    def __init__(self, source: str, line: int, raw: Dict[str, Any]):
+        self.source = source
+        self.line = line
+        self.raw = raw
+        self.fields: Dict[str, Any] = {}
+        self.food: Optional[Dict[str, Any]] = None
+
+class StageStats:
+    """Per-stage counters; seconds is time spent inside the stage itself"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.quarantined = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.items_in / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.name,
+            "in": self.items_in,
+            "out": self.items_out,
+            "quarantined": self.quarantined,
+            "seconds": round(self.seconds, 4),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+class FoodImportPipeline:
+    """Streams CSV/TSV rows into generated food items"""
+
+    STAGES = ["parse", "normalize", "validate", "dedupe", "write"]
+
+    def __init__(self, generator: Any, quarantine: Optional[TextIO] = None):
+        self.generator = generator
+        self.quarantine = quarantine
+        self.stats = {name: StageStats(name) for name in self.STAGES}
+        self.validator = generator.validator
+        # 16-byte ids of foods already written; bounded by unique foods, not rows
+        self._seen = set()
+        self.elapsed = 0.0
+
+    def _quarantine(self, row: ImportRow, stage: str, error: str):
+        self.stats[stage].quarantined += 1
+        if self.quarantine is not None:
+            record = {"source": row.source, "line": row.line, "stage": stage, "error": error, "row": row.raw}
+            self.quarantine.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _stage(self, name: str, step: Callable[[ImportRow], Optional[ImportRow]], rows: Iterable[ImportRow]) -> Iterator[ImportRow]:
+        stats = self.stats[name]
+        for row in rows:
+            stats.items_in += 1
+            started = time.perf_counter()
+            try:
+                result = step(row)
+            except ImportRowError as error:
+                result = None
+                self._quarantine(row, name, str(error))
+            stats.seconds += time.perf_counter() - started
+            if result is not None:
+                stats.items_out += 1
+                yield result
+
+    def parse(self, paths: Iterable[str], delimiter: Optional[str] = None) -> Iterator[ImportRow]:
+        """Source stage: read rows lazily; malformed lines are quarantined"""
+        stats = self.stats["parse"]
+        for path in paths:
+            file_delimiter = delimiter or ("\t" if path.lower().endswith((".tsv", ".tab")) else ",")
+            with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+                reader = csv.DictReader(f, delimiter=file_delimiter)
+                while True:
+                    started = time.perf_counter()
+                    try:
+                        raw = next(reader)
+                    except StopIteration:
+                        stats.seconds += time.perf_counter() - started
+                        break
+                    except csv.Error as error:
+                        stats.seconds += time.perf_counter() - started
+                        stats.items_in += 1
+                        self._quarantine(ImportRow(path, reader.line_num, {}), "parse", str(error))
+                        continue
+                    stats.seconds += time.perf_counter() - started
+                    stats.items_in += 1
+                    stats.items_out += 1
+                    yield ImportRow(path, reader.line_num, raw)
+
+    def normalize(self, row: ImportRow) -> ImportRow:
+        if None in row.raw:
+            raise ImportRowError(f"row has {len(row.raw[None])} more values than the header")
+        fields: Dict[str, Any] = {}
+        for column, value in row.raw.items():
+            key = COLUMN_ALIASES.get(column.strip().lower() if column else column)
+            if key is None or value is None:
+                continue
+            fields[key] = value.strip()
+
+        for key in LIST_FIELDS:
+            text = fields.get(key, "")
+            fields[key] = [item for item in _LIST_SEPARATOR.split(text) if item] if text else []
+        for key in BOOL_FIELDS:
+            text = fields.get(key, "").lower()
+            if not text:
+                fields[key] = True
+            elif text in TRUE_VALUES:
+                fields[key] = True
+            elif text in FALSE_VALUES:
+                fields[key] = False
+            else:
+                raise ImportRowError(f"{key}: not a boolean: {fields[key]!r}")
+        for key in ("category", "chemo_safety", "fodmap"):
+            if key in fields:
+                fields[key] = fields[key].lower()
+        fields["allergens"] = [allergen.lower() for allergen in fields["allergens"]]
+        if fields.get("ibd_score"):
+            try:
+                score = float(fields["ibd_score"])
+            except ValueError:
+                raise ImportRowError(f"ibd_score: not a number: {fields['ibd_score']!r}")
+            if not score.is_integer():
+                raise ImportRowError(f"ibd_score: not a whole number: {fields['ibd_score']!r}")
+            fields["ibd_score"] = int(score)
+        row.fields = fields
+        return row
+
+    def validate(self, row: ImportRow) -> ImportRow:
+        fields = row.fields
+        missing = [key for key in REQUIRED_FIELDS if fields.get(key) in (None, "")]
+        if missing:
+            raise ImportRowError(f"missing required fields: {', '.join(missing)}")
+        food = self.generator.generate_food_item(**fields)
+        errors = self.validator.validate(food)
+        if errors:
+            raise ImportRowError("; ".join(errors))
+        row.food = food
+        return row
+
+    def dedupe(self, row: ImportRow) -> Optional[ImportRow]:
+        key = uuid.UUID(row.food["id"]).bytes
+        if key in self._seen:
+            raise ImportRowError(f"duplicate of an earlier row ({row.food['name_zh']} / {row.food['name_en']})")
+        self._seen.add(key)
+        return row
+
+    def iter_foods(self, paths: Iterable[str], delimiter: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Chain the stages; nothing is read until the consumer pulls"""
+        rows = self.parse(paths, delimiter)
+        rows = self._stage("normalize", self.normalize, rows)
+        rows = self._stage("validate", self.validate, rows)
+        rows = self._stage("dedupe", self.dedupe, rows)
+        for row in rows:
+            yield row.food
+
+    def run(self, paths: Iterable[str], stream: TextIO, delimiter: Optional[str] = None, **builders: Any) -> int:
+        """Import files into an NDJSON stream and return the number of foods written"""
+        started = time.perf_counter()
+        total_items = self.generator.write_ndjson(stream, foods=self.iter_foods(paths, delimiter), **builders)
+        elapsed = time.perf_counter() - started
+
+        # Writing happens in the consumer, so its share is what the other stages did not use
+        write = self.stats["write"]
+        write.items_in = write.items_out = total_items
+        write.seconds = max(0.0, elapsed - sum(self.stats[name].seconds for name in self.STAGES[:-1]))
+        self.elapsed = elapsed
+        return total_items
+
+    def report(self) -> List[Dict[str, Any]]:
+        return [self.stats[name].to_dict() for name in self.STAGES]
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Food Filter Index
+Inverted index sidecar for the food database. Each allergen, FODMAP level,
+chemo safety class, IBD score and region maps to a bitset over item
+ordinals, so filters like "no shellfish, low FODMAP, IBD >= 3, available in
+Hong Kong" run as bitset intersections instead of full scans.
+"""
+
+import base64
+import json
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+INDEX_FORMAT = "diet-daily-filter-index"
+INDEX_VERSION = 1
+
+REGIONS = ["taiwan", "hong_kong"]
+
+def sidecar_path(database_path: str, kind: str, extension: str = "json") -> str:
+    """Artifact path next to a database file, e.g. taiwan-hk-foods.<kind>.json"""
+    stem = database_path
+    for suffix in (".ndjson", ".json"):
+        if stem.endswith(suffix):
+            stem = stem[:-len(suffix)]
+            break
+    return f"{stem}.{kind}.{extension}"
+
+def filter_index_path(database_path: str) -> str:
+    """Sidecar path for a database file, e.g. taiwan-hk-foods.index.json"""
+    return sidecar_path(database_path, "index")
+
+class FilterIndexBuilder:
+    """Collects posting lists item by item; works for in-memory and streamed catalogs"""
+
+    def __init__(self):
+        self.total_items = 0
+        self.food_ids: List[Any] = []
+        self.postings: Dict[str, Dict[str, array]] = {
+            "allergen": {},
+            "fodmap_level": {},
+            "chemo_safety": {},
+            "ibd_score": {},
+            "region": {},
+        }
+
+    def _post(self, field: str, key: Any, ordinal: int):
+        postings = self.postings[field]
+        key = str(key)
+        if key not in postings:
+            postings[key] = array("I")
+        postings[key].append(ordinal)
+
+    def add(self, food: Dict[str, Any]) -> int:
+        ordinal = self.total_items
+        self.total_items += 1
+        self.food_ids.append(food.get("id"))
+
+        scores = food.get("medical_scores") or {}
+        for allergen in set(scores.get("major_allergens") or []):
+            self._post("allergen", allergen, ordinal)
+        if scores.get("fodmap_level") is not None:
+            self._post("fodmap_level", scores["fodmap_level"], ordinal)
+        if scores.get("chemo_safety") is not None:
+            self._post("chemo_safety", scores["chemo_safety"], ordinal)
+        if scores.get("ibd_score") is not None:
+            self._post("ibd_score", scores["ibd_score"], ordinal)
+
+        availability = food.get("availability") or {}
+        for region in REGIONS:
+            if availability.get(region):
+                self._post("region", region, ordinal)
+        return ordinal
+
+    def to_dict(self) -> Dict[str, Any]:
+        size = (self.total_items + 7) // 8
+        fields = {}
+        for field, postings in self.postings.items():
+            fields[field] = {}
+            for key in sorted(postings):
+                bitmap = bytearray(size)
+                for ordinal in postings[key]:
+                    bitmap[ordinal >> 3] |= 1 << (ordinal & 7)
+                fields[field][key] = base64.b64encode(bytes(bitmap)).decode("ascii")
+        return {
+            "format": INDEX_FORMAT,
+            "version": INDEX_VERSION,
+            "total_items": self.total_items,
+            "food_ids": self.food_ids,
+            "fields": fields,
+        }
+
+def build_filter_index(foods: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build the serializable index for a sequence of foods, keyed by ordinal"""
+    builder = FilterIndexBuilder()
+    for food in foods:
+        builder.add(food)
+    return builder.to_dict()
+
+def write_filter_index(index: Dict[str, Any], path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+
+class FoodFilterIndex:
+    """Query API over a filter index sidecar"""
+
+    def __init__(self, index: Dict[str, Any]):
+        if index.get("format") != INDEX_FORMAT:
+            raise ValueError("not a Diet Daily filter index")
+        self.total_items = index["total_items"]
+        self.food_ids = index["food_ids"]
+        self.all_items = (1 << self.total_items) - 1
+        # Bitsets are held as Python ints; & | ~ run in C over machine words
+        self.bitsets: Dict[str, Dict[str, int]] = {
+            field: {
+                key: int.from_bytes(base64.b64decode(encoded), "little")
+                for key, encoded in postings.items()
+            }
+            for field, postings in index["fields"].items()
+        }
+
+    @classmethod
+    def load(cls, path: str) -> "FoodFilterIndex":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _union(self, field: str, keys: Iterable[Any]) -> int:
+        bits = 0
+        postings = self.bitsets.get(field, {})
+        for key in keys:
+            bits |= postings.get(str(key), 0)
+        return bits
+
+    def match(
+        self,
+        exclude_allergens: Iterable[str] = (),
+        fodmap_levels: Optional[Iterable[str]] = None,
+        chemo_safety: Optional[Iterable[str]] = None,
+        min_ibd_score: Optional[int] = None,
+        max_ibd_score: Optional[int] = None,
+        regions: Iterable[str] = ()
+    ) -> int:
+        """Return the bitset of matching ordinals
+
+        Multiple values within one filter are OR-ed (e.g. fodmap_levels=["low",
+        "medium"]); filters are AND-ed together. Every listed region must be
+        available.
+        """
+        result = self.all_items
+        excluded = self._union("allergen", exclude_allergens)
+        if excluded:
+            result &= ~excluded
+        if fodmap_levels is not None:
+            result &= self._union("fodmap_level", fodmap_levels)
+        if chemo_safety is not None:
+            result &= self._union("chemo_safety", chemo_safety)
+        if min_ibd_score is not None or max_ibd_score is not None:
+            scores = [
+                key for key in self.bitsets.get("ibd_score", {})
+                if (min_ibd_score is None or float(key) >= min_ibd_score)
+                and (max_ibd_score is None or float(key) <= max_ibd_score)
+            ]
+            result &= self._union("ibd_score", scores)
+        for region in regions:
+            result &= self.bitsets.get("region", {}).get(region, 0)
+        return result
+
+    def query(self, **filters: Any) -> List[int]:
+        """Return matching item ordinals in catalog order"""
+        return bitset_ordinals(self.match(**filters), self.total_items)
+
+    def query_ids(self, **filters: Any) -> List[Any]:
+        return [self.food_ids[ordinal] for ordinal in self.query(**filters)]
+
+    def select(self, foods: List[Dict[str, Any]], **filters: Any) -> List[Dict[str, Any]]:
+        """Pick matching foods out of the database list the index was built from"""
+        return [foods[ordinal] for ordinal in self.query(**filters)]
+
+def bitset_ordinals(bits: int, total_items: int) -> List[int]:
+    """Decode a bitset into sorted ordinals, skipping empty bytes"""
+    ordinals = []
+    data = bits.to_bytes((total_items + 7) // 8, "little")
+    for byte_index, byte in enumerate(data):
+        if not byte:
+            continue
+        base = byte_index << 3
+        for bit in range(8):
+            if byte >> bit & 1:
+                ordinals.append(base + bit)
+    return ordinals
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Compact Food Records
+Array-backed column store for generated food items. Enum-like fields
+(category, chemo_safety, fodmap_level, risk factors, allergens, ...) are
+interned into small integer codes so large working sets stay compact and
+filters run over code columns instead of walking nested dicts. Code
+columns are 16-bit and widen to 32-bit once a vocabulary outgrows them.
+"""
+
+import uuid
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Scalar columns stored as interned codes: (column, parent key, field key)
+SCALAR_FIELDS = [
+    ("name_zh", None, "name_zh"),
+    ("name_en", None, "name_en"),
+    ("category", None, "category"),
+    ("ibd_score", "medical_scores", "ibd_score"),
+    ("chemo_safety", "medical_scores", "chemo_safety"),
+    ("fodmap_level", "medical_scores", "fodmap_level"),
+    ("taiwan", "availability", "taiwan"),
+    ("hong_kong", "availability", "hong_kong"),
+    ("seasonal", "availability", "seasonal"),
+    ("medical_validated", None, "medical_validated"),
+]
+
+# List columns stored as offsets + interned codes (CSR layout)
+LIST_FIELDS = [
+    ("ibd_risk_factors", "medical_scores", "ibd_risk_factors"),
+    ("major_allergens", "medical_scores", "major_allergens"),
+    ("cooking_methods", None, "cooking_methods"),
+    ("alternatives", None, "alternatives"),
+]
+
+# Names are almost always unique, so they are kept as plain strings
+UNINTERNED = {"name_zh", "name_en"}
+
+# Canonical key order of a generated food item
+TOP_LEVEL_KEYS = ["id", "name_zh", "name_en", "category", "medical_scores",
+                  "availability", "cooking_methods", "alternatives", "created",
+                  "medical_validated"]
+NESTED_KEYS = {
+    "medical_scores": ["ibd_score", "ibd_risk_factors", "chemo_safety",
+                       "major_allergens", "fodmap_level"],
+    "availability": ["taiwan", "hong_kong", "seasonal"],
+}
+
+# Presence bit per field path so missing keys survive a round trip
+FIELD_PATHS = [("id",), ("created",), ("medical_scores",), ("availability",)] + [
+    (parent, key) if parent else (key,) for _, parent, key in SCALAR_FIELDS + LIST_FIELDS
+]
+FIELD_BITS = {path: 1 << i for i, path in enumerate(FIELD_PATHS)}
+COLUMN_PATHS = {
+    column: (parent, key) if parent else (key,) for column, parent, key in SCALAR_FIELDS + LIST_FIELDS
+}
+
+# Code stored for values kept in the sparse overrides; never matches a vocabulary entry
+NO_CODE = 0xFFFF
+WIDE_NO_CODE = 0xFFFFFFFF
+
+# created timestamp encodings
+CREATED_TEXT = 0      # kept verbatim in the sparse overrides
+CREATED_PY_ISO = 1    # datetime.isoformat() output, e.g. 2025-09-14T21:45:06.178220
+CREATED_JS_ISO = 2    # Date.toISOString() output, e.g. 2025-09-15T07:44:05.815Z
+
+EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+JS_ISO_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+class Vocabulary:
+    """Bidirectional value <-> code table used to intern repeated field values"""
+
+    __slots__ = ("codes", "values")
+
+    def __init__(self):
+        self.codes: Dict[Tuple[type, Any], int] = {}
+        self.values: List[Any] = []
+
+    def code(self, value: Any) -> int:
+        # Key on the type too so True and 1 do not share a code
+        key = (type(value), value)
+        code = self.codes.get(key)
+        if code is None:
+            code = len(self.values)
+            self.codes[key] = code
+            self.values.append(value)
+        return code
+
+    def matching(self, condition: Any) -> set:
+        """Codes whose values satisfy a value, a collection of values or a predicate"""
+        if callable(condition):
+            return {code for code, value in enumerate(self.values) if condition(value)}
+        if isinstance(condition, (set, frozenset, list, tuple)):
+            wanted = set(condition)
+            return {code for code, value in enumerate(self.values) if value in wanted}
+        return {code for code, value in enumerate(self.values)
+                if value == condition and type(value) is type(condition)}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+def _no_code(codes: array) -> int:
+    return NO_CODE if codes.typecode == "H" else WIDE_NO_CODE
+
+def _widen(codes: array) -> array:
+    """The same codes in 32-bit slots, for a vocabulary that no longer fits below NO_CODE"""
+    return array("I", (WIDE_NO_CODE if code == NO_CODE else code for code in codes))
+
+class FoodColumns:
+    """Column store for food items with lossless conversion to and from the dict shape"""
+
+    def __init__(self):
+        self._size = 0
+        self._presence = array("I")
+        self._ids = bytearray()
+        self._created = array("q")
+        self._created_fmt = array("B")
+        self._names: Dict[str, List[Any]] = {name: [] for name in UNINTERNED}
+        self.vocab: Dict[str, Vocabulary] = {}
+        self._scalars: Dict[str, array] = {}
+        for column, _, _ in SCALAR_FIELDS:
+            if column not in UNINTERNED:
+                self.vocab[column] = Vocabulary()
+                self._scalars[column] = array("H")
+        self._list_offsets: Dict[str, array] = {}
+        self._list_codes: Dict[str, array] = {}
+        for column, _, _ in LIST_FIELDS:
+            self.vocab[column] = Vocabulary()
+            self._list_offsets[column] = array("I", [0])
+            self._list_codes[column] = array("H")
+        # Allergen bitmask for fast exclusion filters (codes below 64)
+        self._allergen_mask = array("Q")
+        # Sparse per-row storage for anything that does not fit a column
+        self._overrides: Dict[int, Dict[Tuple[str, ...], Any]] = {}
+        self._extras: Dict[int, Dict[str, Dict[str, Any]]] = {}
+
+    @classmethod
+    def from_foods(cls, foods: Iterable[Dict[str, Any]]) -> "FoodColumns":
+        columns = cls()
+        for food in foods:
+            columns.append(food)
+        return columns
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(self._size):
+            yield self.to_dict(index)
+
+    def to_foods(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    def _override(self, index: int, path: Tuple[str, ...], value: Any):
+        self._overrides.setdefault(index, {})[path] = value
+
+    def _add_extras(self, index: int, scope: str, source: Dict[str, Any], known: List[str]):
+        extra = {key: value for key, value in source.items() if key not in known}
+        if extra:
+            self._extras.setdefault(index, {})[scope] = extra
+
+    def append(self, food: Dict[str, Any]) -> int:
+        """Add a food item and return its ordinal"""
+        index = self._size
+        presence = 0
+
+        self._add_extras(index, "", food, TOP_LEVEL_KEYS)
+        nested = {}
+        for parent, keys in NESTED_KEYS.items():
+            if parent in food:
+                presence |= FIELD_BITS[(parent,)]
+                if isinstance(food[parent], dict):
+                    nested[parent] = food[parent]
+                    self._add_extras(index, parent, food[parent], keys)
+                else:
+                    self._override(index, (parent,), food[parent])
+            nested.setdefault(parent, {})
+
+        # id: 16 raw bytes when it is a canonical UUID string
+        raw_id = food.get("id")
+        id_bytes = bytes(16)
+        if "id" in food:
+            presence |= FIELD_BITS[("id",)]
+            try:
+                parsed = uuid.UUID(raw_id)
+                if str(parsed) == raw_id:
+                    id_bytes = parsed.bytes
+                else:
+                    self._override(index, ("id",), raw_id)
+            except (TypeError, ValueError, AttributeError):
+                self._override(index, ("id",), raw_id)
+        self._ids += id_bytes
+
+        # created: microseconds since epoch plus the text format it came from
+        created_us, created_fmt = 0, CREATED_TEXT
+        if "created" in food:
+            presence |= FIELD_BITS[("created",)]
+            created_us, created_fmt = _encode_timestamp(food["created"])
+            if created_fmt == CREATED_TEXT:
+                self._override(index, ("created",), food["created"])
+        self._created.append(created_us)
+        self._created_fmt.append(created_fmt)
+
+        for column, parent, key in SCALAR_FIELDS:
+            source = nested[parent] if parent else food
+            path = (parent, key) if parent else (key,)
+            present = key in source
+            if present:
+                presence |= FIELD_BITS[path]
+            value = source.get(key)
+            if column in UNINTERNED:
+                self._names[column].append(value)
+                continue
+            codes = self._scalars[column]
+            try:
+                code = self.vocab[column].code(value)
+            except TypeError:
+                self._override(index, path, value)
+                code = _no_code(codes)
+            else:
+                if code >= _no_code(codes):
+                    codes = self._scalars[column] = _widen(codes)
+            codes.append(code)
+
+        mask = 0
+        for column, parent, key in LIST_FIELDS:
+            source = nested[parent] if parent else food
+            path = (parent, key) if parent else (key,)
+            if key in source:
+                presence |= FIELD_BITS[path]
+            values = source.get(key)
+            codes = self._list_codes[column]
+            if isinstance(values, list):
+                try:
+                    row_codes = [self.vocab[column].code(value) for value in values]
+                except TypeError:
+                    row_codes = []
+                    self._override(index, path, values)
+                if len(self.vocab[column]) > _no_code(codes):
+                    codes = self._list_codes[column] = _widen(codes)
+                codes.extend(row_codes)
+                if column == "major_allergens":
+                    for code in row_codes:
+                        if code < 64:
+                            mask |= 1 << code
+            elif key in source:
+                self._override(index, path, values)
+            self._list_offsets[column].append(len(codes))
+        self._allergen_mask.append(mask)
+
+        self._presence.append(presence)
+        self._size += 1
+        return index
+
+    def value(self, index: int, column: str) -> Any:
+        """Decode a single column value for one row"""
+        overrides = self._overrides.get(index)
+        if overrides and COLUMN_PATHS.get(column) in overrides:
+            return overrides[COLUMN_PATHS[column]]
+        if column in UNINTERNED:
+            return self._names[column][index]
+        if column in self._scalars:
+            return self.vocab[column].values[self._scalars[column][index]]
+        if column in self._list_codes:
+            offsets = self._list_offsets[column]
+            values = self.vocab[column].values
+            return [values[code] for code in self._list_codes[column][offsets[index]:offsets[index + 1]]]
+        if column == "id":
+            return self._decode_id(index)
+        if column == "created":
+            return self._decode_created(index)
+        raise KeyError(column)
+
+    def _decode_id(self, index: int) -> Optional[str]:
+        overrides = self._overrides.get(index, {})
+        if ("id",) in overrides:
+            return overrides[("id",)]
+        return str(uuid.UUID(bytes=bytes(self._ids[index * 16:index * 16 + 16])))
+
+    def _decode_created(self, index: int) -> Any:
+        overrides = self._overrides.get(index, {})
+        if ("created",) in overrides:
+            return overrides[("created",)]
+        return _decode_timestamp(self._created[index], self._created_fmt[index])
+
+    def to_dict(self, index: int) -> Dict[str, Any]:
+        """Rebuild the original generate_food_item dict shape for one row"""
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        presence = self._presence[index]
+        overrides = self._overrides.get(index, {})
+        extras = self._extras.get(index, {})
+
+        def has(path: Tuple[str, ...]) -> bool:
+            return bool(presence & FIELD_BITS[path])
+
+        nested: Dict[str, Any] = {}
+        for parent, keys in NESTED_KEYS.items():
+            if (parent,) in overrides:
+                nested[parent] = overrides[(parent,)]
+                continue
+            section = {}
+            for column, field_parent, key in SCALAR_FIELDS + LIST_FIELDS:
+                if field_parent == parent and has((parent, key)):
+                    section[key] = self.value(index, column)
+            # Restore canonical key order
+            section = {key: section[key] for key in keys if key in section}
+            section.update(extras.get(parent, {}))
+            nested[parent] = section
+
+        food: Dict[str, Any] = {}
+        for key in TOP_LEVEL_KEYS:
+            if key in NESTED_KEYS:
+                if has((key,)):
+                    food[key] = nested[key]
+            elif key == "id":
+                if has(("id",)):
+                    food["id"] = self._decode_id(index)
+            elif key == "created":
+                if has(("created",)):
+                    food["created"] = self._decode_created(index)
+            elif has((key,)):
+                food[key] = self.value(index, key)
+        food.update(extras.get("", {}))
+        return food
+
+    def where(
+        self,
+        exclude_allergens: Iterable[str] = (),
+        exclude_risk_factors: Iterable[str] = (),
+        **conditions: Any
+    ) -> List[int]:
+        """Return ordinals of rows matching every condition
+
+        Scalar conditions are a value, a collection of values, or a predicate
+        over the decoded value, e.g. ``where(fodmap_level="low",
+        ibd_score=lambda s: s >= 3, exclude_allergens=["shellfish"])``.
+        """
+        candidates: Iterable[int] = range(self._size)
+        for column, condition in conditions.items():
+            if column not in self._scalars:
+                raise KeyError(f"unknown filter column: {column}")
+            allowed = self.vocab[column].matching(condition)
+            codes = self._scalars[column]
+            candidates = [i for i in candidates if codes[i] in allowed]
+
+        banned = self.vocab["major_allergens"].matching(list(exclude_allergens)) if exclude_allergens else set()
+        if banned:
+            if all(code < 64 for code in banned):
+                banned_mask = sum(1 << code for code in banned)
+                masks = self._allergen_mask
+                candidates = [i for i in candidates if not masks[i] & banned_mask]
+            else:
+                candidates = self._without_codes(candidates, "major_allergens", banned)
+
+        banned_risks = self.vocab["ibd_risk_factors"].matching(list(exclude_risk_factors)) if exclude_risk_factors else set()
+        if banned_risks:
+            candidates = self._without_codes(candidates, "ibd_risk_factors", banned_risks)
+
+        return list(candidates)
+
+    def _without_codes(self, candidates: Iterable[int], column: str, banned: set) -> List[int]:
+        offsets = self._list_offsets[column]
+        codes = self._list_codes[column]
+        return [i for i in candidates
+                if banned.isdisjoint(codes[offsets[i]:offsets[i + 1]])]
+
+def _encode_timestamp(value: Any) -> Tuple[int, int]:
+    """Encode an ISO timestamp as (microseconds since epoch, format) when it round-trips exactly"""
+    if not isinstance(value, str):
+        return 0, CREATED_TEXT
+    try:
+        if value.endswith("Z"):
+            parsed = datetime.strptime(value, JS_ISO_FORMAT)
+            fmt = CREATED_JS_ISO
+        else:
+            parsed = datetime.fromisoformat(value)
+            fmt = CREATED_PY_ISO
+    except ValueError:
+        return 0, CREATED_TEXT
+    if parsed.tzinfo is not None:
+        return 0, CREATED_TEXT
+    micros = (parsed - EPOCH) // _MICROSECOND
+    if _decode_timestamp(micros, fmt) != value:
+        return 0, CREATED_TEXT
+    return micros, fmt
+
+def _decode_timestamp(micros: int, fmt: int) -> str:
+    moment = EPOCH + micros * _MICROSECOND
+    if fmt == CREATED_JS_ISO:
+        return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+    return moment.isoformat()
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Batch Medical Report Aggregates
+Precomputes medical_reports rows (supabase/schema.sql) for every user and
+every day, ISO week and calendar month that has diary entries, instead of
+building one report at a time on request. summary mirrors
+MedicalReportGenerator.generateSummary (src/lib/medical-report-generator.ts);
+analysis_data carries the risk/safe foods, risk factor counts, symptom
+correlations and category balance; recommendations are the matching advice
+strings.
+
+Input is food_entries / symptom_tracking shaped data from a
+user-food-history.json, an NDJSON or compact history (including synthetic
+.history.ndjson sidecars), or a --sqlite export. Entries are grouped by
+user in the parent and users are aggregated in batches across a process
+pool. Rows are written as NDJSON ready to insert, and optionally into a
+medical_reports table in SQLite; report ids are derived from (user, type,
+start date) so re-running upserts rather than duplicates.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import uuid
+from calendar import monthrange
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from food_copy import pg_uuid
+from food_sqlite import load_history_entries, symptom_rows
+
+REPORT_TYPES = ("daily", "weekly", "monthly")
+REPORT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "reports.diet-daily")
+# Diaries are kept in Taiwan / Hong Kong local time
+DEFAULT_UTC_OFFSET_HOURS = 8
+# Scores are on the 1-5 MedicalScore scale
+RISK_BELOW = 3
+COMPLIANT_FROM = 4
+TOP_FOODS = 5
+TOP_RISK_FACTORS = 8
+TOP_CORRELATIONS = 10
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+RISK_FACTOR_ADVICE = {
+    "high sodium": "減少攝取加工食品和調味料，選擇新鮮食材",
+    "spicy food": "IBD患者應避免辛辣食物，可能加重炎症",
+    "high fat": "選擇健康油脂，避免油炸和高脂肪食物",
+    "gluten": "考慮無麩質飲食，諮詢營養師建議",
+    "dairy": "可嘗試乳糖不耐症檢測，選擇替代品",
+    "processed food": "優先選擇天然、未加工的食物",
+    "fried food": "改用蒸、煮、烤等健康烹飪方式",
+}
+DEFAULT_ADVICE = "請諮詢醫療專業人員獲得個人化建議"
+
+MEDICAL_REPORTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS medical_reports (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    report_type TEXT NOT NULL CHECK (report_type IN ('daily', 'weekly', 'monthly', 'custom')),
+    date_range_start TEXT NOT NULL,
+    date_range_end TEXT NOT NULL,
+    summary TEXT NOT NULL DEFAULT '{}' CHECK (json_valid(summary)),
+    analysis_data TEXT NOT NULL DEFAULT '{}' CHECK (json_valid(analysis_data)),
+    recommendations TEXT DEFAULT '[]' CHECK (json_valid(recommendations)),
+    pdf_url TEXT,
+    file_size INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_medical_reports_user_id ON medical_reports(user_id);
+CREATE INDEX IF NOT EXISTS idx_medical_reports_date_range ON medical_reports(date_range_start, date_range_end);
+"""
+REPORT_COLUMNS = [
+    "id", "user_id", "title", "report_type", "date_range_start", "date_range_end",
+    "summary", "analysis_data", "recommendations", "pdf_url", "file_size", "created_at", "updated_at",
+]
+
+# (consumed_at, entry id, food id, food name, category, score, risk factors, allergens, symptoms)
+ReportEntry = Tuple[str, Any, Any, str, str, Optional[float], Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]
+# (recorded_at, symptom type, severity)
+SymptomEvent = Tuple[str, str, float]
+
+def report_entry(entry: Dict[str, Any]) -> ReportEntry:
+    """A FoodHistoryEntry reduced to what the aggregates need"""
+    food = entry.get("foodData") or {}
+    scores = food.get("medical_scores") or {}
+    medical_score = entry.get("medicalScore") or {}
+    symptoms = entry.get("symptoms") or {}
+    return (
+        entry.get("consumedAt"),
+        entry.get("id"),
+        entry.get("foodId") or food.get("id"),
+        food.get("name_zh") or entry.get("foodName") or "",
+        food.get("category") or "",
+        medical_score.get("score", medical_score.get("overall_score")),
+        tuple(scores.get("ibd_risk_factors") or ()),
+        tuple(scores.get("major_allergens") or ()),
+        tuple(symptoms.get("before") or ()) + tuple(symptoms.get("after") or ()),
+    )
+
+def report_entry_from_row(row: Dict[str, Any]) -> ReportEntry:
+    """A food_entries row joined with its diet_daily_foods medical_scores/allergens"""
+    scores = json.loads(row.get("medical_scores") or "{}")
+    return (
+        row["consumed_at"],
+        row["id"],
+        row.get("food_id"),
+        row.get("food_name") or "",
+        row.get("food_category") or "",
+        row.get("medical_score"),
+        tuple(scores.get("ibd_risk_factors") or ()),
+        tuple(json.loads(row.get("allergens") or "[]")),
+        tuple(json.loads(row.get("symptoms_before") or "[]")) + tuple(json.loads(row.get("symptoms_after") or "[]")),
+    )
+
+UserData = Dict[str, Tuple[List[ReportEntry], List[SymptomEvent]]]
+
+def _user(users: UserData, user_id: str) -> Tuple[List[ReportEntry], List[SymptomEvent]]:
+    data = users.get(user_id)
+    if data is None:
+        data = users[user_id] = ([], [])
+    return data
+
+def read_history(path: str) -> UserData:
+    """Group a history file's entries, and the symptom_tracking rows they imply, by user"""
+    users: UserData = {}
+    for entry in load_history_entries(path):
+        user_id = entry.get("userId")
+        if not user_id or not entry.get("consumedAt"):
+            continue
+        entries, symptoms = _user(users, user_id)
+        entries.append(report_entry(entry))
+        # Same derivation as the --sqlite export: one row per symptom after a meal
+        symptoms.extend((row[4], row[2], row[3]) for row in symptom_rows(entry))
+    return users
+
+def read_sqlite(path: str) -> UserData:
+    """Group food_entries and symptom_tracking rows of a --sqlite export by user"""
+    users: UserData = {}
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute(
+            "SELECT e.*, f.medical_scores, f.allergens FROM food_entries e "
+            "LEFT JOIN diet_daily_foods f ON f.id = e.food_id")
+        for row in rows:
+            _user(users, row["user_id"])[0].append(report_entry_from_row(dict(row)))
+        for user_id, recorded_at, symptom_type, severity in conn.execute(
+                "SELECT user_id, recorded_at, symptom_type, severity FROM symptom_tracking"):
+            _user(users, user_id)[1].append((recorded_at, symptom_type, severity))
+    finally:
+        conn.close()
+    return users
+
+def _local_date(timestamp: str, tz: timezone) -> date:
+    moment = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(tz).date()
+
+def period_range(day: date, report_type: str) -> Tuple[date, date]:
+    """Inclusive (start, end) of the day, ISO week or calendar month containing ``day``"""
+    if report_type == "daily":
+        return day, day
+    if report_type == "weekly":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    return day.replace(day=1), day.replace(day=monthrange(day.year, day.month)[1])
+
+def report_title(start: date, report_type: str) -> str:
+    """Titles in the style of MedicalReportGenerator.generatePeriodDescription"""
+    if report_type == "weekly":
+        return f"{start.year}年{start.month}月第{(start.day + 6) // 7}週 飲食報告"
+    if report_type == "monthly":
+        return f"{start.year}年{start.month}月 飲食報告"
+    return f"{start.year}年{start.month}月{start.day}日 飲食報告"
+
+def _percent(part: int, whole: int) -> int:
+    return round(part / whole * 100) if whole else 0
+
+def _top(counter: Dict[str, int], limit: int) -> List[Tuple[str, int]]:
+    return sorted(counter.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+def aggregate(entries: Sequence[ReportEntry], symptoms: Sequence[SymptomEvent]) -> Tuple[Dict[str, Any], Dict[str, Any], List[str]]:
+    """(summary, analysis_data, recommendations) for the entries of one report period"""
+    total = len(entries)
+    scores = [entry[5] for entry in entries if entry[5] is not None]
+    risky = [entry for entry in entries if entry[5] is not None and entry[5] < RISK_BELOW]
+    compliant = sum(1 for entry in entries if entry[5] is not None and entry[5] >= COMPLIANT_FROM)
+    with_symptoms = sum(1 for entry in entries if entry[8])
+
+    summary = {
+        "totalFoods": total,
+        "uniqueFoods": len({entry[2] for entry in entries}),
+        "averageMedicalScore": round(sum(scores) / len(scores), 2) if scores else None,
+        "riskFactorExposure": _percent(len(risky), total),
+        "symptomFrequency": _percent(with_symptoms, total),
+        "complianceScore": _percent(compliant, total),
+        "symptomEvents": len(symptoms),
+        "averageSymptomSeverity": (round(sum(event[2] or 0 for event in symptoms) / len(symptoms), 2)
+                                   if symptoms else None),
+    }
+
+    food_counts: Dict[str, List[Any]] = {}
+    risk_factors: Dict[str, int] = {}
+    allergens: Dict[str, int] = {}
+    categories: Dict[str, int] = {}
+    correlations: Dict[Tuple[str, str], int] = {}
+    for _, _, _, name, category, score, risks, food_allergens, entry_symptoms in entries:
+        counts = food_counts.get(name)
+        if counts is None:
+            counts = food_counts[name] = [0, score, risks]
+        counts[0] += 1
+        for risk in risks:
+            risk_factors[risk] = risk_factors.get(risk, 0) + 1
+        for allergen in food_allergens:
+            allergens[allergen] = allergens.get(allergen, 0) + 1
+        categories[category] = categories.get(category, 0) + 1
+        for symptom in entry_symptoms:
+            correlations[(name, symptom)] = correlations.get((name, symptom), 0) + 1
+
+    ranked = sorted(food_counts.items(), key=lambda item: (-item[1][0], item[0]))
+    analysis = {
+        "topRiskFoods": [
+            {"foodName": name, "frequency": count, "riskScore": score, "mainConcerns": list(risks[:3])}
+            for name, (count, score, risks) in ranked if score is not None and score < RISK_BELOW
+        ][:TOP_FOODS],
+        "safeFoods": [
+            {"foodName": name, "frequency": count, "medicalScore": score}
+            for name, (count, score, _) in ranked if score is not None and score >= COMPLIANT_FROM
+        ][:TOP_FOODS],
+        "riskFactorTrends": [
+            {"factor": factor, "frequency": count, "recommendation": RISK_FACTOR_ADVICE.get(factor, DEFAULT_ADVICE)}
+            for factor, count in _top(risk_factors, TOP_RISK_FACTORS)
+        ],
+        "symptomCorrelations": [
+            {"foodName": name, "symptomType": symptom, "occurrences": count,
+             "share": round(count / food_counts[name][0], 2)}
+            for (name, symptom), count in sorted(correlations.items(), key=lambda item: (-item[1], item[0]))
+        ][:TOP_CORRELATIONS],
+        "symptomTypes": _count_types(symptoms),
+        "allergenExposures": allergens,
+        "nutritionalBalance": {category: _percent(count, total) for category, count in categories.items()},
+    }
+    return summary, analysis, _recommendations(analysis, summary)
+
+def _count_types(symptoms: Sequence[SymptomEvent]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for _, symptom_type, _ in symptoms:
+        counts[symptom_type] = counts.get(symptom_type, 0) + 1
+    return counts
+
+def _recommendations(analysis: Dict[str, Any], summary: Dict[str, Any]) -> List[str]:
+    """Advice strings matching generateNutritionalRecommendations and the risk factor advice"""
+    recommendations = [trend["recommendation"] for trend in analysis["riskFactorTrends"][:3]]
+    balance = analysis["nutritionalBalance"]
+    if balance.get("vegetable", 0) < 30:
+        recommendations.append("建議增加蔬菜攝取量至每日30%以上")
+    if balance.get("protein", 0) < 20:
+        recommendations.append("確保足夠的蛋白質攝取，建議佔每日攝取20%以上")
+    if balance.get("grain", 0) > 40:
+        recommendations.append("考慮減少精製穀物，增加全穀類選擇")
+    if balance.get("snack", 0) > 20:
+        recommendations.append("減少點心類食物，選擇營養密度更高的食物")
+    if summary["symptomFrequency"] > 20:
+        recommendations.append("症狀發生頻率較高，建議諮詢醫生")
+    # Several risk factors can share the default advice
+    return list(dict.fromkeys(recommendations))
+
+def user_reports(user_id: str, entries: Sequence[ReportEntry], symptoms: Sequence[SymptomEvent],
+                 report_types: Sequence[str], utc_offset_hours: float, generated_at: str) -> List[Dict[str, Any]]:
+    """Every report row for one user, one per period that has diary entries"""
+    tz = timezone(timedelta(hours=utc_offset_hours))
+    entry_days = [_local_date(entry[0], tz) for entry in entries]
+    symptom_days = [_local_date(event[0], tz) for event in symptoms if event[0]]
+    # medical_reports.user_id is a UUID column; non-UUID history ids map the same way food_copy maps them
+    user_id = pg_uuid(user_id)
+    rows = []
+    for report_type in report_types:
+        periods: Dict[date, Tuple[List[ReportEntry], List[SymptomEvent]]] = {}
+        for day, entry in zip(entry_days, entries):
+            start, _ = period_range(day, report_type)
+            bucket = periods.get(start)
+            if bucket is None:
+                bucket = periods[start] = ([], [])
+            bucket[0].append(entry)
+        for day, event in zip(symptom_days, (event for event in symptoms if event[0])):
+            bucket = periods.get(period_range(day, report_type)[0])
+            # Symptoms outside any diary period have nothing to be reported against
+            if bucket is not None:
+                bucket[1].append(event)
+
+        for start in sorted(periods):
+            period_entries, period_symptoms = periods[start]
+            summary, analysis, recommendations = aggregate(period_entries, period_symptoms)
+            end = period_range(start, report_type)[1]
+            rows.append({
+                "id": str(uuid.uuid5(REPORT_ID_NAMESPACE, f"{user_id}|{report_type}|{start.isoformat()}")),
+                "user_id": user_id,
+                "title": report_title(start, report_type),
+                "report_type": report_type,
+                "date_range_start": start.isoformat(),
+                "date_range_end": end.isoformat(),
+                "summary": summary,
+                "analysis_data": analysis,
+                "recommendations": recommendations,
+                "pdf_url": None,
+                "file_size": None,
+                "created_at": generated_at,
+                "updated_at": generated_at,
+            })
+    return rows
+
+def report_batch(batch: List[Tuple[str, List[ReportEntry], List[SymptomEvent]]], report_types: Sequence[str],
+                 utc_offset_hours: float, generated_at: str) -> Tuple[List[Dict[str, Any]], int]:
+    """Worker entry point: rows for a batch of users plus the entries they covered"""
+    rows = []
+    for user_id, entries, symptoms in batch:
+        rows.extend(user_reports(user_id, entries, symptoms, report_types, utc_offset_hours, generated_at))
+    return rows, sum(len(entries) for _, entries, _ in batch)
+
+def _batches(users: UserData, batch_size: int) -> Iterator[List[Tuple[str, List[ReportEntry], List[SymptomEvent]]]]:
+    batch = []
+    for user_id in sorted(users):
+        entries, symptoms = users[user_id]
+        batch.append((user_id, entries, symptoms))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class ReportProgress:
+    """Users/entries/rows done so far, printed at most once per interval"""
+
+    def __init__(self, total_users: int, total_entries: int, stream=sys.stderr):
+        self.total_users = total_users
+        self.total_entries = total_entries
+        self.stream = stream
+        self.users = 0
+        self.entries = 0
+        self.rows = 0
+        self.started = time.perf_counter()
+        self._last = self.started
+
+    def update(self, users: int, entries: int, rows: int):
+        self.users += users
+        self.entries += entries
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self._last >= PROGRESS_INTERVAL_SECONDS or self.users == self.total_users:
+            self._last = now
+            elapsed = now - self.started
+            rate = self.entries / elapsed if elapsed else 0.0
+            eta = (self.total_entries - self.entries) / rate if rate else 0.0
+            print(f"⏳ {self.users}/{self.total_users} users ({self.users / max(self.total_users, 1):.0%}), "
+                  f"{self.rows} reports, {rate:,.0f} entries/s, ETA {eta:.0f}s", file=self.stream)
+
+def generate_reports(
+    users: UserData,
+    write,
+    report_types: Sequence[str] = REPORT_TYPES,
+    jobs: int = 1,
+    batch_size: int = 64,
+    utc_offset_hours: float = DEFAULT_UTC_OFFSET_HOURS,
+    progress: Optional[ReportProgress] = None
+) -> Dict[str, Any]:
+    """Aggregate every user's reports, calling ``write(rows)`` per batch in user order; returns metrics"""
+    generated_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    started = time.perf_counter()
+    counts = {report_type: 0 for report_type in report_types}
+    batches = _batches(users, batch_size)
+
+    def consume(results: Iterable[Tuple[List[Dict[str, Any]], int]]):
+        for (rows, entries), users_in_batch in results:
+            for row in rows:
+                counts[row["report_type"]] += 1
+            write(rows)
+            if progress is not None:
+                progress.update(users_in_batch, entries, len(rows))
+
+    if jobs == 1:
+        consume(((report_batch(batch, report_types, utc_offset_hours, generated_at), len(batch)) for batch in batches))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            batch_list = list(batches)
+            results = pool.map(report_batch, batch_list, [report_types] * len(batch_list),
+                               [utc_offset_hours] * len(batch_list), [generated_at] * len(batch_list))
+            consume(zip(results, (len(batch) for batch in batch_list)))
+
+    seconds = time.perf_counter() - started
+    entries = sum(len(data[0]) for data in users.values())
+    return {
+        "users": len(users),
+        "entries": entries,
+        "symptoms": sum(len(data[1]) for data in users.values()),
+        "reports": counts,
+        "jobs": jobs,
+        "seconds": round(seconds, 3),
+        "entries_per_second": round(entries / seconds, 1) if seconds else 0.0,
+        "reports_per_second": round(sum(counts.values()) / seconds, 1) if seconds else 0.0,
+    }
+
+def reports_path(source: str) -> str:
+    """Rows next to the source, e.g. user-food-history.reports.ndjson"""
+    root, _ = os.path.splitext(source)
+    return f"{root}.reports.ndjson"
+
+def _sqlite_row(row: Dict[str, Any]) -> Tuple[Any, ...]:
+    return tuple(json.dumps(row[column], ensure_ascii=False) if column in ("summary", "analysis_data", "recommendations")
+                 else row[column] for column in REPORT_COLUMNS)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    root = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(description="Precompute daily/weekly/monthly medical report rows for every user")
+    parser.add_argument("--history", default=str(root / "data" / "user-food-history.json"),
+                        help="history JSON, NDJSON/compact history, or a --sqlite export with food_entries")
+    parser.add_argument("--output", help="NDJSON rows for medical_reports (default: <history>.reports.ndjson)")
+    parser.add_argument("--sqlite", metavar="PATH", help="also upsert the rows into medical_reports in this SQLite database")
+    parser.add_argument("--types", default=",".join(REPORT_TYPES), help="report types to build (default: all)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=64, help="users per worker task (default: 64)")
+    parser.add_argument("--utc-offset", type=float, default=DEFAULT_UTC_OFFSET_HOURS,
+                        help="hours from UTC used to cut days, weeks and months (default: 8)")
+    args = parser.parse_args(argv)
+    report_types = [report_type.strip() for report_type in args.types.split(",") if report_type.strip()]
+    unknown = [report_type for report_type in report_types if report_type not in REPORT_TYPES]
+    if unknown:
+        parser.error(f"unknown report types: {', '.join(unknown)}")
+    output = args.output or reports_path(args.history)
+
+    started = time.perf_counter()
+    is_sqlite = args.history.endswith((".db", ".sqlite", ".sqlite3"))
+    users = read_sqlite(args.history) if is_sqlite else read_history(args.history)
+    read_seconds = time.perf_counter() - started
+    total_entries = sum(len(data[0]) for data in users.values())
+    print(f"📥 Read {total_entries} entries for {len(users)} users in {read_seconds:.2f}s")
+
+    conn = None
+    if args.sqlite:
+        conn = sqlite3.connect(args.sqlite)
+        conn.executescript(MEDICAL_REPORTS_SCHEMA)
+    # A re-run refreshes a report in place; created_at keeps the time it was first generated
+    insert = (f"INSERT INTO medical_reports ({', '.join(REPORT_COLUMNS)}) "
+              f"VALUES ({', '.join('?' for _ in REPORT_COLUMNS)}) "
+              "ON CONFLICT(id) DO UPDATE SET "
+              + ", ".join(f"{column} = excluded.{column}" for column in REPORT_COLUMNS
+                          if column not in ("id", "created_at")))
+
+    with open(output, 'w', encoding='utf-8') as f:
+        def write(rows: List[Dict[str, Any]]):
+            f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+            if conn is not None:
+                conn.executemany(insert, (_sqlite_row(row) for row in rows))
+
+        metrics = generate_reports(users, write, report_types, max(1, args.jobs), args.batch_size,
+                                   args.utc_offset, ReportProgress(len(users), total_entries))
+    if conn is not None:
+        conn.commit()
+        conn.close()
+
+    reports = ", ".join(f"{count} {report_type}" for report_type, count in metrics["reports"].items())
+    print(f"🩺 Built {reports} reports in {metrics['seconds']:.2f}s with {metrics['jobs']} workers "
+          f"({metrics['entries_per_second']:,.0f} entries/s, {metrics['reports_per_second']:,.0f} reports/s)")
+    print(f"📄 Rows: {output}")
+    if args.sqlite:
+        print(f"🗄️  Upserted into medical_reports: {args.sqlite}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Incremental History Rollups
+Materialized per-user daily and ISO-weekly summaries of the food history:
+entry counts, average IBD and medical scores, risk factor and allergen
+counts, meal mix and entries with symptoms. Buckets keep sums and counters
+rather than averages, so appending an entry touches two buckets and costs
+O(1) regardless of history size.
+
+The state file remembers how far into the source it has read: a byte
+offset for NDJSON histories, the byte offset of the last entry read from
+the entries array of user-food-history.json and a rowid for the
+food_entries table of a --sqlite export. refresh() only reads what was
+appended since, and appends just the buckets it touched to a journal next
+to the state; the state itself is rewritten once the journal outgrows it.
+Edits and deletions are not visible to an append cursor; compact()
+rebuilds every summary from scratch and reports any bucket the
+incremental path got wrong.
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from food_history_compact import is_compact_history
+
+STATE_FORMAT = "diet-daily-rollups"
+STATE_VERSION = 1
+# Diaries are kept in Taiwan / Hong Kong local time
+DEFAULT_UTC_OFFSET_HOURS = 8
+TOP_RISK_FACTORS = 5
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# (user_id, entry id, consumed_at, ibd_score, medical_score, risk factors, allergens, meal type, has symptoms)
+RollupEvent = Tuple[str, Any, str, Optional[int], Optional[float], List[str], List[str], Optional[str], bool]
+
+def _meal_for_hour(hour: int) -> str:
+    if hour < 11:
+        return "breakfast"
+    if hour < 15:
+        return "lunch"
+    if 17 <= hour < 22:
+        return "dinner"
+    return "snack"
+
+def event_from_entry(entry: Dict[str, Any]) -> RollupEvent:
+    """A FoodHistoryEntry (data/user-food-history.json) as a rollup event"""
+    food = entry.get("foodData") or {}
+    scores = food.get("medical_scores") or {}
+    ibd_score = scores.get("ibd_score")
+    symptoms = entry.get("symptoms") or {}
+    return (
+        entry.get("userId"),
+        entry.get("id"),
+        entry.get("consumedAt"),
+        ibd_score if isinstance(ibd_score, int) else None,
+        (entry.get("medicalScore") or {}).get("score"),
+        list(scores.get("ibd_risk_factors") or []),
+        list(scores.get("major_allergens") or []),
+        entry.get("mealType"),
+        bool(symptoms.get("after")),
+    )
+
+def event_from_row(row: Dict[str, Any]) -> RollupEvent:
+    """A food_entries row joined with its diet_daily_foods medical_scores/allergens"""
+    scores = json.loads(row.get("medical_scores") or "{}")
+    ibd_score = scores.get("ibd_score")
+    return (
+        row.get("user_id"),
+        row.get("id"),
+        row.get("consumed_at"),
+        ibd_score if isinstance(ibd_score, int) else None,
+        row.get("medical_score"),
+        list(scores.get("ibd_risk_factors") or []),
+        json.loads(row.get("allergens") or "[]"),
+        row.get("meal_type"),
+        bool(json.loads(row.get("symptoms_after") or "[]")),
+    )
+
+def _new_bucket() -> Dict[str, Any]:
+    return {
+        "entries": 0,
+        "ibd_score_sum": 0, "ibd_score_count": 0,
+        "medical_score_sum": 0.0, "medical_score_count": 0,
+        "risk_factors": {}, "allergens": {}, "meals": {},
+        "symptom_entries": 0,
+    }
+
+def _count(counter: Dict[str, int], key: str):
+    counter[key] = counter.get(key, 0) + 1
+
+def summarize(bucket: Dict[str, Any], top: int = TOP_RISK_FACTORS) -> Dict[str, Any]:
+    """Dashboard view of one bucket"""
+    return {
+        "entries": bucket["entries"],
+        "avg_ibd_score": round(bucket["ibd_score_sum"] / bucket["ibd_score_count"], 2) if bucket["ibd_score_count"] else None,
+        "avg_medical_score": (round(bucket["medical_score_sum"] / bucket["medical_score_count"], 2)
+                              if bucket["medical_score_count"] else None),
+        "top_risk_factors": sorted(bucket["risk_factors"].items(), key=lambda item: (-item[1], item[0]))[:top],
+        "allergen_exposures": dict(bucket["allergens"]),
+        "meals": dict(bucket["meals"]),
+        "symptom_entries": bucket["symptom_entries"],
+    }
+
+class RollupEngine:
+    """Per-user daily and weekly rollup buckets plus the source cursor"""
+
+    def __init__(self, utc_offset_hours: float = DEFAULT_UTC_OFFSET_HOURS):
+        self.utc_offset_hours = utc_offset_hours
+        self.tz = timezone(timedelta(hours=utc_offset_hours))
+        # user -> {"daily": {YYYY-MM-DD: bucket}, "weekly": {YYYY-Www: bucket}}
+        self.users: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = {}
+        self.cursor: Dict[str, Any] = {}
+        self.applied = 0
+        self.skipped = 0
+        # (user, period, key) of buckets changed since the state was last written
+        self.dirty: Set[Tuple[str, str, str]] = set()
+
+    def add(self, event: RollupEvent) -> bool:
+        """Fold one entry into its day and week; False if it has no user or timestamp"""
+        user_id, _, consumed_at, ibd_score, medical_score, risks, allergens, meal, has_symptoms = event
+        if not user_id or not consumed_at:
+            self.skipped += 1
+            return False
+        local = datetime.fromisoformat(consumed_at.replace("Z", "+00:00"))
+        if local.tzinfo is None:
+            local = local.replace(tzinfo=timezone.utc)
+        local = local.astimezone(self.tz)
+        year, week, _ = local.isocalendar()
+        meal = meal or _meal_for_hour(local.hour)
+
+        periods = self.users.setdefault(user_id, {"daily": {}, "weekly": {}})
+        day_key = local.date().isoformat()
+        day = periods["daily"].get(day_key)
+        if day is None:
+            day = periods["daily"][day_key] = _new_bucket()
+        week_key = f"{year}-W{week:02d}"
+        week_bucket = periods["weekly"].get(week_key)
+        if week_bucket is None:
+            week_bucket = periods["weekly"][week_key] = _new_bucket()
+        self.dirty.add((user_id, "daily", day_key))
+        self.dirty.add((user_id, "weekly", week_key))
+
+        for bucket in (day, week_bucket):
+            bucket["entries"] += 1
+            if ibd_score is not None:
+                bucket["ibd_score_sum"] += ibd_score
+                bucket["ibd_score_count"] += 1
+            if medical_score is not None:
+                bucket["medical_score_sum"] += medical_score
+                bucket["medical_score_count"] += 1
+            for risk in risks:
+                _count(bucket["risk_factors"], risk)
+            for allergen in allergens:
+                _count(bucket["allergens"], allergen)
+            _count(bucket["meals"], meal)
+            if has_symptoms:
+                bucket["symptom_entries"] += 1
+        self.applied += 1
+        return True
+
+    def add_all(self, events: Iterable[RollupEvent]) -> int:
+        added = 0
+        for event in events:
+            added += self.add(event)
+        return added
+
+    def summary(self, user_id: str, period: str = "daily", key: Optional[str] = None) -> Dict[str, Any]:
+        """Summaries for one user, either every bucket of a period or just ``key``"""
+        buckets = self.users.get(user_id, {}).get(period, {})
+        if key is not None:
+            return summarize(buckets[key]) if key in buckets else summarize(_new_bucket())
+        return {bucket_key: summarize(bucket) for bucket_key, bucket in sorted(buckets.items())}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "format": STATE_FORMAT,
+            "version": STATE_VERSION,
+            "utc_offset_hours": self.utc_offset_hours,
+            "cursor": self.cursor,
+            "applied": self.applied,
+            "skipped": self.skipped,
+            "users": self.users,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "RollupEngine":
+        if state.get("format") != STATE_FORMAT or state.get("version") != STATE_VERSION:
+            raise ValueError("not a rollup state file this version can read")
+        engine = cls(state.get("utc_offset_hours", DEFAULT_UTC_OFFSET_HOURS))
+        engine.users = state["users"]
+        engine.cursor = state.get("cursor", {})
+        engine.applied = state.get("applied", 0)
+        engine.skipped = state.get("skipped", 0)
+        return engine
+
+    def journal_record(self) -> Dict[str, Any]:
+        """The cursor, counters and dirty buckets, as one journal line replays them"""
+        return {
+            "cursor": self.cursor,
+            "applied": self.applied,
+            "skipped": self.skipped,
+            "buckets": [[user_id, period, key, self.users[user_id][period][key]]
+                        for user_id, period, key in sorted(self.dirty)],
+        }
+
+    def replay(self, record: Dict[str, Any]):
+        for user_id, period, key, bucket in record["buckets"]:
+            self.users.setdefault(user_id, {"daily": {}, "weekly": {}})[period][key] = bucket
+        self.cursor = record["cursor"]
+        self.applied = record["applied"]
+        self.skipped = record["skipped"]
+
+def rollup_state_path(source: str) -> str:
+    """State file next to the source, e.g. user-food-history.rollups.json"""
+    root, _ = os.path.splitext(source)
+    return f"{root}.rollups.json"
+
+def rollup_journal_path(state_path: str) -> str:
+    """Buckets touched by refreshes since the state was last written"""
+    return f"{state_path}.journal"
+
+def _source_kind(source: str) -> str:
+    if source.endswith(".ndjson"):
+        return "ndjson"
+    if source.endswith((".db", ".sqlite", ".sqlite3")):
+        return "sqlite"
+    return "json"
+
+def read_appended(source: str, cursor: Dict[str, Any]) -> Tuple[Iterator[RollupEvent], Dict[str, Any]]:
+    """Events appended to ``source`` since ``cursor``, and a cursor dict that is filled in as they are read
+
+    Raises LookupError when the source no longer continues from the cursor
+    (truncated, rewritten or a different file), so the caller can compact.
+    """
+    kind = _source_kind(source)
+    if kind != "sqlite" and is_compact_history(source):
+        # Compact blocks have no append point to keep a cursor on
+        raise LookupError(f"{source} is a compact history; "
+                          f"run food_history_compact.py expand on it and roll up the result")
+    if cursor and (cursor.get("source") != os.path.abspath(source) or cursor.get("kind") != kind):
+        raise LookupError("state was built from a different source")
+    position = cursor.get("position", 0)
+    last_id = cursor.get("last_id")
+    new_cursor = {"source": os.path.abspath(source), "kind": kind, "position": position, "last_id": last_id}
+
+    if kind == "ndjson":
+        if os.path.getsize(source) < position:
+            raise LookupError("source is shorter than the cursor")
+
+        def ndjson_events() -> Iterator[RollupEvent]:
+            with open(source, 'rb') as f:
+                f.seek(position)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # A writer is mid-line; pick it up on the next refresh
+                        break
+                    new_cursor["position"] += len(line)
+                    if line.strip():
+                        event = event_from_entry(json.loads(line))
+                        new_cursor["last_id"] = event[1]
+                        yield event
+        return ndjson_events(), new_cursor
+
+    if kind == "json":
+        offset = cursor.get("offset")
+        if position and offset is None:
+            raise LookupError("cursor has no byte offset")
+        new_cursor["offset"] = offset
+        with open(source, 'rb') as f:
+            if offset is not None:
+                if os.path.getsize(source) < offset:
+                    raise LookupError("source is shorter than the cursor")
+                # Re-read the last entry so a rewritten prefix is noticed before anything is applied
+                f.seek(offset)
+            text = f.read().decode('utf-8')
+        if offset is None:
+            index = _entries_array_start(text)
+            new_cursor["offset"] = len(text[:index].encode('utf-8'))
+            text, index = text[index:], 0
+        else:
+            index = 0
+        if position:
+            try:
+                previous, index = _decoder.raw_decode(text, _skip(text, 0))
+            except json.JSONDecodeError:
+                raise LookupError("entries before the cursor changed")
+            if not isinstance(previous, dict) or previous.get("id") != last_id:
+                raise LookupError("entries before the cursor changed")
+
+        def json_events() -> Iterator[RollupEvent]:
+            base, seen = new_cursor["offset"], 0
+            for start, entry in _array_items(text, index, first=not position):
+                base += len(text[seen:start].encode('utf-8'))
+                seen = start
+                new_cursor["position"] += 1
+                new_cursor["offset"] = base
+                new_cursor["last_id"] = entry.get("id")
+                yield event_from_entry(entry)
+        return json_events(), new_cursor
+
+    conn = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    if position and conn.execute("SELECT id FROM food_entries WHERE rowid = ?", (position,)).fetchone() is None:
+        conn.close()
+        raise LookupError("cursor row is gone from food_entries")
+
+    def sqlite_events() -> Iterator[RollupEvent]:
+        try:
+            rows = conn.execute(
+                "SELECT e.rowid AS rowid, e.*, f.medical_scores, f.allergens FROM food_entries e "
+                "LEFT JOIN diet_daily_foods f ON f.id = e.food_id WHERE e.rowid > ? ORDER BY e.rowid",
+                (position,))
+            for row in rows:
+                new_cursor["position"] = row["rowid"]
+                new_cursor["last_id"] = row["id"]
+                yield event_from_row(dict(row))
+        finally:
+            conn.close()
+    return sqlite_events(), new_cursor
+
+def _skip(text: str, index: int) -> int:
+    return _WHITESPACE.match(text, index).end()
+
+def _entries_array_start(text: str) -> int:
+    """Index just past the '[' of the top-level "entries" array"""
+    index = _skip(text, 0)
+    if text[index:index + 1] != "{":
+        raise LookupError("history is not a JSON object")
+    index = _skip(text, index + 1)
+    while text[index:index + 1] == '"':
+        key, index = _decoder.raw_decode(text, index)
+        index = _skip(text, index)
+        if text[index:index + 1] != ":":
+            raise LookupError("history is not valid JSON")
+        index = _skip(text, index + 1)
+        if key == "entries" and text[index:index + 1] == "[":
+            return index + 1
+        _, index = _decoder.raw_decode(text, index)
+        index = _skip(text, index)
+        if text[index:index + 1] == ",":
+            index = _skip(text, index + 1)
+    raise LookupError("history has no entries array")
+
+def _array_items(text: str, index: int, first: bool) -> Iterator[Tuple[int, Any]]:
+    """(start index, item) for each array item from ``index`` up to the closing ']'"""
+    while True:
+        index = _skip(text, index)
+        if text[index:index + 1] in ("]", ""):
+            return
+        if not first:
+            if text[index] != ",":
+                raise LookupError("entries array is malformed")
+            index = _skip(text, index + 1)
+        start = index
+        try:
+            item, index = _decoder.raw_decode(text, index)
+        except json.JSONDecodeError:
+            # A writer is mid-file; pick it up on the next refresh
+            return
+        first = False
+        yield start, item
+
+def load_state(path: str) -> Optional[RollupEngine]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        engine = RollupEngine.from_dict(json.load(f))
+    journal = rollup_journal_path(path)
+    if os.path.exists(journal):
+        with open(journal, 'r', encoding='utf-8') as f:
+            for line in f:
+                # A line without its newline was cut off mid-write and never took effect
+                if line.endswith("\n"):
+                    engine.replay(json.loads(line))
+    return engine
+
+def save_state(engine: RollupEngine, path: str):
+    # The journal goes first: on its own the old state is still consistent, just further behind
+    journal = rollup_journal_path(path)
+    if os.path.exists(journal):
+        os.remove(journal)
+    # Written aside and renamed so a crash never leaves a half-written state
+    temporary = path + ".tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(engine.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temporary, path)
+    engine.dirty.clear()
+
+def append_state(engine: RollupEngine, path: str):
+    """Journal the buckets changed since the last write; folds into the state once the journal is larger"""
+    journal = rollup_journal_path(path)
+    with open(journal, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(engine.journal_record(), ensure_ascii=False, separators=(",", ":")) + "\n")
+    engine.dirty.clear()
+    if os.path.getsize(journal) > os.path.getsize(path):
+        save_state(engine, path)
+
+def refresh(source: str, state_path: str, utc_offset_hours: float = DEFAULT_UTC_OFFSET_HOURS) -> Tuple[RollupEngine, int]:
+    """Apply entries appended since the last refresh; returns the engine and how many were added
+
+    Falls back to a full rebuild when the state is missing or the source no
+    longer continues from its cursor.
+    """
+    engine = load_state(state_path)
+    rebuilt = False
+    try:
+        if engine is None:
+            raise LookupError("no state yet")
+        events, cursor = read_appended(source, engine.cursor)
+    except LookupError:
+        engine = RollupEngine(utc_offset_hours)
+        events, cursor = read_appended(source, {})
+        rebuilt = True
+    added = engine.add_all(events)
+    if rebuilt:
+        engine.cursor = cursor
+        save_state(engine, state_path)
+    elif cursor != engine.cursor:
+        engine.cursor = cursor
+        append_state(engine, state_path)
+    return engine, added
+
+def compact(source: str, state_path: str, utc_offset_hours: float = DEFAULT_UTC_OFFSET_HOURS) -> Tuple[RollupEngine, List[str]]:
+    """Rebuild every summary from scratch, replace the state and list the buckets that differed"""
+    previous = load_state(state_path)
+    engine = RollupEngine(previous.utc_offset_hours if previous else utc_offset_hours)
+    events, cursor = read_appended(source, {})
+    engine.add_all(events)
+    engine.cursor = cursor
+
+    differences = []
+    if previous is not None:
+        for user_id in sorted(set(previous.users) | set(engine.users)):
+            for period in ("daily", "weekly"):
+                old = previous.users.get(user_id, {}).get(period, {})
+                new = engine.users.get(user_id, {}).get(period, {})
+                for key in sorted(set(old) | set(new)):
+                    if old.get(key) != new.get(key):
+                        differences.append(f"{user_id} {period} {key}")
+    save_state(engine, state_path)
+    return engine, differences
+
+def main(argv: Optional[List[str]] = None) -> int:
+    root = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(description="Maintain per-user daily/weekly rollups of the food history")
+    parser.add_argument("--history", default=str(root / "data" / "user-food-history.json"),
+                        help="history JSON, NDJSON history, or a --sqlite export with food_entries")
+    parser.add_argument("--state", help="rollup state file (default: <history>.rollups.json)")
+    parser.add_argument("--compact", action="store_true", help="rebuild from scratch and report drifted buckets")
+    parser.add_argument("--user", help="print this user's summaries")
+    parser.add_argument("--period", choices=["daily", "weekly"], default="daily")
+    parser.add_argument("--utc-offset", type=float, default=DEFAULT_UTC_OFFSET_HOURS,
+                        help="hours from UTC used to cut days and weeks (default: 8)")
+    args = parser.parse_args(argv)
+    state_path = args.state or rollup_state_path(args.history)
+
+    started = time.perf_counter()
+    try:
+        if args.compact:
+            engine, differences = compact(args.history, state_path, args.utc_offset)
+        else:
+            engine, added = refresh(args.history, state_path, args.utc_offset)
+    except LookupError as error:
+        # refresh() already fell back to a full rebuild, so the source itself cannot be rolled up
+        print(f"❌ Cannot roll up {args.history}: {error}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - started
+    if args.compact:
+        print(f"🧹 Compacted {engine.applied} entries for {len(engine.users)} users in {elapsed:.2f}s")
+        for difference in differences[:20]:
+            print(f"❌ Incremental rollup differed: {difference}")
+        if differences:
+            print(f"❌ {len(differences)} buckets differed from the rebuild")
+    else:
+        print(f"📈 Applied {added} new entries in {elapsed:.2f}s ({engine.applied} total, {len(engine.users)} users)")
+    print(f"📄 State: {state_path}")
+
+    if args.user:
+        for key, summary in engine.summary(args.user, args.period).items():
+            risks = ", ".join(f"{risk} ×{count}" for risk, count in summary["top_risk_factors"]) or "-"
+            print(f"   {key}: {summary['entries']} entries, IBD avg {summary['avg_ibd_score']}, "
+                  f"score avg {summary['avg_medical_score']}, risks {risks}")
+    return 1 if args.compact and differences else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
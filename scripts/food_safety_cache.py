@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Per-Profile Food Safety Cache
+Memoizes "is this food safe for this user". A miss scores the profile
+against the whole catalog in one vectorized BatchScorer pass and keeps the
+resulting score/urgency row (two int8 arrays), so every later lookup for
+that profile is an array index.
+
+Rows are keyed by (profile id, profile updatedAt, database version):
+- editing a profile bumps its updatedAt, so only that profile's row is
+  dropped and rebuilt;
+- loading a new database version clears the cache.
+
+Memory is bounded by an LRU byte budget, and hits, misses, evictions and
+invalidations are counted. warm_up() fills rows for a list of active users
+in batched scorer passes.
+"""
+
+import argparse
+import random
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from medical_batch_scorer import (HIGH, SCORE_EMOJIS, SCORE_LEVELS, UNSCORED, URGENCY_LEVELS, BatchScorer, FoodMatrix,
+                                  load_foods, load_profiles)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Safe means a score of at least 3 and nothing flagged high or critical
+SAFE_MIN_SCORE = 3
+WARM_UP_BATCH = 256
+
+CacheKey = Tuple[str, Optional[str], str]
+
+def profile_id(profile: Dict[str, Any]) -> str:
+    return profile.get("userId") or profile.get("id")
+
+def database_version(database: Dict[str, Any]) -> str:
+    """Version string for a database header: its version plus when it was last (re)generated"""
+    metadata = database.get("metadata", {})
+    return f"{metadata.get('version', '0')}@{metadata.get('updated') or metadata.get('created', '')}"
+
+class FoodSafetyCache:
+    """LRU cache of per-profile score/urgency rows over one food database version"""
+
+    def __init__(self, foods: Sequence[Dict[str, Any]], version: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._rows: "OrderedDict[CacheKey, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        # Current key per profile, so a profile edit finds and drops its stale row
+        self._profile_keys: Dict[str, CacheKey] = {}
+        self.bytes = 0
+        self.set_database(foods, version)
+
+    def set_database(self, foods: Sequence[Dict[str, Any]], version: str):
+        """Switch to another database version; every cached row belonged to the old one"""
+        self.version = version
+        self.foods = FoodMatrix(foods)
+        self.food_rows = {food_id: row for row, food_id in enumerate(self.foods.ids)}
+        self.row_bytes = 2 * self.foods.size
+        if self._rows:
+            self.invalidations += len(self._rows)
+        self._rows.clear()
+        self._profile_keys.clear()
+        self.bytes = 0
+
+    def _key(self, profile: Dict[str, Any]) -> CacheKey:
+        return (profile_id(profile), profile.get("updatedAt"), self.version)
+
+    def _drop(self, key: CacheKey):
+        self._rows.pop(key)
+        self.bytes -= self.row_bytes
+        if self._profile_keys.get(key[0]) == key:
+            del self._profile_keys[key[0]]
+
+    def _store(self, key: CacheKey, row: Tuple[np.ndarray, np.ndarray]) -> bool:
+        """Cache one row, replacing any row already under ``key``; False if it cannot fit at all"""
+        stale = self._profile_keys.get(key[0])
+        if stale is not None and stale != key:
+            self._drop(stale)
+            self.invalidations += 1
+        if key in self._rows:
+            self._drop(key)
+        if self.row_bytes > self.max_bytes:
+            return False
+        while self.bytes + self.row_bytes > self.max_bytes:
+            self._drop(next(iter(self._rows)))
+            self.evictions += 1
+        self._rows[key] = row
+        self._profile_keys[key[0]] = key
+        self.bytes += self.row_bytes
+        return True
+
+    def _score(self, profiles: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        return BatchScorer(self.foods, profiles).matrix()
+
+    def row(self, profile: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """(scores, urgency) over the whole catalog for one profile"""
+        key = self._key(profile)
+        row = self._rows.get(key)
+        if row is not None:
+            self.hits += 1
+            self._rows.move_to_end(key)
+            return row
+        self.misses += 1
+        scores, urgency = self._score([profile])
+        row = (scores[0], urgency[0])
+        self._store(key, row)
+        return row
+
+    def check(self, profile: Dict[str, Any], food_id: str) -> Dict[str, Any]:
+        """Safety verdict for one food, shaped like a MedicalScore plus a safe flag"""
+        column = self.food_rows.get(food_id)
+        if column is None:
+            raise KeyError(f"food {food_id} is not in database version {self.version}")
+        scores, urgency = self.row(profile)
+        score, level = int(scores[column]), int(urgency[column])
+        return {
+            "score": score if score != UNSCORED else None,
+            "level": SCORE_LEVELS.get(score),
+            "emoji": SCORE_EMOJIS.get(score),
+            "urgency": URGENCY_LEVELS[level],
+            "safe": score >= SAFE_MIN_SCORE and level < HIGH,
+        }
+
+    def safe_foods(self, profile: Dict[str, Any]) -> List[str]:
+        """Ids of every food that is safe for the profile"""
+        scores, urgency = self.row(profile)
+        return [self.foods.ids[column] for column in np.flatnonzero((scores >= SAFE_MIN_SCORE) & (urgency < HIGH))]
+
+    def invalidate(self, user_id: str) -> bool:
+        """Drop one profile's row, e.g. when an edit does not touch updatedAt"""
+        key = self._profile_keys.get(user_id)
+        if key is None:
+            return False
+        self._drop(key)
+        self.invalidations += 1
+        return True
+
+    def warm_up(self, profiles: Iterable[Dict[str, Any]], batch_size: int = WARM_UP_BATCH) -> int:
+        """Precompute rows for active users, scoring missing profiles in batches; returns rows added"""
+        # Keyed so a profile listed twice is scored and stored once
+        missing = {}
+        for profile in profiles:
+            key = self._key(profile)
+            if key not in self._rows:
+                missing.setdefault(key, profile)
+        keys, pending = list(missing), list(missing.values())
+        added = 0
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            scores, urgency = self._score(batch)
+            for row, key in enumerate(keys[start:start + batch_size]):
+                added += self._store(key, (scores[row].copy(), urgency[row].copy()))
+        return added
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "rows": len(self._rows),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    root = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(description="Exercise the per-profile food safety cache")
+    parser.add_argument("--foods", default=str(root / "data" / "taiwan-hk-foods.json"), help="food database JSON")
+    parser.add_argument("--profiles", default=str(root / "data" / "medical-profiles.json"),
+                        help="medical profiles JSON or synthetic .users.ndjson")
+    parser.add_argument("--lookups", type=int, default=100000, help="random safety lookups to run")
+    parser.add_argument("--warm", type=int, default=0, metavar="N", help="warm up the first N profiles first")
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024, help="cache budget in MiB")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    foods = load_foods(args.foods)
+    profiles = load_profiles(args.profiles)
+    cache = FoodSafetyCache(foods, "cli", int(args.max_mb * 1024 * 1024))
+
+    started = time.perf_counter()
+    warmed = cache.warm_up(profiles[:args.warm]) if args.warm else 0
+    warm_seconds = time.perf_counter() - started
+
+    rng = random.Random(args.seed)
+    food_ids = [food.get("id") for food in foods]
+    # Active users dominate traffic: most lookups go to the first fifth of profiles
+    active = profiles[:max(1, len(profiles) // 5)]
+    started = time.perf_counter()
+    unsafe = 0
+    for _ in range(args.lookups):
+        profile = rng.choice(active) if rng.random() < 0.8 else rng.choice(profiles)
+        unsafe += not cache.check(profile, rng.choice(food_ids))["safe"]
+    lookup_seconds = time.perf_counter() - started
+
+    stats = cache.stats()
+    if args.warm:
+        print(f"🔥 Warmed {warmed} profiles in {warm_seconds:.2f}s")
+    print(f"🛡️  {args.lookups} lookups in {lookup_seconds:.2f}s "
+          f"({args.lookups / max(lookup_seconds, 1e-9):,.0f}/s, {unsafe} unsafe)")
+    print(f"   hits {stats['hits']}  misses {stats['misses']}  hit rate {stats['hit_rate']:.1%}  "
+          f"evictions {stats['evictions']}  rows {stats['rows']} ({stats['bytes'] / 1024:.0f} KiB)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
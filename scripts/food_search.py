@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Bilingual Food Search Index
+Build-time search artifact for food names: character bigrams over name_zh
+(with Traditional/Simplified and TW/HK variant folding so 滷肉飯, 卤肉饭 and
+魯肉飯 all match) and a sorted-prefix token table over name_en.
+"""
+
+import heapq
+import json
+import re
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Tuple
+
+from food_index import sidecar_path
+
+SEARCH_FORMAT = "diet-daily-search-index"
+SEARCH_VERSION = 1
+
+# Variant -> canonical character. Canonical forms follow the Taiwan spelling
+# used in name_zh; Simplified and Hong Kong variants fold onto them.
+_VARIANT_PAIRS = (
+    "面麵 麪麵 鸡雞 鷄雞 鱼魚 卤滷 鹵滷 魯滷 鲁滷 饭飯 汤湯 虾蝦 烧燒 肠腸 饼餅 猪豬 酱醬 蚝蠔 蛎蠣 鲜鮮 盐鹽 咸鹹 凤鳳 苹蘋 叶葉 萝蘿 卜蔔 笋筍 姜薑 葱蔥 "
+    "芦蘆 荟薈 饺餃 圆圓 乌烏 龙龍 麦麥 条條 丝絲 块塊 烩燴 焖燜 炖燉 冻凍 凉涼 热熱 鸭鴨 鹅鵝 鸽鴿 贝貝 鳗鰻 鲑鮭 鲈鱸 鳕鱈 带帶 吴吳 饮飲 软軟 莲蓮 红紅 "
+    "绿綠 黄黃 粮糧 谷穀 线線 綫線 馄餛 饨飩 云雲 卖賣 挞撻 车車 杂雜 锅鍋 菓果 蕃番 蛊蠱 肾腎 脏臟 腊臘 鲍鮑 参參 窝窩 齿齒 纸紙 网網 层層 夹夾 干乾 仑崙 "
+    "苏蘇 东東 广廣 湾灣 兰蘭 门門 闸閘 蛳螄 蚬蜆 蛏蟶 鳝鱔 鲶鯰 鲤鯉 鲫鯽 鲢鰱 鳟鱒 鲭鯖 鱿魷 炼煉 药藥 补補 养養 浓濃 碱鹼 酿釀 酝醞 烫燙 团糰 馒饅 头頭 "
+    "浆漿 树樹 鲱鯡 爱愛 签籤 盘盤 锦錦 绵綿"
+)
+VARIANT_MAP: Dict[str, str] = {}
+for _pair in _VARIANT_PAIRS.split():
+    VARIANT_MAP[_pair[0]] = _pair[1]
+
+_CJK = re.compile(r"[㐀-鿿豈-﫿]")
+_EN_TOKEN = re.compile(r"[a-z0-9]+")
+
+def search_index_path(database_path: str) -> str:
+    """Sidecar path for a database file, e.g. taiwan-hk-foods.search.json"""
+    return sidecar_path(database_path, "search")
+
+def fold_zh(text: str) -> str:
+    """Fold variant spellings onto one canonical form, ignoring case and whitespace"""
+    return "".join(VARIANT_MAP.get(ch, ch) for ch in text.lower() if not ch.isspace())
+
+def zh_grams(text: str) -> List[str]:
+    """Character bigrams of a folded name; single characters index as unigrams"""
+    folded = fold_zh(text)
+    if len(folded) < 2:
+        return [folded] if folded else []
+    return [folded[i:i + 2] for i in range(len(folded) - 1)]
+
+def en_tokens(text: str) -> List[str]:
+    return _EN_TOKEN.findall((text or "").lower())
+
+class SearchIndexBuilder:
+    """Accumulates postings food by food so streamed catalogs can be indexed too"""
+
+    def __init__(self):
+        self.ids: List[Any] = []
+        self.names_zh: List[str] = []
+        self.names_en: List[str] = []
+        self.zh_postings: Dict[str, array] = {}
+        self.en_postings: Dict[str, array] = {}
+
+    def add(self, food: Dict[str, Any]) -> int:
+        ordinal = len(self.ids)
+        name_zh = food.get("name_zh") or ""
+        name_en = food.get("name_en") or ""
+        self.ids.append(food.get("id"))
+        self.names_zh.append(name_zh)
+        self.names_en.append(name_en)
+
+        # Unigrams let one-character queries (e.g. 蝦) hit longer names
+        folded = fold_zh(name_zh)
+        for gram in set(zh_grams(name_zh)) | set(folded):
+            self.zh_postings.setdefault(gram, array("I")).append(ordinal)
+        for token in set(en_tokens(name_en)):
+            self.en_postings.setdefault(token, array("I")).append(ordinal)
+        return ordinal
+
+    def to_dict(self) -> Dict[str, Any]:
+        folded_zh = [fold_zh(name) for name in self.names_zh]
+        normalized_en = [" ".join(en_tokens(name)) for name in self.names_en]
+        zh_rank = [len(name) for name in folded_zh]
+        en_rank = [len(name) for name in normalized_en]
+
+        # Postings are ordered shortest name first, so a scan can stop as soon
+        # as it has enough results: later entries can only rank lower.
+        def ranked(postings: array, rank: List[int]) -> List[int]:
+            return sorted(postings, key=lambda ordinal: (rank[ordinal], ordinal))
+
+        zh_order = sorted(range(len(folded_zh)), key=lambda ordinal: (folded_zh[ordinal], ordinal))
+        en_order = sorted(range(len(normalized_en)), key=lambda ordinal: (normalized_en[ordinal], ordinal))
+        tokens = sorted(self.en_postings)
+        return {
+            "format": SEARCH_FORMAT,
+            "version": SEARCH_VERSION,
+            "ids": self.ids,
+            "names_zh": self.names_zh,
+            "names_en": self.names_en,
+            "zh_rank": zh_rank,
+            "en_rank": en_rank,
+            "zh_grams": {gram: ranked(postings, zh_rank) for gram, postings in sorted(self.zh_postings.items())},
+            "zh_sorted": [folded_zh[ordinal] for ordinal in zh_order],
+            "zh_sorted_ordinals": zh_order,
+            "en_tokens": tokens,
+            "en_postings": [ranked(self.en_postings[token], en_rank) for token in tokens],
+            "en_sorted": [normalized_en[ordinal] for ordinal in en_order],
+            "en_sorted_ordinals": en_order,
+        }
+
+def build_search_index(foods: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    builder = SearchIndexBuilder()
+    for food in foods:
+        builder.add(food)
+    return builder.to_dict()
+
+def write_search_index(index: Dict[str, Any], path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+
+# Cap on how many name-prefix matches are ranked for very short queries
+MAX_PREFIX_SCAN = 128
+
+class FoodSearchIndex:
+    """Ranked lookup over a serialized search index
+
+    Results are tiered: exact name (3), name prefix (2), contained in the name
+    or every query word prefixes a name word (1). Within a tier shorter names
+    rank first. Every tier is read in rank order and the scan stops once
+    ``limit`` results are found, so broad queries cost the same as narrow ones.
+    """
+
+    def __init__(self, index: Dict[str, Any]):
+        if index.get("format") != SEARCH_FORMAT:
+            raise ValueError("not a Diet Daily search index")
+        self.ids = index["ids"]
+        self.names_zh = index["names_zh"]
+        self.names_en = index["names_en"]
+        self.zh_rank: List[int] = index["zh_rank"]
+        self.en_rank: List[int] = index["en_rank"]
+        self.zh_grams: Dict[str, List[int]] = index["zh_grams"]
+        self.zh_sorted: List[str] = index["zh_sorted"]
+        self.zh_sorted_ordinals: List[int] = index["zh_sorted_ordinals"]
+        self.en_tokens: List[str] = index["en_tokens"]
+        self.en_postings: List[List[int]] = index["en_postings"]
+        self.en_sorted: List[str] = index["en_sorted"]
+        self.en_sorted_ordinals: List[int] = index["en_sorted_ordinals"]
+        self._folded_zh: Dict[int, str] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "FoodSearchIndex":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _folded(self, ordinal: int) -> str:
+        folded = self._folded_zh.get(ordinal)
+        if folded is None:
+            folded = self._folded_zh[ordinal] = fold_zh(self.names_zh[ordinal])
+        return folded
+
+    def _prefix_matches(
+        self,
+        sorted_names: List[str],
+        sorted_ordinals: List[int],
+        rank: List[int],
+        prefix: str
+    ) -> List[Tuple[float, int]]:
+        """Exact and prefix matches from a sorted name table"""
+        start = bisect_left(sorted_names, prefix)
+        matches = []
+        position = start
+        while (position < len(sorted_names) and position - start < MAX_PREFIX_SCAN
+               and sorted_names[position].startswith(prefix)):
+            ordinal = sorted_ordinals[position]
+            tier = 3.0 if sorted_names[position] == prefix else 2.0
+            matches.append((tier + len(prefix) / max(rank[ordinal], 1), ordinal))
+            position += 1
+        return matches
+
+    def _search_zh(self, query: str, limit: int) -> List[Tuple[float, int]]:
+        folded = fold_zh(query)
+        grams = list(dict.fromkeys(zh_grams(query)))
+        if not grams:
+            return []
+        results = self._prefix_matches(self.zh_sorted, self.zh_sorted_ordinals, self.zh_rank, folded)
+        if len(results) >= limit:
+            return results
+
+        postings = [self.zh_grams.get(gram, []) for gram in grams]
+        if all(postings):
+            # A substring match contains every gram, so walking the rarest
+            # posting in rank order and checking the name is enough
+            seen = {ordinal for _, ordinal in results}
+            for ordinal in min(postings, key=len):
+                if ordinal in seen:
+                    continue
+                name = self._folded(ordinal)
+                if folded in name:
+                    results.append((1.0 + len(folded) / len(name), ordinal))
+                    if len(results) >= limit:
+                        break
+        if results or len(grams) < 2:
+            return results
+
+        # No substring hit: fall back to partial bigram overlap
+        hits: Dict[int, int] = {}
+        for posting in postings:
+            for ordinal in posting:
+                hits[ordinal] = hits.get(ordinal, 0) + 1
+        threshold = len(grams) / 2
+        return [(count / len(grams), ordinal) for ordinal, count in hits.items() if count >= threshold]
+
+    def _token_range(self, prefix: str) -> range:
+        start = bisect_left(self.en_tokens, prefix)
+        end = bisect_left(self.en_tokens, prefix + "\uffff", lo=start)
+        return range(start, end)
+
+    def _search_en(self, query: str, limit: int) -> List[Tuple[float, int]]:
+        tokens = list(dict.fromkeys(en_tokens(query)))
+        if not tokens:
+            return []
+        normalized = " ".join(tokens)
+        results = self._prefix_matches(self.en_sorted, self.en_sorted_ordinals, self.en_rank, normalized)
+        if len(results) >= limit:
+            return results
+
+        ranges = {token: self._token_range(token) for token in tokens}
+        if not all(ranges.values()):
+            return results
+        rank = self.en_rank
+        seen = {ordinal for _, ordinal in results}
+
+        if len(tokens) == 1:
+            # Merge the word postings in rank order and stop after ``limit`` hits
+            streams = [self.en_postings[i] for i in ranges[tokens[0]]]
+            candidates = heapq.merge(*streams, key=lambda ordinal: (rank[ordinal], ordinal))
+        else:
+            # Intersect per-word posting unions, smallest first
+            sizes = {token: sum(len(self.en_postings[i]) for i in ranges[token]) for token in tokens}
+            matched = None
+            for token in sorted(tokens, key=sizes.get):
+                postings = set()
+                for i in ranges[token]:
+                    postings.update(self.en_postings[i])
+                matched = postings if matched is None else matched & postings
+                if not matched:
+                    return results
+            candidates = heapq.nsmallest(limit + len(seen), matched, key=lambda ordinal: (rank[ordinal], ordinal))
+
+        for ordinal in candidates:
+            if ordinal in seen:
+                continue
+            seen.add(ordinal)
+            results.append((1.0 + len(normalized) / max(rank[ordinal], 1), ordinal))
+            if len(results) >= limit:
+                break
+        return results
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Return foods matching a Chinese or English query, best first"""
+        query = (query or "").strip()
+        if not query or limit <= 0:
+            return []
+        scores: Dict[int, float] = {}
+        if _CJK.search(query):
+            for score, ordinal in self._search_zh(query, limit):
+                scores[ordinal] = max(score, scores.get(ordinal, 0.0))
+        if _EN_TOKEN.search(query.lower()):
+            for score, ordinal in self._search_en(query, limit):
+                scores[ordinal] = max(score, scores.get(ordinal, 0.0))
+
+        ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [
+            {
+                "id": self.ids[ordinal],
+                "name_zh": self.names_zh[ordinal],
+                "name_en": self.names_en[ordinal],
+                "score": round(score, 4),
+            }
+            for ordinal, score in ranked
+        ]
+
+def search_foods(index: FoodSearchIndex, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    return index.search(query, limit)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Category-Sharded Database
+Splits the catalog into one shard per entry of the database ``categories``
+block (taiwan_staples, hongkong_classics, ...) plus a manifest.json. Every
+shard is stored as one part file per food category it holds, and the
+manifest lists each part's file, item count, byte size and SHA-256, and
+which shards hold which food categories. A screen that only shows soups
+fetches the manifest and the soup parts, not the whole catalog. ids.tsv
+maps every food id to its part file, so a lookup by id fetches that index
+once and then a single part.
+
+ShardedFoodDatabase is the matching loader: it reads the manifest from a
+directory or base URL, fetches a part on first access, checks its hash and
+keeps it parsed in memory for later calls.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import urllib.request
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+SHARD_FORMAT = "diet-daily-shards"
+SHARD_VERSION = 2
+MANIFEST_NAME = "manifest.json"
+ID_INDEX_NAME = "ids.tsv"
+
+_compact_json = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+class _HashedFile:
+    """Binary file that hashes exactly the bytes written"""
+
+    def __init__(self, directory: str, name: str):
+        self.file = name
+        self.bytes = 0
+        self._hash = hashlib.sha256()
+        self._f = open(os.path.join(directory, name), 'wb')
+
+    def write(self, text: str):
+        data = text.encode("utf-8")
+        self._hash.update(data)
+        self._f.write(data)
+        self.bytes += len(data)
+
+    def close(self) -> Dict[str, Any]:
+        self._f.close()
+        return {"file": self.file, "bytes": self.bytes, "sha256": self._hash.hexdigest()}
+
+class _PartWriter:
+    """Streams the foods of one food category within one shard"""
+
+    def __init__(self, directory: str, key: str, food_category: str, number: int):
+        self.food_category = food_category
+        self.items = 0
+        self._out = _HashedFile(directory, f"{key}.{number}.json")
+        self._out.write('{"category":' + _compact_json(key) + ',"food_category":' + _compact_json(food_category)
+                        + ',"foods":[')
+
+    @property
+    def file(self) -> str:
+        return self._out.file
+
+    def add(self, food: Dict[str, Any]):
+        self._out.write(("," if self.items else "") + _compact_json(food))
+        self.items += 1
+
+    def close(self) -> Dict[str, Any]:
+        self._out.write("]}")
+        return {"food_category": self.food_category, "items": self.items, **self._out.close()}
+
+class _ShardWriter:
+    """One category source, split into a part file per food category"""
+
+    def __init__(self, directory: str, key: str):
+        self.directory = directory
+        self.key = key
+        self.parts: Dict[str, _PartWriter] = {}
+
+    def add(self, food: Dict[str, Any]) -> str:
+        """Write one food and return the part file it went to"""
+        category = food.get("category") or ""
+        part = self.parts.get(category)
+        if part is None:
+            part = self.parts[category] = _PartWriter(self.directory, self.key, category, len(self.parts))
+        part.add(food)
+        return part.file
+
+    def close(self) -> Dict[str, Any]:
+        parts = [part.close() for part in self.parts.values()]
+        return {
+            "category": self.key,
+            "items": sum(part["items"] for part in parts),
+            "bytes": sum(part["bytes"] for part in parts),
+            "parts": parts,
+            "food_categories": {part["food_category"]: part["items"] for part in parts},
+        }
+
+def write_shards(
+    directory: str,
+    header: Dict[str, Any],
+    foods: Iterable[Dict[str, Any]],
+    category_counts: Optional[Dict[str, int]] = None
+) -> Dict[str, Any]:
+    """Write one shard per category source, the id index and the manifest; returns the manifest
+
+    ``foods`` must arrive in category_counts order, as iter_foods() yields
+    them, so shards stream without holding the catalog. Without counts (e.g.
+    an import) foods are sharded by their own ``category`` field instead.
+    Within a shard foods are grouped by food category, one part file each.
+    """
+    os.makedirs(directory, exist_ok=True)
+    writers: Dict[str, _ShardWriter] = {}
+    id_index = _HashedFile(directory, ID_INDEX_NAME)
+    plan = iter([(key, count) for key, count in (category_counts or {}).items() if count])
+    key, remaining = next(plan, (None, 0))
+
+    for food in foods:
+        if category_counts:
+            while remaining == 0:
+                key, remaining = next(plan, (None, None))
+                if key is None:
+                    raise ValueError("more foods than category_counts accounts for")
+            remaining -= 1
+            shard_key = key
+        else:
+            shard_key = food.get("category") or "uncategorized"
+        writer = writers.get(shard_key)
+        if writer is None:
+            writer = writers[shard_key] = _ShardWriter(directory, shard_key)
+        part_file = writer.add(food)
+        # Ids and file names never hold tabs or newlines in practice; replacing them keeps the index parseable
+        food_id = str(food.get("id")).replace("\t", " ").replace("\n", " ")
+        id_index.write(f"{food_id}\t{part_file}\n")
+
+    shards = [writer.close() for writer in writers.values()]
+    food_categories: Dict[str, List[str]] = {}
+    for shard in shards:
+        for category in shard["food_categories"]:
+            food_categories.setdefault(category, []).append(shard["category"])
+
+    manifest = {
+        "format": SHARD_FORMAT,
+        "version": SHARD_VERSION,
+        "metadata": dict(header.get("metadata", {}), total_items=sum(shard["items"] for shard in shards)),
+        "categories": header.get("categories", {}),
+        "medical_scoring": header.get("medical_scoring", {}),
+        "shards": shards,
+        "food_categories": food_categories,
+        "id_index": id_index.close(),
+    }
+    with open(os.path.join(directory, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+def _fetch_location(location: str) -> Callable[[str], bytes]:
+    """Reader for a shard directory or an http(s) base URL"""
+    if location.startswith(("http://", "https://")):
+        base = location.rstrip("/") + "/"
+
+        def fetch_url(name: str) -> bytes:
+            with urllib.request.urlopen(base + name) as response:
+                return response.read()
+        return fetch_url
+
+    def fetch_file(name: str) -> bytes:
+        with open(os.path.join(location, name), 'rb') as f:
+            return f.read()
+    return fetch_file
+
+class ShardedFoodDatabase:
+    """Lazily loaded view over a sharded database
+
+    Only the manifest is fetched up front; each part file is fetched,
+    verified and parsed on first use and then served from memory. The id
+    index is fetched on the first lookup by id.
+    """
+
+    def __init__(self, location: str, fetch: Optional[Callable[[str], bytes]] = None, verify: bool = True):
+        self.fetch = fetch or _fetch_location(location)
+        self.verify = verify
+        manifest_bytes = self.fetch(MANIFEST_NAME)
+        self.manifest = json.loads(manifest_bytes)
+        if self.manifest.get("format") != SHARD_FORMAT or self.manifest.get("version") != SHARD_VERSION:
+            raise ValueError(f"{location}: not a sharded database this version can read")
+        self.shards = {shard["category"]: shard for shard in self.manifest["shards"]}
+        self.parts = {part["file"]: part for shard in self.manifest["shards"] for part in shard["parts"]}
+        self._loaded: Dict[str, List[Dict[str, Any]]] = {}
+        self._id_index: Optional[Dict[str, str]] = None
+        self.bytes_fetched = len(manifest_bytes)
+        self.fetch_seconds = 0.0
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.manifest["metadata"]
+
+    def categories(self) -> List[str]:
+        return list(self.shards)
+
+    def loaded(self) -> List[str]:
+        """Part files fetched so far"""
+        return list(self._loaded)
+
+    def _fetch_verified(self, entry: Dict[str, Any]) -> bytes:
+        started = time.perf_counter()
+        data = self.fetch(entry["file"])
+        if self.verify and hashlib.sha256(data).hexdigest() != entry["sha256"]:
+            raise ValueError(f"shard file {entry['file']} does not match its manifest hash")
+        self.fetch_seconds += time.perf_counter() - started
+        self.bytes_fetched += len(data)
+        return data
+
+    def part(self, file: str) -> List[Dict[str, Any]]:
+        """Foods of one part file, fetched on first access"""
+        foods = self._loaded.get(file)
+        if foods is None:
+            foods = self._loaded[file] = json.loads(self._fetch_verified(self.parts[file]))["foods"]
+        return foods
+
+    def shard(self, category: str) -> List[Dict[str, Any]]:
+        """Foods of one shard, food category by food category"""
+        entry = self.shards.get(category)
+        if entry is None:
+            raise KeyError(f"no shard for category {category!r}")
+        return [food for part in entry["parts"] for food in self.part(part["file"])]
+
+    def foods_in(self, food_category: str) -> List[Dict[str, Any]]:
+        """Foods whose own category is ``food_category`` (e.g. "soup"), fetching only their part files"""
+        return [
+            food
+            for shard in self.manifest["food_categories"].get(food_category, [])
+            for part in self.shards[shard]["parts"] if part["food_category"] == food_category
+            for food in self.part(part["file"])
+        ]
+
+    def iter_foods(self, categories: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Every food, shard by shard, loading each shard as it is reached"""
+        for category in categories if categories is not None else self.shards:
+            yield from self.shard(category)
+
+    def food(self, food_id: str) -> Optional[Dict[str, Any]]:
+        """Look a food up by id, fetching the id index once and then only the part that holds it"""
+        if self._id_index is None:
+            text = self._fetch_verified(self.manifest["id_index"]).decode("utf-8")
+            self._id_index = dict(line.split("\t", 1) for line in text.splitlines() if line)
+        file = self._id_index.get(food_id)
+        if file is None:
+            return None
+        for food in self.part(file):
+            if food.get("id") == food_id:
+                return food
+        return None
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect a sharded food database and time a first-screen load")
+    parser.add_argument("location", help="shard directory or http(s) base URL holding manifest.json")
+    parser.add_argument("--category", help="food category to load first, e.g. soup (default: the first shard)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    database = ShardedFoodDatabase(args.location)
+    total_bytes = sum(shard["bytes"] for shard in database.manifest["shards"])
+    print(f"🧩 {len(database.shards)} shards, {database.metadata['total_items']} foods, {total_bytes / 1024:.0f} KiB")
+    for shard in database.manifest["shards"]:
+        print(f"   {shard['category']:<20} {shard['items']:>8} items  {shard['bytes'] / 1024:>9.1f} KiB")
+
+    if args.category:
+        foods = database.foods_in(args.category)
+    else:
+        foods = database.shard(database.categories()[0])
+    seconds = time.perf_counter() - started
+    print(f"⚡ First screen: {len(foods)} foods from {len(database.loaded())} part file(s), "
+          f"{database.bytes_fetched / 1024:.1f} KiB fetched in {seconds * 1000:.1f}ms "
+          f"({database.bytes_fetched / max(total_bytes, 1):.1%} of the catalog)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,688 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Google Sheets Batch Sync and Load Tester
+src/lib/google-sheets-sync.ts writes every diary entry with its own
+Sheets call, so a user who logs a meal of four dishes spends four write
+requests from a quota of about one per second. This module has three parts:
+
+- SheetsStandIn: a local HTTP server that answers the Sheets v4
+  values.append, values:batchUpdate and values.get endpoints. It keeps rows
+  in memory and simulates latency, per-spreadsheet and per-project write
+  quotas (429 RESOURCE_EXHAUSTED), and random 429s.
+- SheetsBatchClient: queues diary rows per (spreadsheet, range) and sends
+  everything pending for a range in one append. Each spreadsheet keeps at
+  most one request in flight, so rows arriving during a write join the
+  next batch. Requests go through a token bucket per spreadsheet and one
+  per project, and 429/5xx responses are retried with full-jitter
+  exponential backoff.
+- run_load: simulates N users logging meals (bursts of 1-4 entries) against
+  the stand-in and reports rows/s and p50/p95/p99 latency from enqueue to
+  acknowledgement. It then reads every spreadsheet back to check that no
+  row was lost or duplicated.
+
+Usage:
+    python scripts/food_sheets_sync.py load --users 1,10,100,1000 --mode batched,per-entry
+    python scripts/food_sheets_sync.py serve --port 8765
+"""
+
+import argparse
+import heapq
+import http.client
+import json
+import multiprocessing
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote, urlsplit
+
+from food_sqlite import load_history_entries
+
+FOOD_HISTORY_SHEET = "食物歷史"
+FOOD_HISTORY_RANGE = f"{FOOD_HISTORY_SHEET}!A:O"
+# Header row written by GoogleSheetsSyncService.setupHeaders
+FOOD_HISTORY_HEADERS = [
+    "日期", "時間", "食物ID", "食物名稱", "食物類別",
+    "份量", "單位", "醫療評分", "風險等級", "過敏警告",
+    "症狀前", "症狀後", "嚴重度", "備註", "位置",
+]
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+LOCAL_TIME = timezone(timedelta(hours=8))
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, holding at most ``burst``"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take ``tokens`` and return 0, or take nothing and return the seconds until they are available"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+def _sheet_name(a1_range: str) -> str:
+    return a1_range.split("!", 1)[0].strip("'")
+
+def _start_row(a1_range: str) -> int:
+    """'食物歷史!A5:O9' -> 5 (1-based); a range without a row number starts at 1"""
+    match = re.search(r"!\$?[A-Z]+\$?(\d+)", a1_range)
+    return int(match.group(1)) if match else 1
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this each keep-alive reply waits on a delayed ACK
+    disable_nagle_algorithm = True
+    server: "SheetsStandIn"
+
+    APPEND = re.compile(r"^/v4/spreadsheets/([^/]+)/values/([^/]+):append$")
+    BATCH_UPDATE = re.compile(r"^/v4/spreadsheets/([^/]+)/values:batchUpdate$")
+    GET = re.compile(r"^/v4/spreadsheets/([^/]+)/values/([^/]+)$")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str, reason: str):
+        self._reply(status, {"error": {"code": status, "message": message, "status": reason}})
+
+    def do_GET(self):
+        match = self.GET.match(urlsplit(self.path).path)
+        if not match:
+            return self._error(404, "Not found", "NOT_FOUND")
+        spreadsheet_id, a1_range = unquote(match.group(1)), unquote(match.group(2))
+        rows = self.server.read(spreadsheet_id, _sheet_name(a1_range))
+        self._reply(200, {"range": a1_range, "majorDimension": "ROWS", "values": rows})
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        append, batch = self.APPEND.match(path), self.BATCH_UPDATE.match(path)
+        if not append and not batch:
+            return self._error(404, "Not found", "NOT_FOUND")
+        spreadsheet_id = unquote((append or batch).group(1))
+
+        throttled = self.server.throttle(spreadsheet_id)
+        if throttled:
+            return self._error(429, throttled, "RESOURCE_EXHAUSTED")
+        if append:
+            a1_range = unquote(append.group(2))
+            rows = body.get("values") or []
+            self.server.simulate_latency(len(rows))
+            first, last = self.server.append(spreadsheet_id, _sheet_name(a1_range), rows)
+            return self._reply(200, {
+                "spreadsheetId": spreadsheet_id,
+                "updates": {
+                    "spreadsheetId": spreadsheet_id,
+                    "updatedRange": f"{_sheet_name(a1_range)}!A{first}:O{last}",
+                    "updatedRows": len(rows),
+                    "updatedCells": sum(len(row) for row in rows),
+                },
+            })
+        data = body.get("data") or []
+        self.server.simulate_latency(sum(len(item.get("values") or []) for item in data))
+        responses = []
+        for item in data:
+            rows = item.get("values") or []
+            self.server.write(spreadsheet_id, _sheet_name(item["range"]), _start_row(item["range"]), rows)
+            responses.append({"updatedRange": item["range"], "updatedRows": len(rows)})
+        self._reply(200, {
+            "spreadsheetId": spreadsheet_id,
+            "totalUpdatedRows": sum(response["updatedRows"] for response in responses),
+            "responses": responses,
+        })
+
+class SheetsStandIn(ThreadingHTTPServer):
+    """In-memory Sheets v4 values API with latency and write quotas
+
+    Writes are limited per spreadsheet (Sheets' per-user quota, since every
+    user syncs into their own spreadsheet) and per project; a write over
+    either limit, or picked by ``error_rate``, gets a 429 without being applied.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int] = ("127.0.0.1", 0), latency: float = 0.06,
+                 latency_per_row: float = 0.00002, spreadsheet_quota: float = 1.0, spreadsheet_burst: float = 2.0,
+                 project_quota: float = 300.0, error_rate: float = 0.01, seed: int = 0):
+        super().__init__(address, _StandInHandler)
+        self.latency = latency
+        self.latency_per_row = latency_per_row
+        self.spreadsheet_quota = spreadsheet_quota
+        self.spreadsheet_burst = spreadsheet_burst
+        self.project_bucket = TokenBucket(project_quota)
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.sheets: Dict[Tuple[str, str], List[List[Any]]] = {}
+        self.counters = {"writes": 0, "throttled": 0, "rows": 0}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def throttle(self, spreadsheet_id: str) -> Optional[str]:
+        """Reason for rejecting this write with a 429, or None to accept it"""
+        with self.lock:
+            bucket = self.buckets.get(spreadsheet_id)
+            if bucket is None:
+                bucket = self.buckets[spreadsheet_id] = TokenBucket(self.spreadsheet_quota, self.spreadsheet_burst)
+            injected = self.random.random() < self.error_rate
+            self.counters["writes"] += 1
+        if injected:
+            reason = "Quota exceeded (injected)"
+        elif bucket.try_acquire():
+            reason = "Quota exceeded for quota metric 'Write requests' and limit 'Write requests per minute per user'"
+        elif self.project_bucket.try_acquire():
+            reason = "Quota exceeded for quota metric 'Write requests' and limit 'Write requests per minute'"
+        else:
+            return None
+        with self.lock:
+            self.counters["throttled"] += 1
+        return reason
+
+    def simulate_latency(self, rows: int):
+        time.sleep(self.latency * random.uniform(0.5, 1.5) + self.latency_per_row * rows)
+
+    def append(self, spreadsheet_id: str, sheet: str, rows: List[List[Any]]) -> Tuple[int, int]:
+        """Add rows after the last non-empty row; returns their 1-based (first, last) row numbers"""
+        with self.lock:
+            values = self.sheets.setdefault((spreadsheet_id, sheet), [])
+            while values and not values[-1]:
+                values.pop()
+            first = len(values) + 1
+            values.extend(rows)
+            self.counters["rows"] += len(rows)
+        return first, first + len(rows) - 1
+
+    def write(self, spreadsheet_id: str, sheet: str, start_row: int, rows: List[List[Any]]):
+        with self.lock:
+            values = self.sheets.setdefault((spreadsheet_id, sheet), [])
+            end = start_row - 1 + len(rows)
+            if len(values) < end:
+                values.extend([] for _ in range(end - len(values)))
+            values[start_row - 1:end] = rows
+
+    def read(self, spreadsheet_id: str, sheet: str) -> List[List[Any]]:
+        with self.lock:
+            return [list(row) for row in self.sheets.get((spreadsheet_id, sheet), [])]
+
+class SheetsError(Exception):
+    """A write the Sheets API rejected, or that still failed after every retry"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+def diary_row(entry: Dict[str, Any]) -> List[Any]:
+    """A FoodHistoryEntry as the 15-column row syncFoodHistory writes to 食物歷史"""
+    consumed = datetime.fromisoformat(entry["consumedAt"].replace("Z", "+00:00")).astimezone(LOCAL_TIME)
+    hour = consumed.hour % 12 or 12
+    food = entry.get("foodData") or {}
+    portion = entry.get("portion") or {}
+    score = entry.get("medicalScore") or {}
+    symptoms = entry.get("symptoms") or {}
+    return [
+        f"{consumed.year}/{consumed.month}/{consumed.day}",
+        f"{'上午' if consumed.hour < 12 else '下午'}{hour}:{consumed.minute:02d}:{consumed.second:02d}",
+        entry.get("foodId"),
+        food.get("name_zh") or food.get("name_en") or "未知",
+        food.get("category") or "未分類",
+        f"{portion.get('amount')} {portion.get('unit')}",
+        portion.get("customUnit") or portion.get("unit"),
+        score.get("score") or "N/A",
+        score.get("level") or "N/A",
+        "; ".join(entry.get("allergyWarnings") or []) or "無",
+        "; ".join(symptoms.get("before") or []) or "無",
+        "; ".join(symptoms.get("after") or []) or "無",
+        symptoms.get("severity") or "N/A",
+        entry.get("notes") or "",
+        entry.get("location") or "",
+    ]
+
+class SheetsBatchClient:
+    """Coalescing, rate-limited writer for the Sheets values API
+
+    submit() queues one row and returns a Future resolved with the updated
+    A1 range once the row is written. Rows queued for the same (spreadsheet,
+    range) go out together in one values.append. The first row queued for a
+    range waits at most ``linger`` seconds for others to join it. With
+    ``max_batch_rows=1`` and ``linger=0`` this becomes the
+    one-call-per-entry behaviour of the current sync.
+    """
+
+    def __init__(self, base_url: str, rate: float = 250.0, burst: Optional[float] = None,
+                 spreadsheet_rate: float = 1.0, spreadsheet_burst: float = 2.0, max_batch_rows: int = 500,
+                 linger: float = 0.05, workers: int = 64, max_retries: int = 8, backoff: float = 0.25,
+                 max_backoff: float = 8.0, timeout: float = 30.0):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.bucket = TokenBucket(rate, burst)
+        self.spreadsheet_rate = spreadsheet_rate
+        self.spreadsheet_burst = spreadsheet_burst
+        self.max_batch_rows = max_batch_rows
+        self.linger = linger
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.stats = {"requests": 0, "batches": 0, "rows": 0, "throttled": 0, "retries": 0, "failed": 0}
+
+        self._cond = threading.Condition()
+        self._pending: Dict[Tuple[str, str], List[Tuple[List[Any], Future, float]]] = {}
+        self._busy = set()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._closing = False
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sheets-sync")
+        self._dispatcher = threading.Thread(target=self._dispatch, name="sheets-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, spreadsheet_id: str, row: List[Any], a1_range: str = FOOD_HISTORY_RANGE) -> Future:
+        future: Future = Future()
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("client is closed")
+            self._pending.setdefault((spreadsheet_id, a1_range), []).append((row, future, time.monotonic()))
+            self._cond.notify()
+        return future
+
+    def submit_entry(self, spreadsheet_id: str, entry: Dict[str, Any]) -> Future:
+        return self.submit(spreadsheet_id, diary_row(entry))
+
+    def close(self):
+        """Send everything still queued, then stop"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "SheetsBatchClient":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _bucket(self, spreadsheet_id: str) -> TokenBucket:
+        bucket = self._buckets.get(spreadsheet_id)
+        if bucket is None:
+            bucket = self._buckets[spreadsheet_id] = TokenBucket(self.spreadsheet_rate, self.spreadsheet_burst)
+        return bucket
+
+    def setup_headers(self, spreadsheet_ids: List[str],
+                      headers: Optional[Dict[str, List[List[Any]]]] = None):
+        """Write header rows into new spreadsheets, one values:batchUpdate each, as setupHeaders does on creation"""
+        headers = headers or {f"{FOOD_HISTORY_SHEET}!A1:O1": [FOOD_HISTORY_HEADERS]}
+        body = {"valueInputOption": "RAW", "data": [{"range": a1_range, "values": rows}
+                                                    for a1_range, rows in headers.items()]}
+
+        def write(spreadsheet_id: str):
+            with self._cond:
+                bucket = self._bucket(spreadsheet_id)
+            status, payload = self._post(f"/v4/spreadsheets/{quote(spreadsheet_id)}/values:batchUpdate", body, bucket)
+            if status != 200:
+                raise SheetsError(status, payload.get("error", {}).get("message", "header setup failed"))
+
+        list(self._executor.map(write, spreadsheet_ids))
+
+    def _next_batch(self, now: float) -> Tuple[Optional[Tuple[str, str]], float]:
+        """Oldest range that is idle, due and within its spreadsheet's quota; else how long to wait"""
+        wait = 1.0
+        for key, queued in self._pending.items():
+            spreadsheet_id = key[0]
+            if spreadsheet_id in self._busy:
+                continue
+            due = queued[0][2] + self.linger - now
+            if due > 0 and len(queued) < self.max_batch_rows and not self._closing:
+                wait = min(wait, due)
+                continue
+            throttled = self._bucket(spreadsheet_id).try_acquire()
+            if throttled:
+                wait = min(wait, throttled)
+                continue
+            return key, 0.0
+        return None, wait
+
+    def _dispatch(self):
+        with self._cond:
+            while True:
+                if len(self._busy) < self.workers:
+                    key, wait = self._next_batch(time.monotonic())
+                else:
+                    key, wait = None, 1.0
+                if key is None:
+                    if self._closing and not self._pending and not self._busy:
+                        return
+                    self._cond.wait(wait)
+                    continue
+                queued = self._pending[key]
+                batch = queued[:self.max_batch_rows]
+                if len(batch) == len(queued):
+                    del self._pending[key]
+                else:
+                    del queued[:self.max_batch_rows]
+                self._busy.add(key[0])
+                self._executor.submit(self._send, key, batch)
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return connection
+
+    def _post(self, path: str, body: Dict[str, Any], bucket: TokenBucket, prepaid: bool = False,
+              idempotent: bool = True) -> Tuple[int, Dict[str, Any]]:
+        """POST with up to max_retries retries on 429/5xx/connection errors, sleeping with full jitter
+
+        Every attempt takes a token from the project bucket and from the
+        spreadsheet's ``bucket``; ``prepaid`` means the dispatcher already took
+        the spreadsheet token for the first attempt. A request that is not
+        ``idempotent`` is only retried when it provably never reached the
+        server: a timeout or dropped connection after sending may still have
+        applied it.
+        """
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        for attempt in range(self.max_retries + 1):
+            if attempt or not prepaid:
+                bucket.acquire()
+            self.bucket.acquire()
+            sent = unconfirmed = False
+            try:
+                connection = self._connection()
+                if connection.sock is None:
+                    connection.connect()
+                sent = True
+                connection.request("POST", path, data, {"Content-Type": "application/json"})
+                response = connection.getresponse()
+                status, payload = response.status, json.loads(response.read() or b"{}")
+            except (OSError, http.client.HTTPException) as error:
+                self._local.connection = None
+                status, payload = 503, {"error": {"message": str(error)}}
+                unconfirmed = sent and not idempotent
+            with self._cond:
+                self.stats["requests"] += 1
+                if status == 429:
+                    self.stats["throttled"] += 1
+            if status not in RETRYABLE_STATUS or attempt == self.max_retries:
+                return status, payload
+            if unconfirmed:
+                payload["error"]["message"] += " (request may have been applied; not retried)"
+                return status, payload
+            with self._cond:
+                self.stats["retries"] += 1
+            time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+        return status, payload
+
+    def _send(self, key: Tuple[str, str], batch: List[Tuple[List[Any], Future, float]]):
+        spreadsheet_id, a1_range = key
+        bucket = self._buckets[spreadsheet_id]
+        try:
+            status, payload = self._post(
+                f"/v4/spreadsheets/{quote(spreadsheet_id)}/values/{quote(a1_range)}:append"
+                f"?valueInputOption=RAW&insertDataOption=INSERT_ROWS",
+                {"range": a1_range, "majorDimension": "ROWS", "values": [row for row, _, _ in batch]},
+                bucket, prepaid=True, idempotent=False)
+            if status != 200:
+                raise SheetsError(status, payload.get("error", {}).get("message", "append failed"))
+            updated = payload["updates"]["updatedRange"]
+            with self._cond:
+                self.stats["batches"] += 1
+                self.stats["rows"] += len(batch)
+            for _, future, _ in batch:
+                future.set_result(updated)
+        except Exception as error:
+            with self._cond:
+                self.stats["failed"] += len(batch)
+            for _, future, _ in batch:
+                future.set_exception(error)
+        finally:
+            with self._cond:
+                self._busy.discard(spreadsheet_id)
+                self._cond.notify()
+
+def _percentile(values: List[float], percent: int) -> Optional[float]:
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+def run_load(base_url: str, users: int, duration: float, entries: List[Dict[str, Any]], meal_interval: float = 5.0,
+             client_options: Optional[Dict[str, Any]] = None, seed: int = 0, run_id: str = "load") -> Dict[str, Any]:
+    """Simulate ``users`` people logging meals for ``duration`` seconds through one SheetsBatchClient
+
+    Every user logs a meal about every ``meal_interval`` seconds (exponential
+    gaps); a meal is 1-4 entries tapped in ~0.3 s apart. Returns throughput,
+    latency percentiles (enqueue -> acknowledged, in ms) and client counters.
+    """
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    errors: List[BaseException] = []
+    submitted: Dict[str, int] = {}
+    rows = [diary_row(entry) for entry in entries]
+
+    def record(future: Future, enqueued: float):
+        error = future.exception()
+        if error is None:
+            latencies.append(time.monotonic() - enqueued)
+        else:
+            errors.append(error)
+
+    spreadsheet_ids = [f"{run_id}-{users}-{user:04d}" for user in range(users)]
+    # (time, user, entries left in the current meal)
+    events = [(rng.uniform(0, meal_interval), user, 0) for user in range(users)]
+    heapq.heapify(events)
+    client = SheetsBatchClient(base_url, **(client_options or {}))
+    # Spreadsheets are created with their headers at sign-up, before any diary sync
+    client.setup_headers(spreadsheet_ids)
+    started = time.monotonic()
+    produced = 0
+    try:
+        while events:
+            at, user, left = heapq.heappop(events)
+            if at >= duration:
+                continue
+            delay = started + at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if left == 0:
+                left = rng.randint(1, 4)
+            spreadsheet_id = spreadsheet_ids[user]
+            enqueued = time.monotonic()
+            future = client.submit(spreadsheet_id, rows[produced % len(rows)])
+            future.add_done_callback(lambda done, enqueued=enqueued: record(done, enqueued))
+            submitted[spreadsheet_id] = submitted.get(spreadsheet_id, 0) + 1
+            produced += 1
+            next_at = at + rng.uniform(0.15, 0.45) if left > 1 else at + rng.expovariate(1 / meal_interval)
+            heapq.heappush(events, (next_at, user, left - 1))
+    finally:
+        client.close()
+    elapsed = time.monotonic() - started
+
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    stats = client.stats
+    return {
+        "users": users,
+        "seconds": round(elapsed, 2),
+        "rows_submitted": produced,
+        "rows_written": len(latencies),
+        "rows_failed": len(errors),
+        "rows_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "requests": stats["requests"],
+        "rows_per_request": round(stats["rows"] / stats["batches"], 2) if stats["batches"] else 0.0,
+        "throttled": stats["throttled"],
+        "retries": stats["retries"],
+        "p50_ms": _percentile(latencies_ms, 50),
+        "p95_ms": _percentile(latencies_ms, 95),
+        "p99_ms": _percentile(latencies_ms, 99),
+        "submitted_by_spreadsheet": submitted,
+    }
+
+def verify_rows(base_url: str, submitted: Dict[str, int]) -> List[str]:
+    """Read every spreadsheet back; returns the ids whose 食物歷史 row count does not match"""
+    parts = urlsplit(base_url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    mismatched = []
+    for spreadsheet_id, count in submitted.items():
+        connection.request("GET", f"/v4/spreadsheets/{quote(spreadsheet_id)}/values/{quote(FOOD_HISTORY_RANGE)}")
+        values = json.loads(connection.getresponse().read())["values"]
+        if not values or values[0] != FOOD_HISTORY_HEADERS or len(values) - 1 != count:
+            mismatched.append(spreadsheet_id)
+    connection.close()
+    return mismatched
+
+MODES = {
+    # One values.append per entry, like GoogleSheetsSyncService today
+    "per-entry": {"max_batch_rows": 1, "linger": 0.0},
+    "batched": {},
+}
+
+def _serve(ready, options: Dict[str, Any]):
+    server = SheetsStandIn(**options)
+    ready.put(server.url)
+    server.serve_forever()
+
+def start_stand_in(options: Dict[str, Any]) -> Tuple[multiprocessing.Process, str]:
+    """Run a SheetsStandIn in a child process so its work does not share the load generator's GIL"""
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(ready, options), daemon=True)
+    process.start()
+    return process, ready.get(timeout=30)
+
+def _add_stand_in_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=60.0, help="mean write latency (default: 60)")
+    parser.add_argument("--spreadsheet-quota", type=float, default=1.0,
+                        help="writes per second allowed per spreadsheet (default: 1, i.e. Sheets' 60/min per user)")
+    parser.add_argument("--project-quota", type=float, default=300.0, help="writes per second for the whole project")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="share of writes answered with a random 429")
+
+def _stand_in_options(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "latency": args.latency_ms / 1000,
+        "spreadsheet_quota": args.spreadsheet_quota,
+        "project_quota": args.project_quota,
+        "error_rate": args.error_rate,
+        "seed": args.seed,
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    root = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(description="Sheets stand-in server and batching sync load tester")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run the Sheets stand-in in the foreground")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--seed", type=int, default=0)
+    _add_stand_in_arguments(serve)
+
+    load = commands.add_parser("load", help="measure sync throughput and latency at several user counts")
+    load.add_argument("--url", help="existing stand-in to test against (default: start one)")
+    load.add_argument("--users", default="1,10,100,1000", help="comma-separated concurrent user counts")
+    load.add_argument("--mode", default="batched,per-entry", help=f"comma-separated: {', '.join(MODES)}")
+    load.add_argument("--duration", type=float, default=10.0, help="seconds of meal logging per run (default: 10)")
+    load.add_argument("--meal-interval", type=float, default=5.0, help="mean seconds between a user's meals")
+    load.add_argument("--rate", type=float, default=250.0, help="client writes per second for the project")
+    load.add_argument("--history", default=str(root / "data" / "user-food-history.json"),
+                      help="diary entries to replay as rows")
+    load.add_argument("--seed", type=int, default=0)
+    load.add_argument("--output", help="write the results as JSON")
+    _add_stand_in_arguments(load)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        server = SheetsStandIn(("127.0.0.1", args.port), **_stand_in_options(args))
+        print(f"📡 Sheets stand-in on {server.url} (latency {args.latency_ms:g}ms, "
+              f"{args.spreadsheet_quota:g}/s per spreadsheet, {args.project_quota:g}/s per project, "
+              f"{args.error_rate:.0%} injected 429s)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    modes = [mode.strip() for mode in args.mode.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"unknown mode {', '.join(unknown)}")
+    entries = list(load_history_entries(args.history))
+    if not entries:
+        parser.error(f"no diary entries in {args.history}")
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_stand_in(_stand_in_options(args))
+        print(f"📡 Sheets stand-in on {url}")
+    results = []
+    failed = False
+    try:
+        for mode in modes:
+            for users in (int(value) for value in args.users.split(",")):
+                print(f"⏱️  {mode} @ {users} users...", file=sys.stderr)
+                # Aim under the stand-in's quotas so only injected 429s and clock skew trigger retries
+                options = dict(MODES[mode], rate=args.rate, spreadsheet_rate=args.spreadsheet_quota * 0.9,
+                               spreadsheet_burst=1.0)
+                result = run_load(url, users, args.duration, entries, args.meal_interval, options, args.seed,
+                                  run_id=f"{mode}-{int(time.time() * 1000)}")
+                submitted = result.pop("submitted_by_spreadsheet")
+                result["mode"] = mode
+                result["mismatched_spreadsheets"] = len(verify_rows(url, submitted))
+                failed = failed or bool(result["rows_failed"] or result["mismatched_spreadsheets"])
+                results.append(result)
+    finally:
+        if process is not None:
+            process.terminate()
+
+    print("\n📊 Sheets sync load test")
+    print(f"   {'mode':<10} {'users':>5} {'rows':>7} {'rows/s':>8} {'req':>6} {'rows/req':>8} "
+          f"{'429s':>6} {'p50':>8} {'p95':>8} {'p99':>8}  check")
+    for result in results:
+        latency = "  ".join(f"{result[key]:>6.0f}ms" if result[key] is not None else f"{'-':>8}"
+                            for key in ("p50_ms", "p95_ms", "p99_ms"))
+        check = "✅" if not (result["rows_failed"] or result["mismatched_spreadsheets"]) else \
+            f"❌ {result['rows_failed']} failed, {result['mismatched_spreadsheets']} sheets off"
+        print(f"   {result['mode']:<10} {result['users']:>5} {result['rows_written']:>7} "
+              f"{result['rows_per_second']:>8.1f} {result['requests']:>6} {result['rows_per_request']:>8.2f} "
+              f"{result['throttled']:>6} {latency}  {check}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"results": results}, f, ensure_ascii=False, indent=2)
+        print(f"📄 Results: {args.output}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
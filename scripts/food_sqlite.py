@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - SQLite Export
+Loads the generated catalog and user food history into a SQLite file whose
+tables and indexes mirror supabase/schema.sql, for local analytics and
+offline test fixtures. JSONB columns become TEXT holding JSON (checked with
+json_valid), so the JSON1 functions work on them:
+
+    SELECT name, json_extract(medical_scores, '$.ibd_score') FROM diet_daily_foods;
+
+Rows are bulk-loaded with executemany inside one transaction in WAL mode,
+and indexes are only created once the data is in.
+"""
+
+import json
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from food_history_compact import is_compact_history, iter_compact_history
+
+# Supabase types map onto SQLite affinities: UUID/TIMESTAMP -> TEXT (ISO 8601),
+# DECIMAL -> REAL, BOOLEAN -> INTEGER, JSONB -> TEXT holding valid JSON
+SCHEMA = """
+CREATE TABLE diet_daily_foods (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_en TEXT,
+    brand TEXT,
+    category TEXT NOT NULL,
+    calories REAL,
+    protein REAL,
+    carbohydrates REAL,
+    fat REAL,
+    fiber REAL,
+    sugar REAL,
+    sodium REAL,
+    nutrition_data TEXT DEFAULT '{}' CHECK (json_valid(nutrition_data)),
+    medical_scores TEXT DEFAULT '{}' CHECK (json_valid(medical_scores)),
+    allergens TEXT DEFAULT '[]' CHECK (json_valid(allergens)),
+    tags TEXT DEFAULT '[]' CHECK (json_valid(tags)),
+    properties TEXT DEFAULT '{}' CHECK (json_valid(properties)),
+    verification_status TEXT DEFAULT 'pending' CHECK (verification_status IN ('pending', 'approved', 'rejected')),
+    verified_by TEXT,
+    verification_notes TEXT,
+    verified_at TEXT,
+    created_by TEXT,
+    is_custom INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE food_entries (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    food_id TEXT REFERENCES diet_daily_foods(id),
+    food_name TEXT NOT NULL,
+    food_category TEXT,
+    amount REAL DEFAULT 100,
+    unit TEXT DEFAULT 'g',
+    calories REAL,
+    nutrition_data TEXT DEFAULT '{}' CHECK (json_valid(nutrition_data)),
+    medical_score REAL,
+    medical_analysis TEXT DEFAULT '{}' CHECK (json_valid(medical_analysis)),
+    consumed_at TEXT NOT NULL,
+    meal_type TEXT CHECK (meal_type IN ('breakfast', 'lunch', 'dinner', 'snack')),
+    symptoms_before TEXT DEFAULT '[]' CHECK (json_valid(symptoms_before)),
+    symptoms_after TEXT DEFAULT '[]' CHECK (json_valid(symptoms_after)),
+    symptom_severity REAL,
+    notes TEXT,
+    photo_url TEXT,
+    location TEXT,
+    sync_status TEXT DEFAULT 'synced' CHECK (sync_status IN ('pending', 'synced', 'error')),
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE symptom_tracking (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    symptom_type TEXT NOT NULL,
+    severity REAL NOT NULL CHECK (severity >= 0 AND severity <= 10),
+    description TEXT,
+    recorded_at TEXT NOT NULL,
+    duration_minutes INTEGER,
+    related_food_entry TEXT REFERENCES food_entries(id),
+    triggers TEXT DEFAULT '[]' CHECK (json_valid(triggers)),
+    medications_taken TEXT DEFAULT '[]' CHECK (json_valid(medications_taken)),
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Same names and columns as supabase/schema.sql; created after the bulk load
+INDEXES = """
+CREATE INDEX idx_diet_daily_foods_category ON diet_daily_foods(category);
+CREATE INDEX idx_diet_daily_foods_verification_status ON diet_daily_foods(verification_status);
+CREATE INDEX idx_diet_daily_foods_created_by ON diet_daily_foods(created_by);
+
+CREATE INDEX idx_food_entries_user_id ON food_entries(user_id);
+CREATE INDEX idx_food_entries_consumed_at ON food_entries(consumed_at);
+CREATE INDEX idx_food_entries_food_id ON food_entries(food_id);
+CREATE INDEX idx_food_entries_sync_status ON food_entries(sync_status);
+
+CREATE INDEX idx_symptom_tracking_user_id ON symptom_tracking(user_id);
+CREATE INDEX idx_symptom_tracking_recorded_at ON symptom_tracking(recorded_at);
+"""
+
+FOOD_COLUMNS = [
+    "id", "name", "name_en", "category", "calories", "protein", "carbohydrates", "fat", "fiber",
+    "sugar", "sodium", "nutrition_data", "medical_scores", "allergens", "tags", "properties",
+    "verification_status", "is_custom", "created_at", "updated_at",
+]
+ENTRY_COLUMNS = [
+    "id", "user_id", "food_id", "food_name", "food_category", "amount", "unit", "calories",
+    "nutrition_data", "medical_score", "medical_analysis", "consumed_at", "meal_type",
+    "symptoms_before", "symptoms_after", "symptom_severity", "notes", "photo_url", "location",
+    "created_at", "updated_at",
+]
+SYMPTOM_COLUMNS = [
+    "id", "user_id", "symptom_type", "severity", "recorded_at", "related_food_entry", "created_at", "updated_at",
+]
+
+# Per-100g fields of the additional-foods schema -> diet_daily_foods columns
+NUTRIENT_FIELDS = {
+    "calories_per_100g": "calories",
+    "protein_per_100g": "protein",
+    "carbs_per_100g": "carbohydrates",
+    "fat_per_100g": "fat",
+    "fiber_per_100g": "fiber",
+    "sugar_per_100g": "sugar",
+    "sodium_per_100g": "sodium",
+}
+MEAL_TYPES = {"breakfast", "lunch", "dinner", "snack"}
+SYMPTOM_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "symptoms.diet-daily")
+# History entries per executemany; their symptom rows go in right after them
+ENTRY_BATCH = 10_000
+# Binding NULL would override the column DEFAULT, so missing timestamps fall back explicitly
+TIMESTAMP_COLUMNS = {"created_at", "updated_at"}
+
+# One shared encoder: json.dumps() with non-default options builds a new one per call
+_json = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+def _json_list(value: Any) -> str:
+    return _json(value) if value else "[]"
+
+def food_row(food: Dict[str, Any]) -> Tuple[Any, ...]:
+    """A generator food (or additional-foods item) as a diet_daily_foods row"""
+    scores = food.get("medical_scores") or {}
+    nutrients = {column: food.get(field) for field, column in NUTRIENT_FIELDS.items()}
+    nutrition = {field: food[field] for field in NUTRIENT_FIELDS if field in food}
+    properties = {key: food[key] for key in ("availability", "cooking_methods", "alternatives") if key in food}
+    created = food.get("created")
+    return (
+        food.get("id"),
+        food.get("name_zh") or food.get("name") or "",
+        food.get("name_en"),
+        food.get("category") or "",
+        nutrients["calories"], nutrients["protein"], nutrients["carbohydrates"], nutrients["fat"],
+        nutrients["fiber"], nutrients["sugar"], nutrients["sodium"],
+        _json(nutrition),
+        _json(scores),
+        _json_list(scores.get("major_allergens")),
+        _json_list(food.get("tags")),
+        _json(properties),
+        "approved" if food.get("medical_validated") else "pending",
+        1 if food.get("is_custom") else 0,
+        created,
+        food.get("updated") or created,
+    )
+
+def entry_row(entry: Dict[str, Any]) -> Tuple[Any, ...]:
+    """A FoodHistoryEntry (data/user-food-history.json) as a food_entries row"""
+    food = entry.get("foodData") or {}
+    portion = entry.get("portion") or {}
+    score = entry.get("medicalScore") or {}
+    symptoms = entry.get("symptoms") or {}
+    if portion.get("unit") == "custom":
+        amount, unit = portion.get("customAmount", portion.get("amount")), portion.get("customUnit")
+    else:
+        amount, unit = portion.get("amount"), portion.get("unit")
+    meal_type = entry.get("mealType")
+    return (
+        entry.get("id"),
+        entry.get("userId"),
+        entry.get("foodId") or food.get("id"),
+        food.get("name_zh") or food.get("name") or "",
+        food.get("category"),
+        amount if amount is not None else 100,
+        unit or "g",
+        food.get("calories_per_100g"),
+        _json({field: food[field] for field in NUTRIENT_FIELDS if field in food}) if "calories_per_100g" in food else "{}",
+        score.get("score"),
+        _json(score),
+        entry.get("consumedAt"),
+        meal_type if meal_type in MEAL_TYPES else None,
+        _json_list(symptoms.get("before")),
+        _json_list(symptoms.get("after")),
+        symptoms.get("severity"),
+        entry.get("notes"),
+        entry.get("photoUrl"),
+        entry.get("location"),
+        entry.get("createdAt"),
+        entry.get("updatedAt"),
+    )
+
+def symptom_rows(entry: Dict[str, Any]) -> Iterator[Tuple[Any, ...]]:
+    """One symptom_tracking row per symptom recorded after a meal
+
+    History keeps symptoms inline on the entry; the Supabase schema tracks
+    them separately, linked back through related_food_entry. Ids are derived
+    from the entry, so re-exporting the same history gives the same rows.
+    """
+    symptoms = entry.get("symptoms") or {}
+    if not symptoms.get("after"):
+        return
+    recorded_at = entry.get("consumedAt")
+    if symptoms.get("timeAfter") and recorded_at:
+        consumed = datetime.fromisoformat(recorded_at.replace("Z", "+00:00"))
+        recorded_at = (consumed + timedelta(minutes=symptoms["timeAfter"])).isoformat().replace("+00:00", "Z")
+    for symptom in symptoms["after"]:
+        yield (
+            str(uuid.uuid5(SYMPTOM_ID_NAMESPACE, f"{entry.get('id')}|{symptom}")),
+            entry.get("userId"),
+            symptom,
+            symptoms.get("severity") or 0,
+            recorded_at,
+            entry.get("id"),
+            entry.get("createdAt"),
+            entry.get("updatedAt"),
+        )
+
+def _insert(table: str, columns: List[str]) -> str:
+    values = ", ".join("COALESCE(?, CURRENT_TIMESTAMP)" if column in TIMESTAMP_COLUMNS else "?" for column in columns)
+    return f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({values})"
+
+def export_sqlite(
+    path: str,
+    foods: Iterable[Dict[str, Any]],
+    entries: Iterable[Dict[str, Any]] = ()
+) -> Dict[str, Any]:
+    """Write foods and history entries to a fresh SQLite database and return load stats
+
+    Foods stream straight into executemany; entries and the symptom rows
+    derived from them are inserted together in batches of ENTRY_BATCH, so
+    memory stays flat however long the history is. Duplicate ids keep the
+    last row, matching an upsert on the Supabase side.
+    """
+    started = time.perf_counter()
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        # One transaction and no fsyncs during the load; a crash just means re-exporting
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")
+        for table in ("symptom_tracking", "food_entries", "diet_daily_foods"):
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.executescript(SCHEMA)
+
+        insert_entry = _insert("food_entries", ENTRY_COLUMNS)
+        insert_symptom = _insert("symptom_tracking", SYMPTOM_COLUMNS)
+
+        def flush(rows: List[Tuple[Any, ...]], symptoms: List[Tuple[Any, ...]]):
+            conn.executemany(insert_entry, rows)
+            conn.executemany(insert_symptom, symptoms)
+            rows.clear()
+            symptoms.clear()
+
+        conn.execute("BEGIN")
+        conn.executemany(_insert("diet_daily_foods", FOOD_COLUMNS), (food_row(food) for food in foods))
+        rows: List[Tuple[Any, ...]] = []
+        symptoms: List[Tuple[Any, ...]] = []
+        for entry in entries:
+            rows.append(entry_row(entry))
+            symptoms.extend(symptom_rows(entry))
+            if len(rows) >= ENTRY_BATCH:
+                flush(rows, symptoms)
+        flush(rows, symptoms)
+        conn.execute("COMMIT")
+        loaded = time.perf_counter()
+
+        conn.executescript(INDEXES)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA optimize")
+
+        counts = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("diet_daily_foods", "food_entries", "symptom_tracking")
+        }
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+    finished = time.perf_counter()
+    return {
+        "tables": counts,
+        "load_seconds": round(loaded - started, 3),
+        "index_seconds": round(finished - loaded, 3),
+    }
+
+def load_history_entries(path: Optional[str]) -> Iterator[Dict[str, Any]]:
+    """Entries of a user-food-history.json, an NDJSON history or a compact history"""
+    if not path:
+        return iter(())
+    if is_compact_history(path):
+        return iter_compact_history(path)
+    if path.endswith(".ndjson"):
+        return _iter_ndjson_entries(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return iter(json.load(f).get("entries", []))
+
+def _iter_ndjson_entries(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
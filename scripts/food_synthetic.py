@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Synthetic Load-Test Data
+Seeded scale-out data for load tests at 10^5-10^7 rows:
+
+- foods are variations of the built-in catalog; categories, risk factors,
+  allergens and FODMAP levels are sampled from the foods that category
+  already has
+- users are shaped like data/medical-profiles.json entries
+- diaries are shaped like data/user-food-history.json entries. Meals follow
+  Taipei meal times, favourite foods repeat, and symptoms are more likely
+  after low-scoring meals.
+
+Every record is a pure function of (seed, index), so output is identical
+for a given seed, whatever --jobs is, and any record can be rebuilt without
+the rest. Writers stream one record at a time, so memory stays flat at any
+size.
+"""
+
+import json
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+from medical_batch_scorer import rescore_history
+
+# Fixed so the same seed gives byte-identical output on every run
+SYNTHETIC_CREATED = "2025-09-01T00:00:00"
+DIARY_START = datetime(2025, 9, 1, tzinfo=timezone(timedelta(hours=8)))
+SYNTHETIC_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "synthetic.diet-daily")
+
+# Independent random streams per record kind; index goes in the low bits
+_FOOD, _USER, _DIARY = 1, 2, 3
+
+# (zh prefix, en prefix, cooking method, ibd_score change, risks added, risks removed, chemo override)
+COOKED_STYLES = [
+    ("", "", None, 0, [], [], None),
+    ("清蒸", "Steamed", "清蒸", 1, [], ["deep_fried", "high_fat"], None),
+    ("水煮", "Boiled", "水煮", 1, [], ["deep_fried"], None),
+    ("燉", "Stewed", "燉", 1, [], ["deep_fried"], None),
+    ("滷", "Braised", "滷", 0, ["high_sodium"], [], None),
+    ("炸", "Deep-fried", "炸", -1, ["deep_fried", "high_fat"], [], None),
+    ("麻辣", "Spicy", "炒", -1, ["spicy"], [], None),
+    ("生", "Raw", "生", -1, ["raw"], [], "avoid"),
+]
+SWEET_STYLES = [
+    ("", "", None, 0, [], [], None),
+    ("低糖", "Low-sugar", None, 1, [], ["high_sugar"], None),
+    ("特濃", "Extra-rich", None, -1, ["high_sugar", "high_fat"], [], None),
+]
+PLAIN_STYLES = [("", "", None, 0, [], [], None)]
+CATEGORY_STYLES = {
+    "protein": COOKED_STYLES, "vegetable": COOKED_STYLES, "main_dish": COOKED_STYLES,
+    "grain": COOKED_STYLES[:5], "soup": COOKED_STYLES[:5],
+    "dessert": SWEET_STYLES, "beverage": SWEET_STYLES, "snack": SWEET_STYLES,
+}
+STYLE_WEIGHTS = 3.0  # weight of the unstyled variant relative to each style
+
+# (taiwan, hong_kong, zh prefix, en prefix), weighted toward dishes sold in both
+REGIONS = [(True, True, "", ""), (True, False, "台式", "Taiwanese"), (False, True, "港式", "HK-style")]
+REGION_WEIGHTS = [0.8, 0.12, 0.08]
+
+CONDITIONS = ["ibd", "chemotherapy", "allergy", "ibs"]
+CONDITION_WEIGHTS = [0.4, 0.2, 0.15, 0.25]
+PHASES = ["remission", "mild_symptoms", "active_flare"]
+PHASE_WEIGHTS = [0.6, 0.3, 0.1]
+IBS_SUBTYPES = ["ibs_d", "ibs_c", "ibs_m", "ibs_u"]
+SIDE_EFFECTS = ["噁心", "口腔潰瘍", "疲勞", "食慾不振"]
+PERSONAL_TRIGGERS = ["spicy_food", "high_fiber", "dairy", "high_fat", "caffeine", "alcohol", "raw_food"]
+FODMAP_GROUPS = ["fructans", "galactans", "lactose", "fructose", "polyols"]
+FODMAP_TOLERANCE = ["low", "moderate", "high"]
+
+# (meal type, tag, probability per day, Taipei mean hour, sd hours, items (min, max))
+MEALS = [
+    ("breakfast", "早餐", 0.85, 7.75, 0.6, (1, 2)),
+    ("lunch", "午餐", 0.95, 12.4, 0.5, (1, 3)),
+    ("dinner", "晚餐", 0.97, 18.9, 0.8, (1, 3)),
+    ("snack", "點心", 0.45, 15.5, 1.0, (1, 1)),
+    ("snack", "點心", 0.2, 21.5, 0.8, (1, 1)),
+]
+PORTION_UNITS = ["small", "medium", "large"]
+PORTION_WEIGHTS = [0.25, 0.6, 0.15]
+FAVOURITES = 20
+FAVOURITE_SHARE = 0.4
+# Chance of symptoms after a meal, by medical score (None: unscored)
+SYMPTOM_RATE = {1: 0.35, 2: 0.15, 3: 0.05, 4: 0.02, None: 0.05}
+GI_SYMPTOMS = ["腹痛", "腹瀉", "便秘", "腹脹", "噁心", "胃灼熱", "消化不良"]
+OTHER_SYMPTOMS = ["頭痛", "疲勞", "皮膚搔癢"]
+
+def _rng(rng: random.Random, seed: int, stream: int, index: int) -> random.Random:
+    # Integer seeds are deterministic across processes, unlike hash() of strings
+    rng.seed((seed << 48) ^ (stream << 40) ^ index)
+    return rng
+
+class CatalogModel:
+    """Sampling tables learned from the built-in categories"""
+
+    def __init__(self, foods: List[Dict[str, Any]]):
+        self.foods = foods
+        self.by_category: Dict[str, List[Dict[str, Any]]] = {}
+        for food in foods:
+            self.by_category.setdefault(food["category"], []).append(food)
+        self.categories = sorted(self.by_category)
+        self.category_weights = [len(self.by_category[category]) for category in self.categories]
+
+        def pool(category: str, field: str) -> List[str]:
+            return [value for food in self.by_category[category] for value in food["medical_scores"][field]]
+
+        self.risk_pool = {category: pool(category, "ibd_risk_factors") for category in self.categories}
+        self.allergen_pool = {category: pool(category, "major_allergens") for category in self.categories}
+        self.fodmap_pool = {category: [food["medical_scores"]["fodmap_level"] for food in self.by_category[category]]
+                            for category in self.categories}
+
+_MODEL: Optional[CatalogModel] = None
+
+def catalog_model(generator: Any) -> CatalogModel:
+    """Built-in catalog model, built once per process
+
+    The built-ins are stamped with SYNTHETIC_CREATED rather than the
+    generator's wall-clock time, so a seed reproduces its output byte for byte.
+    """
+    global _MODEL
+    if _MODEL is None:
+        created_at, generator.created_at = generator.created_at, SYNTHETIC_CREATED
+        try:
+            foods = [food for _, method in generator.CATEGORY_BUILDERS for food in generator.run_category_source(method)]
+        finally:
+            generator.created_at = created_at
+        _MODEL = CatalogModel(foods)
+    return _MODEL
+
+def synthetic_food(generator: Any, model: CatalogModel, seed: int, index: int,
+                   rng: Optional[random.Random] = None) -> Dict[str, Any]:
+    """Synthetic food number ``index``; the same (seed, index) always gives the same food"""
+    r = _rng(rng or random.Random(), seed, _FOOD, index)
+    category = r.choices(model.categories, model.category_weights)[0]
+    base = r.choice(model.by_category[category])
+    scores = base["medical_scores"]
+
+    styles = CATEGORY_STYLES.get(category, PLAIN_STYLES)
+    style = r.choices(styles, [STYLE_WEIGHTS] + [1.0] * (len(styles) - 1))[0]
+    style_zh, style_en, method, score_change, risks_added, risks_removed, chemo = style
+    taiwan, hong_kong, region_zh, region_en = r.choices(REGIONS, REGION_WEIGHTS)[0]
+
+    risks = [risk for risk in scores["ibd_risk_factors"] if risk not in risks_removed]
+    risks += [risk for risk in risks_added if risk not in risks]
+    if model.risk_pool[category] and r.random() < 0.2:
+        extra = r.choice(model.risk_pool[category])
+        if extra not in risks:
+            risks.append(extra)
+            score_change -= 1
+    allergens = list(scores["major_allergens"])
+    if model.allergen_pool[category] and r.random() < 0.1:
+        extra = r.choice(model.allergen_pool[category])
+        if extra not in allergens:
+            allergens.append(extra)
+    fodmap = scores["fodmap_level"] if r.random() < 0.8 else r.choice(model.fodmap_pool[category])
+
+    # Names carry the index so ids (derived from names) stay unique at any size
+    return generator.generate_food_item(
+        name_zh=f"{region_zh}{style_zh}{base['name_zh']} {index}",
+        name_en=" ".join(part for part in (region_en, style_en, base["name_en"], str(index)) if part),
+        category=category,
+        ibd_score=max(1, min(4, scores["ibd_score"] + score_change)),
+        ibd_risks=risks,
+        chemo_safety=chemo or scores["chemo_safety"],
+        allergens=allergens,
+        fodmap=fodmap,
+        taiwan_available=taiwan,
+        hk_available=hong_kong,
+        cooking_methods=[method] if method else list(base["cooking_methods"]),
+        alternatives=list(base["alternatives"]),
+    )
+
+def build_synthetic_foods(generator: Any, seed: int, start: int, count: int) -> List[Dict[str, Any]]:
+    """Category source for TaiwanHKFoodGenerator.add_synthetic_foods; module level so it pickles"""
+    model = catalog_model(generator)
+    rng = random.Random()
+    return [synthetic_food(generator, model, seed, index, rng) for index in range(start, start + count)]
+
+def synthetic_user_id(index: int) -> str:
+    return f"synthetic-user-{index:07d}"
+
+def synthetic_user(seed: int, index: int, allergens: List[str], rng: Optional[random.Random] = None) -> Dict[str, Any]:
+    """A medical profile shaped like the entries of data/medical-profiles.json"""
+    r = _rng(rng or random.Random(), seed, _USER, index)
+    user_id = synthetic_user_id(index)
+    primary = r.choices(CONDITIONS, CONDITION_WEIGHTS)[0]
+    secondary = [condition for condition in CONDITIONS if condition != primary and r.random() < 0.15]
+    known_allergies = r.sample(allergens, r.choices([0, 1, 2], [0.6, 0.3, 0.1])[0])
+    if primary == "allergy" and not known_allergies:
+        known_allergies = [r.choice(allergens)]
+    created = DIARY_START - timedelta(days=r.randint(1, 365), seconds=r.randint(0, 86399))
+    created_at = created.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+    profile = {
+        "id": f"profile_{user_id}_{int(created.timestamp() * 1000)}",
+        "userId": user_id,
+        "allergies": known_allergies,
+        "medications": [],
+        "dietaryRestrictions": [],
+        "createdAt": created_at,
+        "updatedAt": created_at,
+        "primary_condition": primary,
+        "secondary_conditions": secondary,
+        "known_allergies": known_allergies,
+        "personal_triggers": r.sample(PERSONAL_TRIGGERS, r.randint(0, 3)),
+        "current_phase": r.choices(PHASES, PHASE_WEIGHTS)[0],
+        "current_side_effects": r.sample(SIDE_EFFECTS, r.randint(0, 2)) if "chemotherapy" in [primary] + secondary else [],
+        "lactose_intolerant": r.random() < 0.2,
+        "fiber_sensitive": r.random() < 0.15,
+        "allergy_severity_levels": {allergy: r.choice(["mild", "moderate", "severe"]) for allergy in known_allergies},
+    }
+    if "ibs" in [primary] + secondary:
+        profile["ibs_subtype"] = r.choice(IBS_SUBTYPES)
+        profile["fodmap_tolerance"] = {group: r.choice(FODMAP_TOLERANCE)
+                                       for group in r.sample(FODMAP_GROUPS, r.randint(1, 3))}
+    return profile
+
+def _utc(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+
+class SyntheticCatalog:
+    """Random access to catalog food ``i``: built-ins first, then synthetic foods"""
+
+    def __init__(self, generator: Any, seed: int, synthetic_count: int, cache_size: int = 65536):
+        self.generator = generator
+        self.model = catalog_model(generator)
+        self.seed = seed
+        self.size = len(self.model.foods) + synthetic_count
+        self._rng = random.Random()
+        self._cache: Dict[int, Dict[str, Any]] = {}
+        self._cache_size = cache_size
+
+    def food(self, index: int) -> Dict[str, Any]:
+        food = self._cache.get(index)
+        if food is None:
+            builtin = len(self.model.foods)
+            if index < builtin:
+                food = self.model.foods[index]
+            else:
+                food = synthetic_food(self.generator, self.model, self.seed, index - builtin, self._rng)
+            if len(self._cache) >= self._cache_size:
+                # Popular foods are re-inserted quickly; a full reset keeps this O(1)
+                self._cache.clear()
+            self._cache[index] = food
+        return food
+
+    def popular_index(self, r: random.Random) -> int:
+        """Skewed toward the front of the catalog, like real dish popularity"""
+        return int(self.size * r.random() ** 2.5)
+
+def synthetic_diary(catalog: SyntheticCatalog, profile: Dict[str, Any], user_index: int, days: int,
+                    rng: Optional[random.Random] = None) -> List[Dict[str, Any]]:
+    """``days`` of diary entries for one user, shaped like data/user-food-history.json entries
+
+    medicalScore is left for the caller to fill in, so it can score many
+    users in one batch.
+    """
+    r = _rng(rng or random.Random(), catalog.seed, _DIARY, user_index)
+    user_id = profile["userId"]
+    favourites = [catalog.popular_index(r) for _ in range(FAVOURITES)]
+    entries = []
+    for day in range(days):
+        midnight = DIARY_START + timedelta(days=day)
+        for meal_type, tag, probability, mean_hour, sd_hours, (low, high) in MEALS:
+            if r.random() >= probability:
+                continue
+            hour = min(23.9, max(5.0, r.gauss(mean_hour, sd_hours)))
+            consumed = midnight + timedelta(hours=hour)
+            for item in range(r.randint(low, high)):
+                index = r.choice(favourites) if r.random() < FAVOURITE_SHARE else catalog.popular_index(r)
+                food = catalog.food(index)
+                consumed_at = consumed + timedelta(seconds=item * r.randint(5, 60))
+                created_at = consumed_at + timedelta(seconds=r.randint(10, 1800))
+                entry = {
+                    "id": str(uuid.uuid5(SYNTHETIC_ID_NAMESPACE, f"{catalog.seed}|{user_id}|{len(entries)}")),
+                    "userId": user_id,
+                    "foodId": food["id"],
+                    "foodData": food,
+                    "consumedAt": _utc(consumed_at),
+                    "portion": {"amount": 1, "unit": r.choices(PORTION_UNITS, PORTION_WEIGHTS)[0]},
+                    "mealType": meal_type,
+                    "tags": [tag, "synthetic"],
+                    "createdAt": _utc(created_at),
+                    "updatedAt": _utc(created_at),
+                }
+                entries.append(entry)
+    return entries
+
+def _add_symptoms(entry: Dict[str, Any], profile: Dict[str, Any], r: random.Random):
+    score = entry["medicalScore"]["score"]
+    if r.random() >= SYMPTOM_RATE.get(score, SYMPTOM_RATE[None]):
+        return
+    pool = GI_SYMPTOMS if profile["primary_condition"] in ("ibd", "ibs") else GI_SYMPTOMS + OTHER_SYMPTOMS
+    entry["symptoms"] = {
+        "before": [],
+        "after": r.sample(pool, r.choices([1, 2, 3], [0.6, 0.3, 0.1])[0]),
+        "severity": max(1, min(5, (5 - (score or 3)) + r.choice([0, 0, 1]))),
+        "timeAfter": int(min(360, max(10, r.gauss(90, 45)))),
+    }
+
+def write_synthetic_users(stream: TextIO, seed: int, count: int, allergens: List[str]) -> int:
+    """One medical profile per line (NDJSON); medical_batch_scorer.load_profiles reads it"""
+    rng = random.Random()
+    for index in range(count):
+        stream.write(json.dumps(synthetic_user(seed, index, allergens, rng), ensure_ascii=False) + "\n")
+    return count
+
+def write_synthetic_history(stream: TextIO, catalog: SyntheticCatalog, users: int, days: int,
+                            allergens: List[str], batch_users: int = 256) -> int:
+    """Diary entries for every user, one per line (NDJSON), scored in batches of users"""
+    user_rng, diary_rng = random.Random(), random.Random()
+    total = 0
+    for start in range(0, users, batch_users):
+        profiles = [synthetic_user(catalog.seed, index, allergens, user_rng)
+                    for index in range(start, min(users, start + batch_users))]
+        batch: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        for offset, profile in enumerate(profiles):
+            batch.extend((entry, profile) for entry in synthetic_diary(catalog, profile, start + offset, days, diary_rng))
+
+        scores, _ = rescore_history([entry for entry, _ in batch], profiles)
+        # Symptoms draw from the same per-batch stream, after every diary is fixed
+        r = _rng(diary_rng, catalog.seed, _DIARY, (1 << 39) | start)
+        for (entry, profile), score in zip(batch, scores):
+            food = entry["foodData"]
+            entry["medicalScore"] = {
+                "score": score["medical_score"],
+                "level": score["level"],
+                "emoji": score["emoji"],
+                "riskFactors": list(food["medical_scores"]["ibd_risk_factors"]),
+                "recommendations": [],
+                "alternatives": list(food["alternatives"]),
+                "medicalReason": "",
+                "urgency": score["urgency"],
+            }
+            _add_symptoms(entry, profile, r)
+            stream.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        total += len(batch)
+    return total
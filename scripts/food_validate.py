@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Food Record Validation
+Checks generated and imported food records against the medical_scoring
+legend in the database header: ibd_score from ibd_scores, chemo_safety
+from chemo_safety, fodmap_level from fodmap_levels and every allergen from
+allergens. FoodValidator compiles the legend once into frozensets and a
+single fast-path predicate; only records that fail it go through the
+per-field diagnostics, so a clean batch costs one expression per record and
+a dirty one reports every error, not just the first.
+"""
+
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+def _is_text(value: Any) -> bool:
+    return isinstance(value, str) and bool(value.strip())
+
+def _is_text_list(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+class ValidationReport:
+    """Counts for a whole batch plus the first ``max_errors`` invalid records"""
+
+    def __init__(self, max_errors: int = 100):
+        self.max_errors = max_errors
+        self.total = 0
+        self.invalid = 0
+        self.error_count = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.seconds = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.invalid == 0
+
+    @property
+    def records_per_second(self) -> float:
+        return self.total / self.seconds if self.seconds else 0.0
+
+    def add(self, index: int, food: Any, problems: List[str]):
+        self.invalid += 1
+        self.error_count += len(problems)
+        if len(self.errors) < self.max_errors:
+            record = food if isinstance(food, dict) else {}
+            self.errors.append({
+                "index": index,
+                "id": record.get("id"),
+                "name_zh": record.get("name_zh"),
+                "errors": problems,
+            })
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "invalid": self.invalid,
+            "errors": self.error_count,
+            "seconds": round(self.seconds, 4),
+            "records_per_second": round(self.records_per_second, 1),
+            "first_errors": self.errors,
+        }
+
+class FoodValidator:
+    """Validates food records as produced by TaiwanHKFoodGenerator.generate_food_item"""
+
+    def __init__(self, ibd_scores: Iterable[int], chemo_classes: Iterable[str],
+                 fodmap_levels: Iterable[str], allergens: Iterable[str]):
+        self.ibd_scores = frozenset(int(score) for score in ibd_scores)
+        self.chemo_classes = frozenset(chemo_classes)
+        self.fodmap_levels = frozenset(fodmap_levels)
+        self.allergens = frozenset(allergens)
+        self._fast_check = self._compile()
+
+    @classmethod
+    def from_legend(cls, medical_scoring: Dict[str, Any]) -> "FoodValidator":
+        """Build the checks from a database header's medical_scoring legend"""
+        return cls(
+            ibd_scores=medical_scoring["ibd_scores"],
+            chemo_classes=medical_scoring["chemo_safety"],
+            fodmap_levels=medical_scoring["fodmap_levels"],
+            allergens=medical_scoring["allergens"],
+        )
+
+    def _compile(self):
+        """One predicate that is True only for a fully valid record
+
+        Everything it touches is bound as a default argument so the hot loop
+        does local lookups only. Anything unexpected (missing keys, wrong
+        types) raises or returns False and falls through to diagnose().
+        """
+        def check(food, dict=dict, list=list, str=str, bool=bool, int=int, type=type,
+                  ibd_scores=self.ibd_scores, chemo_classes=self.chemo_classes,
+                  fodmap_levels=self.fodmap_levels, allergens=self.allergens):
+            scores = food["medical_scores"]
+            availability = food["availability"]
+            return (
+                type(food["id"]) is str and food["id"].strip() != ""
+                and type(food["name_zh"]) is str and food["name_zh"].strip() != ""
+                and type(food["name_en"]) is str and food["name_en"].strip() != ""
+                and type(food["category"]) is str and food["category"].strip() != ""
+                and type(scores["ibd_score"]) is int and scores["ibd_score"] in ibd_scores
+                and type(scores["chemo_safety"]) is str and scores["chemo_safety"] in chemo_classes
+                and type(scores["fodmap_level"]) is str and scores["fodmap_level"] in fodmap_levels
+                and type(scores["major_allergens"]) is list and allergens.issuperset(scores["major_allergens"])
+                and type(scores["ibd_risk_factors"]) is list
+                and all(type(item) is str for item in scores["ibd_risk_factors"])
+                and type(availability["taiwan"]) is bool and type(availability["hong_kong"]) is bool
+                and type(food["cooking_methods"]) is list and all(type(item) is str for item in food["cooking_methods"])
+                and type(food["alternatives"]) is list and all(type(item) is str for item in food["alternatives"])
+            )
+        return check
+
+    def is_valid(self, food: Any) -> bool:
+        try:
+            return self._fast_check(food)
+        except (KeyError, TypeError, AttributeError):
+            return False
+
+    def diagnose(self, food: Any) -> List[str]:
+        """Every problem with one record, as "field: message" strings"""
+        if not isinstance(food, dict):
+            return [f"record: not an object ({type(food).__name__})"]
+        problems = []
+        if not _is_text(food.get("id")):
+            problems.append("id: missing")
+        for key in ("name_zh", "name_en", "category"):
+            if not _is_text(food.get(key)):
+                problems.append(f"{key}: missing or empty")
+
+        scores = food.get("medical_scores")
+        if not isinstance(scores, dict):
+            problems.append("medical_scores: missing")
+            scores = {}
+        else:
+            score = scores.get("ibd_score")
+            if isinstance(score, bool) or not isinstance(score, int) or score not in self.ibd_scores:
+                problems.append(f"ibd_score: {score!r} not in {sorted(self.ibd_scores)}")
+            # Checked as strings first: a list or dict here would make the set lookup raise
+            chemo_safety = scores.get("chemo_safety")
+            if not isinstance(chemo_safety, str) or chemo_safety not in self.chemo_classes:
+                problems.append(f"chemo_safety: {chemo_safety!r} not in {sorted(self.chemo_classes)}")
+            fodmap_level = scores.get("fodmap_level")
+            if not isinstance(fodmap_level, str) or fodmap_level not in self.fodmap_levels:
+                problems.append(f"fodmap_level: {fodmap_level!r} not in {sorted(self.fodmap_levels)}")
+            allergens = scores.get("major_allergens")
+            if not _is_text_list(allergens):
+                problems.append("major_allergens: not a list of strings")
+            else:
+                unknown = [allergen for allergen in allergens if allergen not in self.allergens]
+                if unknown:
+                    problems.append(f"major_allergens: unknown {unknown}")
+            if not _is_text_list(scores.get("ibd_risk_factors")):
+                problems.append("ibd_risk_factors: not a list of strings")
+
+        availability = food.get("availability")
+        if not isinstance(availability, dict):
+            problems.append("availability: missing")
+        else:
+            for region in ("taiwan", "hong_kong"):
+                if not isinstance(availability.get(region), bool):
+                    problems.append(f"availability.{region}: not a boolean")
+        for key in ("cooking_methods", "alternatives"):
+            if not _is_text_list(food.get(key)):
+                problems.append(f"{key}: not a list of strings")
+        return problems
+
+    def validate(self, food: Any) -> List[str]:
+        """Problems with one record; empty when it is valid"""
+        return [] if self.is_valid(food) else self.diagnose(food)
+
+    def iter_checked(self, foods: Iterable[Any], report: ValidationReport) -> Iterator[Any]:
+        """Pass foods through unchanged while recording problems into ``report``
+
+        Lets streaming writers (NDJSON, import) validate in the same pass
+        that writes, without holding the catalog in memory.
+        """
+        is_valid = self.is_valid
+        for food in foods:
+            # Only the checks are timed, not the producer or consumer
+            started = time.perf_counter()
+            if not is_valid(food):
+                report.add(report.total, food, self.diagnose(food))
+            report.total += 1
+            report.seconds += time.perf_counter() - started
+            yield food
+
+    def validate_batch(self, foods: Iterable[Any], max_errors: int = 100) -> ValidationReport:
+        """Validate a whole batch in one pass and collect every invalid record"""
+        report = ValidationReport(max_errors)
+        is_valid = self.is_valid
+        started = time.perf_counter()
+        total = 0
+        for total, food in enumerate(foods, 1):
+            if not is_valid(food):
+                report.add(total - 1, food, self.diagnose(food))
+        report.total = total
+        report.seconds = time.perf_counter() - started
+        return report
+
+def format_report(report: ValidationReport, limit: Optional[int] = 10) -> List[str]:
+    """Human-readable lines for the first ``limit`` invalid records"""
+    lines = []
+    for entry in report.errors[:limit]:
+        label = entry["name_zh"] or entry["id"] or f"#{entry['index']}"
+        lines.append(f"#{entry['index']} {label}: {'; '.join(entry['errors'])}")
+    return lines
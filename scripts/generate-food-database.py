@@ -5,14 +5,97 @@ Generates 200 Taiwan/Hong Kong foods with medical classifications
 for IBD, 化療 (chemotherapy), 過敏 (allergies), and IBS patients
 """
 
+import argparse
+import hashlib
 import json
+import os
+import sys
 import uuid
-from typing import List, Dict, Any
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Dict, Any, Callable, Deque, Iterable, Iterator, Optional, Tuple, TextIO
 from datetime import datetime
+from itertools import islice
+
+from food_binary import write_food_binary
+from food_compress import OUTPUT_PROFILES, brotli, build_artifacts, format_size_report
+from food_copy import COPY_FORMATS, DEFAULT_CHUNK_ROWS, export_copy, validate_copy_directory
+from food_dedupe import NearDuplicateDetector, dedupe_report_path, iter_food_catalog, write_dedupe_report
+from food_delta import load_releases, publish_release
+from food_import import FoodImportPipeline
+from food_index import FilterIndexBuilder, build_filter_index, filter_index_path, sidecar_path, write_filter_index
+from food_records import FoodColumns
+from food_search import SearchIndexBuilder, build_search_index, search_index_path, write_search_index
+from food_shards import write_shards
+from food_sqlite import export_sqlite, load_history_entries
+from food_synthetic import (SYNTHETIC_CREATED, SyntheticCatalog, build_synthetic_foods, write_synthetic_history,
+                            write_synthetic_users)
+from food_validate import FoodValidator, ValidationReport, format_report
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+DEFAULT_OUTPUT = os.path.join(DATA_DIR, 'taiwan-hk-foods.json')
+DEFAULT_HISTORY = os.path.join(DATA_DIR, 'user-food-history.json')
+SYNTHETIC_CHUNK_SIZE = 10000
+
+# Namespace for content-derived food ids (UUIDv5)
+FOOD_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "foods.diet-daily")
+
+def stable_food_id(name_zh: str, name_en: str, category: str) -> str:
+    """Derive a food id that stays the same across regenerations"""
+    return str(uuid.uuid5(FOOD_ID_NAMESPACE, f"{name_zh}|{name_en}|{category}"))
+
+def food_natural_key(food: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (food.get("name_zh"), food.get("name_en"), food.get("category"))
+
+def food_content_hash(food: Dict[str, Any]) -> str:
+    """Hash everything about a food except its identity and creation time"""
+    content = {key: value for key, value in food.items() if key not in ("id", "created")}
+    encoded = json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def build_category(created_at: str, builder: Any, args: Tuple = ()) -> List[Dict[str, Any]]:
+    """Build one category in a worker process
+
+    ``builder`` is either the name of a generator method or a module-level
+    callable taking the generator, so it can be pickled to the pool.
+    """
+    generator = TaiwanHKFoodGenerator()
+    generator.created_at = created_at
+    return generator.run_category_source(builder, args)
 
 class TaiwanHKFoodGenerator:
-    def __init__(self):
+    # Built-in categories in output order: (categories key, builder method)
+    CATEGORY_BUILDERS = [
+        ("taiwan_staples", "generate_taiwan_staples"),
+        ("hongkong_classics", "generate_hongkong_classics"),
+        ("common_proteins", "generate_common_proteins"),
+        ("vegetables_fruits", "generate_vegetables_fruits"),
+        ("grains_starches", "generate_grains_starches"),
+        ("snacks_beverages", "generate_snacks_beverages"),
+    ]
+
+    def __init__(self, jobs: int = 1):
         self.foods = []
+        self.filter_index: Optional[Dict[str, Any]] = None
+        self.jobs = max(1, jobs)
+        # Extra category sources appended after the built-in categories
+        self.extra_sources: List[Tuple[str, Any, Tuple]] = []
+        # Actual item count per category from the last iter_foods() run
+        self.category_counts: Dict[str, int] = {}
+        # Item count per food category from the last write_ndjson() of another stream
+        self.streamed_categories: Dict[str, int] = {}
+        # One timestamp per run so regenerated items only differ when their content does
+        self.created_at = datetime.now().isoformat()
+        # Compiled from the header legend; the report covers the last generation run
+        self.validator = FoodValidator.from_legend(self.build_database_header()["medical_scoring"])
+        self.validation: Optional[ValidationReport] = None
+
+    def add_category_source(self, key: str, builder: Callable[..., List[Dict[str, Any]]], *args: Any):
+        """Register an extra category built by ``builder(generator, *args)``
+
+        Use a module-level function so it can run in the --jobs process pool.
+        """
+        self.extra_sources.append((key, builder, args))
 
     def generate_food_item(
         self,
@@ -32,7 +115,7 @@ class TaiwanHKFoodGenerator:
         """Generate a single food item with medical classifications"""
 
         return {
-            "id": str(uuid.uuid4()),
+            "id": stable_food_id(name_zh, name_en, category),
             "name_zh": name_zh,
             "name_en": name_en,
             "category": category,
@@ -58,7 +141,7 @@ class TaiwanHKFoodGenerator:
             "alternatives": alternatives,
 
             # Metadata
-            "created": datetime.now().isoformat(),
+            "created": self.created_at,
             "medical_validated": True
         }
 
@@ -397,40 +480,86 @@ class TaiwanHKFoodGenerator:
 
         return snacks_drinks
 
-    def generate_complete_database(self) -> Dict[str, Any]:
-        """Generate complete food database"""
-
-        # Generate all food categories
-        self.foods.extend(self.generate_taiwan_staples())
-        self.foods.extend(self.generate_hongkong_classics())
-        self.foods.extend(self.generate_common_proteins())
-        self.foods.extend(self.generate_vegetables_fruits())
-        self.foods.extend(self.generate_grains_starches())
-        self.foods.extend(self.generate_snacks_beverages())
+    def add_synthetic_foods(self, count: int, seed: int, chunk_size: int = SYNTHETIC_CHUNK_SIZE):
+        """Append ``count`` seeded synthetic foods (see food_synthetic) as a "synthetic" category
+
+        Foods are built chunk by chunk as iter_foods() reaches them, so the
+        NDJSON writer streams any count in constant memory.
+        """
+        self.created_at = SYNTHETIC_CREATED
+        for start in range(0, count, chunk_size):
+            self.add_category_source("synthetic", build_synthetic_foods, seed, start, min(chunk_size, count - start))
+
+    def run_category_source(self, builder: Any, args: Tuple = ()) -> List[Dict[str, Any]]:
+        if isinstance(builder, str):
+            return getattr(self, builder)(*args)
+        return builder(self, *args)
+
+    def category_sources(self) -> List[Tuple[str, Any, Tuple]]:
+        return [(key, method, ()) for key, method in self.CATEGORY_BUILDERS] + self.extra_sources
+
+    def iter_foods(self) -> Iterator[Dict[str, Any]]:
+        """Yield every food item category by category without collecting the catalog
+
+        With jobs > 1 categories are built in a process pool; results are still
+        merged in category order, so the output matches a serial run exactly.
+        At most 2 * jobs sources are in flight or waiting to be yielded, so
+        memory stays flat however many synthetic chunks there are.
+        """
+        sources = self.category_sources()
+        self.category_counts = {}
+        if self.jobs == 1:
+            batches = (self.run_category_source(builder, args) for _, builder, args in sources)
+            for (key, _, _), foods in zip(sources, batches):
+                # A source key may repeat, e.g. synthetic foods built in chunks
+                self.category_counts[key] = self.category_counts.get(key, 0) + len(foods)
+                yield from foods
+            return
+
+        with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+            window: Deque[Tuple[str, Future]] = deque()
+            pending = iter(sources)
+            for key, builder, args in islice(pending, 2 * self.jobs):
+                window.append((key, pool.submit(build_category, self.created_at, builder, args)))
+            while window:
+                key, future = window.popleft()
+                source = next(pending, None)
+                if source is not None:
+                    window.append((source[0], pool.submit(build_category, self.created_at, *source[1:])))
+                foods = future.result()
+                self.category_counts[key] = self.category_counts.get(key, 0) + len(foods)
+                yield from foods
+
+    def build_database_header(self, total_items: Optional[int] = None) -> Dict[str, Any]:
+        """Build the metadata, categories and scoring legend shared by every output format"""
+        metadata = {
+            "name": "Taiwan Hong Kong Medical Food Database",
+            "version": "1.0.0",
+            "created": self.created_at,
+        }
+        if total_items is not None:
+            metadata["total_items"] = total_items
+        metadata.update({
+            "medical_focus": ["IBD", "化療", "過敏", "IBS"],
+            "regions": ["Taiwan", "Hong Kong"],
+            "medical_guidelines": [
+                "American Gastroenterological Association (IBD)",
+                "Johns Hopkins Chemotherapy Nutrition",
+                "Stanford Allergy Guidelines",
+                "International Foundation for Gastrointestinal Disorders (IBS)"
+            ]
+        })
 
-        # Database metadata
-        database = {
-            "metadata": {
-                "name": "Taiwan Hong Kong Medical Food Database",
-                "version": "1.0.0",
-                "created": datetime.now().isoformat(),
-                "total_items": len(self.foods),
-                "medical_focus": ["IBD", "化療", "過敏", "IBS"],
-                "regions": ["Taiwan", "Hong Kong"],
-                "medical_guidelines": [
-                    "American Gastroenterological Association (IBD)",
-                    "Johns Hopkins Chemotherapy Nutrition",
-                    "Stanford Allergy Guidelines",
-                    "International Foundation for Gastrointestinal Disorders (IBS)"
-                ]
-            },
+        return {
+            "metadata": metadata,
             "categories": {
                 "taiwan_staples": 50,
                 "hongkong_classics": 50,
                 "common_proteins": 25,
                 "vegetables_fruits": 35,
                 "grains_starches": 20,
-                "snacks_beverages": 20
+                "snacks_beverages": 20,
+                **{key: self.category_counts.get(key, 0) for key, _, _ in self.extra_sources}
             },
             "medical_scoring": {
                 "ibd_scores": {
@@ -448,30 +577,162 @@ class TaiwanHKFoodGenerator:
                     "low": "IBS 友善 - 低 FODMAP",
                     "medium": "適量攝取",
                     "high": "IBS 患者應限制"
+                },
+                "allergens": {
+                    "gluten": "麩質",
+                    "wheat": "小麥",
+                    "eggs": "雞蛋",
+                    "dairy": "乳製品",
+                    "milk": "牛奶",
+                    "peanuts": "花生",
+                    "nuts": "堅果",
+                    "tree nuts": "樹堅果",
+                    "shellfish": "甲殼類海鮮",
+                    "fish": "魚類",
+                    "soy": "大豆",
+                    "sesame": "芝麻"
                 }
-            },
-            "foods": self.foods
+            }
         }
 
-        return database
-
-def main():
-    """Generate and save the Taiwan/Hong Kong medical food database"""
-    print("🏥 Generating Diet Daily Medical Food Database...")
-
-    generator = TaiwanHKFoodGenerator()
-    database = generator.generate_complete_database()
+    def generate_complete_database(self) -> Dict[str, Any]:
+        """Generate complete food database"""
 
-    # Save to JSON file
-    output_file = '/Users/gilko/Documents/claude-code/diet_dialy/data/taiwan-hk-foods.json'
+        # Generate all food categories
+        self.foods.extend(self.iter_foods())
+        self.validation = self.validator.validate_batch(self.foods)
+        self.filter_index = build_filter_index(self.foods)
 
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(database, f, ensure_ascii=False, indent=2)
+        # Database metadata
+        database = self.build_database_header(total_items=len(self.foods))
+        database["foods"] = self.foods
 
-    print(f"✅ Generated {database['metadata']['total_items']} food items")
-    print(f"📄 Saved to: {output_file}")
+        return database
 
-    # Print summary
+    def generate_incremental_database(self, existing: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, List[str]]]:
+        """Regenerate against an existing database, rewriting only the foods that changed
+
+        Existing foods are matched by id, then by (name_zh, name_en, category) so
+        databases written before ids became content-derived keep their ids.
+        Unchanged foods are carried over verbatim; changed foods keep their
+        original id and created timestamp. The updated stamp only moves when
+        something was added, changed or removed.
+        """
+        existing_foods = existing.get("foods", [])
+        by_id = {food.get("id"): food for food in existing_foods}
+        by_key = {food_natural_key(food): food for food in existing_foods}
+        matched = set()
+        summary = {"added": [], "changed": [], "removed": [], "unchanged": []}
+
+        for food in self.iter_foods():
+            previous = by_id.get(food["id"])
+            if previous is None or id(previous) in matched:
+                previous = by_key.get(food_natural_key(food))
+            if previous is None or id(previous) in matched:
+                summary["added"].append(food["id"])
+                self.foods.append(food)
+                continue
+
+            matched.add(id(previous))
+            if food_content_hash(previous) == food_content_hash(food):
+                summary["unchanged"].append(previous["id"])
+                self.foods.append(previous)
+            else:
+                food["id"] = previous.get("id", food["id"])
+                food["created"] = previous.get("created", food["created"])
+                summary["changed"].append(food["id"])
+                self.foods.append(food)
+
+        summary["removed"] = [food.get("id") for food in existing_foods if id(food) not in matched]
+        # Carried-over foods are checked too: the legend may have changed since they were written
+        self.validation = self.validator.validate_batch(self.foods)
+        self.filter_index = build_filter_index(self.foods)
+
+        database = self.build_database_header(total_items=len(self.foods))
+        metadata = dict(existing.get("metadata", {}))
+        metadata.update({key: value for key, value in database["metadata"].items() if key != "created"})
+        metadata.setdefault("created", self.created_at)
+        if summary["added"] or summary["changed"] or summary["removed"]:
+            metadata["updated"] = self.created_at
+        database["metadata"] = metadata
+        database["foods"] = self.foods
+
+        return database, summary
+
+    def generate_columns(self) -> FoodColumns:
+        """Generate the catalog straight into the compact column store"""
+        return FoodColumns.from_foods(self.iter_foods())
+
+    def write_ndjson(
+        self,
+        stream: TextIO,
+        index_builder: Optional[FilterIndexBuilder] = None,
+        search_builder: Optional[SearchIndexBuilder] = None,
+        foods: Optional[Iterable[Dict[str, Any]]] = None
+    ) -> int:
+        """Stream the database as NDJSON: a header record, one line per food, then a footer record
+
+        Foods are written as soon as they are generated, so memory stays flat and
+        readers can start consuming before generation finishes. ``foods``
+        replaces the built-in categories with another stream, e.g. an import;
+        its per-category counts are only known at the end, so they go in the
+        footer and the header's categories are left empty.
+        """
+        generated = foods is None
+        header = {"record": "header", **self.build_database_header()}
+        if not generated:
+            header["categories"] = {}
+        stream.write(json.dumps(header, ensure_ascii=False) + "\n")
+
+        if generated:
+            # Imports validate row by row already; generated foods are checked on the way out
+            self.validation = ValidationReport()
+            foods = self.validator.iter_checked(self.iter_foods(), self.validation)
+
+        total_items = 0
+        streamed: Dict[str, int] = {}
+        for food in foods:
+            stream.write(json.dumps(food, ensure_ascii=False) + "\n")
+            if not generated:
+                category = food.get("category")
+                streamed[category] = streamed.get(category, 0) + 1
+            if index_builder is not None:
+                index_builder.add(food)
+            if search_builder is not None:
+                search_builder.add(food)
+            total_items += 1
+
+        footer = {"record": "footer", "total_items": total_items}
+        if generated:
+            footer["categories"] = self.category_counts
+        else:
+            self.streamed_categories = streamed
+            footer["categories"] = streamed
+        stream.write(json.dumps(footer) + "\n")
+        return total_items
+
+def load_ndjson(path: str) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """Open an NDJSON database and return its header plus a lazy iterator over the foods"""
+    f = open(path, 'r', encoding='utf-8')
+    header = json.loads(f.readline())
+    if header.pop("record", None) != "header":
+        f.close()
+        raise ValueError(f"{path} does not start with an NDJSON header record")
+
+    def foods() -> Iterator[Dict[str, Any]]:
+        with f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if item.get("record") == "footer":
+                    return
+                yield item
+
+    return header, foods()
+
+def print_summary(database: Dict[str, Any]):
+    """Print the category and medical classification summary"""
     print("\n📊 Database Summary:")
     print(f"   Taiwan Staples: {database['categories']['taiwan_staples']}")
     print(f"   Hong Kong Classics: {database['categories']['hongkong_classics']}")
@@ -487,5 +748,376 @@ def main():
     print(f"   Allergens: Common allergens identified")
     print(f"   FODMAP: low/medium/high for IBS")
 
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse generator command line options"""
+    parser = argparse.ArgumentParser(description="Generate the Taiwan/Hong Kong medical food database")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT,
+                        help="output file, or - for stdout (default: data/taiwan-hk-foods.json)")
+    parser.add_argument("--format", choices=["json", "ndjson"], default="json",
+                        help="json writes one document; ndjson streams one food per line")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="build categories in N worker processes (output is identical to --jobs 1)")
+    parser.add_argument("--incremental", action="store_true", default=True,
+                        help="keep the ids of foods in the existing --output file (the default)")
+    parser.add_argument("--fresh", dest="incremental", action="store_false",
+                        help="ignore the existing --output file and issue every id from scratch")
+    parser.add_argument("--import-csv", nargs="+", metavar="PATH",
+                        help="stream foods from CSV/TSV files instead of the built-in lists (writes ndjson)")
+    parser.add_argument("--quarantine", metavar="PATH",
+                        help="where rejected import rows go (default: <output>.quarantine.ndjson)")
+    parser.add_argument("--release", metavar="DIR",
+                        help="publish the catalog as the next version in DIR with a field-level delta from the "
+                             "previous release (JSON format only)")
+    parser.add_argument("--output-profile", choices=OUTPUT_PROFILES, default="pretty",
+                        help="pretty (default), minified JSON, or static: minified plus .gz/.br copies of every "
+                             "client-facing artifact")
+    parser.add_argument("--binary", metavar="PATH",
+                        help="also write the mmap-able binary database (fixed-width records + id hash index)")
+    parser.add_argument("--with-index", action="store_true",
+                        help="also write the allergen/FODMAP/chemo/IBD/region filter index sidecar")
+    parser.add_argument("--with-search", action="store_true",
+                        help="also write the bilingual name search index sidecar")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="report near-duplicate foods (MinHash/LSH over both names) in a .dedupe.json sidecar")
+    parser.add_argument("--dedupe-with", nargs="+", metavar="PATH", default=[],
+                        help="other catalogs to check against, e.g. data/additional-foods.json (implies --dedupe)")
+    parser.add_argument("--dedupe-threshold", type=float, default=0.6,
+                        help="mean name Jaccard similarity at which two foods are duplicates (default: 0.6)")
+    parser.add_argument("--canonical-map", metavar="PATH",
+                        help="also write a duplicate id -> canonical id JSON mapping (implies --dedupe)")
+    parser.add_argument("--sqlite", metavar="PATH",
+                        help="also load the catalog and --history into SQLite, mirroring supabase/schema.sql")
+    parser.add_argument("--pg-copy", metavar="DIR",
+                        help="also write chunked PostgreSQL COPY files for diet_daily_foods and --history food_entries")
+    parser.add_argument("--pg-copy-format", choices=COPY_FORMATS, default="text",
+                        help="COPY file format (default: text)")
+    parser.add_argument("--pg-copy-chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f"rows per COPY chunk file, one parallel load each (default: {DEFAULT_CHUNK_ROWS})")
+    parser.add_argument("--shards", metavar="DIR",
+                        help="also write one shard per category plus a manifest.json for lazy client loading")
+    parser.add_argument("--synthetic-foods", type=int, default=0, metavar="N",
+                        help="append N seeded synthetic foods for load tests (use --format ndjson for large N)")
+    parser.add_argument("--synthetic-users", type=int, default=0, metavar="N",
+                        help="also write N synthetic medical profiles and their diaries as .users/.history NDJSON sidecars")
+    parser.add_argument("--synthetic-days", type=int, default=30, metavar="DAYS",
+                        help="diary length per synthetic user (default: 30)")
+    parser.add_argument("--seed", type=int, default=42,
+                        help="seed for the synthetic data; the same seed gives identical output (default: 42)")
+    parser.add_argument("--history", metavar="PATH", default=DEFAULT_HISTORY,
+                        help="user food history for --sqlite/--pg-copy food_entries (default: data/user-food-history.json)")
+    args = parser.parse_args(argv)
+    args.dedupe = args.dedupe or bool(args.dedupe_with) or bool(args.canonical_map)
+    return args
+
+def import_csv(generator: TaiwanHKFoodGenerator, args: argparse.Namespace, log: TextIO):
+    """Run the streaming CSV/TSV import and print per-stage throughput"""
+    to_stdout = args.output == "-"
+    index_builder = FilterIndexBuilder() if args.with_index else None
+    search_builder = SearchIndexBuilder() if args.with_search else None
+    quarantine_file = args.quarantine or (
+        os.devnull if to_stdout else sidecar_path(args.output, "quarantine", "ndjson"))
+
+    with open(quarantine_file, 'w', encoding='utf-8') as quarantine:
+        pipeline = FoodImportPipeline(generator, quarantine)
+        if to_stdout:
+            total_items = pipeline.run(args.import_csv, sys.stdout)
+        else:
+            with open(args.output, 'w', encoding='utf-8', buffering=1) as f:
+                total_items = pipeline.run(args.import_csv, f,
+                                           index_builder=index_builder, search_builder=search_builder)
+
+    quarantined = sum(stage["quarantined"] for stage in pipeline.report())
+    print(f"✅ Imported {total_items} food items in {pipeline.elapsed:.2f}s", file=log)
+    if quarantined:
+        print(f"⚠️  Quarantined {quarantined} rows: {quarantine_file}", file=log)
+    print("\n📊 Imported Categories:", file=log)
+    for category, count in sorted(generator.streamed_categories.items(), key=lambda item: (-item[1], str(item[0]))):
+        print(f"   {category}: {count}", file=log)
+    print(f"   Total: {total_items} items", file=log)
+    print("\n📈 Import Stages:", file=log)
+    for stage in pipeline.report():
+        print(f"   {stage['stage']:<10} in {stage['in']:>8}  out {stage['out']:>8}  "
+              f"quarantined {stage['quarantined']:>6}  {stage['rows_per_second']:>10.0f} rows/s", file=log)
+
+    if to_stdout:
+        return
+    print(f"📄 Saved to: {args.output}", file=log)
+    if index_builder is not None:
+        write_filter_index(index_builder.to_dict(), filter_index_path(args.output))
+    if search_builder is not None:
+        write_search_index(search_builder.to_dict(), search_index_path(args.output))
+
+def dedupe(foods: Iterable[Dict[str, Any]], args: argparse.Namespace, log: TextIO):
+    """Cluster near-duplicate foods across the output and any --dedupe-with catalogs"""
+    detector = NearDuplicateDetector(threshold=args.dedupe_threshold)
+    detector.add_all(foods, source=os.path.basename(args.output))
+    for path in args.dedupe_with:
+        detector.add_all(iter_food_catalog(path), source=os.path.basename(path))
+
+    clusters = detector.clusters()
+    report_file = dedupe_report_path(args.output)
+    write_dedupe_report(detector.report(clusters), report_file)
+    stats = detector.stats
+    print(f"🧬 Dedupe: {stats['duplicates']} duplicates in {stats['clusters']} clusters "
+          f"({stats['total_items']} foods, {stats['candidate_pairs']} candidate pairs, {stats['seconds']:.2f}s)", file=log)
+    print(f"   Merge report: {report_file}", file=log)
+    if args.canonical_map:
+        with open(args.canonical_map, 'w', encoding='utf-8') as f:
+            json.dump(detector.canonical_map(clusters), f, ensure_ascii=False, indent=2)
+        print(f"   Canonical id map: {args.canonical_map}", file=log)
+
+def binary_export(foods: Iterable[Dict[str, Any]], args: argparse.Namespace, log: TextIO):
+    """Write the mmap-able --binary database"""
+    records = write_food_binary(foods, args.binary)
+    print(f"💾 Binary database: {args.binary} ({records} foods)", file=log)
+
+def sqlite_export(foods: Iterable[Dict[str, Any]], args: argparse.Namespace, log: TextIO):
+    """Bulk-load the catalog and food history into the --sqlite database"""
+    history = args.history if args.history and os.path.exists(args.history) else None
+    stats = export_sqlite(args.sqlite, foods, load_history_entries(history))
+    tables = stats["tables"]
+    print(f"🗄️  SQLite database: {args.sqlite} ({tables['diet_daily_foods']} foods, "
+          f"{tables['food_entries']} entries, {tables['symptom_tracking']} symptoms; "
+          f"load {stats['load_seconds']:.2f}s, indexes {stats['index_seconds']:.2f}s)", file=log)
+
+def pg_copy_export(foods: Iterable[Dict[str, Any]], args: argparse.Namespace, log: TextIO):
+    """Write --pg-copy chunks for the catalog and food history, then re-validate them"""
+    history = args.history if args.history and os.path.exists(args.history) else None
+    manifest = export_copy(args.pg_copy, foods, load_history_entries(history),
+                           copy_format=args.pg_copy_format, chunk_rows=args.pg_copy_chunk_rows)
+    tables = manifest["tables"]
+    print(f"🐘 PostgreSQL COPY files: {args.pg_copy} ({tables['diet_daily_foods']['rows']} foods, "
+          f"{tables['food_entries']['rows']} entries in "
+          f"{sum(len(table['files']) for table in tables.values())} chunks)", file=log)
+    skipped = sum(table["skipped_duplicates"] for table in tables.values())
+    if skipped:
+        print(f"⚠️  Skipped {skipped} rows with an id already exported", file=log)
+    dangling = tables["food_entries"]["dangling_references"]["food_id"]
+    if dangling:
+        print(f"⚠️  {dangling} entries reference foods missing from the catalog; exported with a NULL food_id",
+              file=log)
+    _, errors = validate_copy_directory(args.pg_copy)
+    for error in errors:
+        print(f"❌ {error}", file=log)
+    if errors:
+        sys.exit(1)
+    print(f"   Load with: psql \"$DATABASE_URL\" -f {os.path.join(args.pg_copy, 'load.sql')}", file=log)
+
+def shard_export(header: Dict[str, Any], foods: Iterable[Dict[str, Any]],
+                 category_counts: Optional[Dict[str, int]], args: argparse.Namespace, log: TextIO):
+    """Write --shards: one file per category source plus the manifest"""
+    manifest = write_shards(args.shards, header, foods, category_counts)
+    shards = manifest["shards"]
+    largest = max((shard["bytes"] for shard in shards), default=0)
+    print(f"🧩 Shards: {args.shards} ({len(shards)} shards, {manifest['metadata']['total_items']} foods, "
+          f"largest {largest / 1024:.0f} KiB of {sum(shard['bytes'] for shard in shards) / 1024:.0f} KiB)", file=log)
+
+def release_catalog(database: Dict[str, Any], previous: Optional[Dict[str, Any]],
+                    releases: Optional[Dict[str, Any]], args: argparse.Namespace, log: TextIO):
+    """Publish --release and stamp the database with the version it was released as"""
+    release = publish_release(args.release, database, previous, releases)
+    if release.get("unchanged"):
+        print(f"🏷️  Release {release['version']}: catalog unchanged, nothing published", file=log)
+    elif release["delta"] is None:
+        print(f"🏷️  Release {release['version']}: first release in {args.release} ({release['items']} foods)", file=log)
+    else:
+        ops = release["ops"]
+        print(f"🏷️  Release {release['version']}: {release['delta']} "
+              f"(+{ops['add']} ~{ops['update']} -{ops['delete']}, {release['delta_bytes'] / 1024:.1f} KiB)", file=log)
+
+def output_artifacts(args: argparse.Namespace, log: TextIO):
+    """Apply --output-profile to the database and every client-facing sidecar written this run"""
+    paths = [args.output]
+    if args.with_index:
+        paths.append(filter_index_path(args.output))
+    if args.with_search:
+        paths.append(search_index_path(args.output))
+    if args.binary and os.path.exists(args.binary):
+        paths.append(args.binary)
+    if args.shards:
+        with open(os.path.join(args.shards, "manifest.json"), 'r', encoding='utf-8') as f:
+            shard_files = [shard["file"] for shard in json.load(f)["shards"]]
+        paths.extend(os.path.join(args.shards, name) for name in ["manifest.json"] + shard_files)
+
+    if args.output_profile == "static" and brotli is None:
+        print("⚠️  brotli is not installed; writing .gz copies only (pip install brotli)", file=log)
+    report = build_artifacts(paths, args.output_profile, workers=args.jobs if args.jobs > 1 else None)
+    print(f"📦 {args.output_profile.capitalize()} artifacts: {len(report['files'])} files in "
+          f"{report['seconds']:.2f}s ({report['workers']} workers)", file=log)
+    for line in format_size_report(report):
+        print(line, file=log)
+
+def synthesize_users(generator: TaiwanHKFoodGenerator, args: argparse.Namespace, log: TextIO):
+    """Write synthetic profiles and diaries next to the output; they become the default --history"""
+    allergens = sorted(generator.build_database_header()["medical_scoring"]["allergens"])
+    users_file = sidecar_path(args.output, "users", "ndjson")
+    history_file = sidecar_path(args.output, "history", "ndjson")
+    with open(users_file, 'w', encoding='utf-8') as f:
+        write_synthetic_users(f, args.seed, args.synthetic_users, allergens)
+    catalog = SyntheticCatalog(generator, args.seed, args.synthetic_foods)
+    with open(history_file, 'w', encoding='utf-8') as f:
+        entries = write_synthetic_history(f, catalog, args.synthetic_users, args.synthetic_days, allergens)
+    print(f"🧪 Synthetic users: {users_file} ({args.synthetic_users} profiles)", file=log)
+    print(f"🧪 Synthetic diaries: {history_file} ({entries} entries over {args.synthetic_days} days)", file=log)
+    if args.history == DEFAULT_HISTORY:
+        args.history = history_file
+
+def report_validation(report: ValidationReport, log: TextIO):
+    """Print the validation result and stop the run if any record broke the legend"""
+    if report.ok:
+        print(f"🩺 Validated {report.total} food items ({report.records_per_second:,.0f} records/s)", file=log)
+        return
+    print(f"❌ {report.invalid} of {report.total} food items failed validation "
+          f"({report.error_count} errors):", file=sys.stderr)
+    for line in format_report(report):
+        print(f"   {line}", file=sys.stderr)
+    sys.exit(1)
+
+def main(argv: Optional[List[str]] = None):
+    """Generate and save the Taiwan/Hong Kong medical food database"""
+    args = parse_args(argv)
+    to_stdout = args.output == "-"
+    log = sys.stderr if to_stdout else sys.stdout
+    print("🏥 Generating Diet Daily Medical Food Database...", file=log)
+
+    generator = TaiwanHKFoodGenerator(jobs=args.jobs)
+    output_file = args.output
+
+    if (args.with_index or args.with_search or args.dedupe) and to_stdout:
+        print("❌ --with-index/--with-search/--dedupe need a file --output to place sidecars next to", file=sys.stderr)
+        sys.exit(2)
+
+    if args.binary and to_stdout and (args.format == "ndjson" or args.import_csv):
+        print("❌ --binary with --format ndjson or --import-csv needs a file --output to read the foods back from",
+              file=sys.stderr)
+        sys.exit(2)
+
+    if args.release and (to_stdout or args.format != "json" or args.import_csv):
+        print("❌ --release needs a JSON --output file and generated foods", file=sys.stderr)
+        sys.exit(2)
+
+    if args.synthetic_foods:
+        generator.add_synthetic_foods(args.synthetic_foods, args.seed)
+    if args.synthetic_users:
+        if to_stdout:
+            print("❌ --synthetic-users needs a file --output to place its sidecars next to", file=sys.stderr)
+            sys.exit(2)
+        synthesize_users(generator, args, log)
+
+    if args.import_csv:
+        import_csv(generator, args, log)
+        if args.binary:
+            binary_export(load_ndjson(output_file)[1], args, log)
+        if args.dedupe:
+            dedupe(load_ndjson(output_file)[1], args, log)
+        if args.sqlite and not to_stdout:
+            sqlite_export(load_ndjson(output_file)[1], args, log)
+        if args.pg_copy and not to_stdout:
+            pg_copy_export(load_ndjson(output_file)[1], args, log)
+        if args.shards and not to_stdout:
+            # Imports carry no category sources, so they shard by food category
+            header, foods = load_ndjson(output_file)
+            shard_export(header, foods, None, args, log)
+        if args.output_profile != "pretty" and not to_stdout:
+            output_artifacts(args, log)
+        return
+
+    if args.format == "ndjson":
+        index_builder = FilterIndexBuilder() if args.with_index else None
+        search_builder = SearchIndexBuilder() if args.with_search else None
+        if to_stdout:
+            total_items = generator.write_ndjson(sys.stdout)
+        else:
+            # Line buffered so consumers tailing the file see each food immediately
+            with open(output_file, 'w', encoding='utf-8', buffering=1) as f:
+                total_items = generator.write_ndjson(f, index_builder, search_builder)
+        print(f"✅ Streamed {total_items} food items", file=log)
+        report_validation(generator.validation, log)
+        if not to_stdout:
+            print(f"📄 Saved to: {output_file}")
+        if index_builder is not None:
+            index_file = filter_index_path(output_file)
+            write_filter_index(index_builder.to_dict(), index_file)
+            print(f"🗂️  Filter index: {index_file}")
+        if search_builder is not None:
+            search_file = search_index_path(output_file)
+            write_search_index(search_builder.to_dict(), search_file)
+            print(f"🔎 Search index: {search_file}")
+        if args.binary:
+            binary_export(load_ndjson(output_file)[1], args, log)
+        if args.dedupe and not to_stdout:
+            dedupe(load_ndjson(output_file)[1], args, log)
+        if args.sqlite and not to_stdout:
+            sqlite_export(load_ndjson(output_file)[1], args, log)
+        if args.pg_copy and not to_stdout:
+            pg_copy_export(load_ndjson(output_file)[1], args, log)
+        if args.shards and not to_stdout:
+            shard_export(generator.build_database_header(), load_ndjson(output_file)[1],
+                         generator.category_counts, args, log)
+        if args.output_profile != "pretty" and not to_stdout:
+            output_artifacts(args, log)
+        return
+
+    # A release regenerates against the previous release so unchanged foods keep their ids and timestamps;
+    # otherwise an existing output file is the baseline, so foodIds in user history stay valid
+    releases, existing = load_releases(args.release) if args.release else (None, None)
+    existing_source = f"release {releases['latest']}" if releases else output_file
+    if existing is None and args.incremental and not to_stdout and os.path.exists(output_file):
+        with open(output_file, 'r', encoding='utf-8') as f:
+            existing = json.load(f)
+    unchanged = False
+    if existing is not None:
+        database, changes = generator.generate_incremental_database(existing)
+        unchanged = not (changes["added"] or changes["changed"] or changes["removed"])
+        print(f"🔁 Incremental regeneration against {existing_source}")
+        print(f"   ➕ Added: {len(changes['added'])}")
+        print(f"   ✏️  Changed: {len(changes['changed'])}")
+        print(f"   ➖ Removed: {len(changes['removed'])}")
+        print(f"   ✔️  Unchanged: {len(changes['unchanged'])}")
+    else:
+        database = generator.generate_complete_database()
+    # Nothing is written for an invalid catalog
+    report_validation(generator.validation, log)
+    if args.release:
+        release_catalog(database, existing if releases else None, releases, args, log)
+
+    if to_stdout:
+        json.dump(database, sys.stdout, ensure_ascii=False, indent=2)
+    elif not (unchanged and not releases):
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(database, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ Generated {database['metadata']['total_items']} food items", file=log)
+    if to_stdout:
+        return
+    if unchanged and not releases:
+        print(f"📄 {output_file} is up to date, nothing written")
+    else:
+        print(f"📄 Saved to: {output_file}")
+
+    if args.with_index:
+        index_file = filter_index_path(output_file)
+        write_filter_index(generator.filter_index, index_file)
+        print(f"🗂️  Filter index: {index_file}")
+    if args.with_search:
+        search_file = search_index_path(output_file)
+        write_search_index(build_search_index(database["foods"]), search_file)
+        print(f"🔎 Search index: {search_file}")
+    if args.binary:
+        binary_export(database["foods"], args, log)
+    if args.dedupe:
+        dedupe(database["foods"], args, log)
+    if args.sqlite:
+        sqlite_export(database["foods"], args, log)
+    if args.pg_copy:
+        pg_copy_export(database["foods"], args, log)
+    if args.shards:
+        header = {key: value for key, value in database.items() if key != "foods"}
+        shard_export(header, database["foods"], generator.category_counts, args, log)
+    if args.output_profile != "pretty":
+        output_artifacts(args, log)
+
+    print_summary(database)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
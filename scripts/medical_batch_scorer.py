@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+Diet Daily - Batch Medical Scorer
+Vectorized port of the TypeScript MedicalScoringEngine
+(src/lib/medical/scoring-engine.ts) for backfilling food_entries.medical_score
+after a rule change. Foods are encoded once as NumPy arrays (risk-factor
+masks, allergen masks, name keyword masks, FODMAP level, chemo class) and
+profiles as per-profile flags, so a whole profile x food matrix is scored
+with array operations instead of one scoreFood() call per entry.
+
+Only the numeric outcome is ported: score (1-4) and urgency. The free text
+of medical_analysis (recommendations, reasons, alternatives) is left to the
+TypeScript engine. The rules mirror the TS code exactly, including its
+quirks (case-sensitive single-condition routing, exact-match risk factors,
+JavaScript Math.round), so results can be compared one to one against
+src/lib/medical/__tests__/fixtures/scoring-parity.json.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+URGENCY_LEVELS = ["low", "medium", "high", "critical"]
+LOW, MEDIUM, HIGH, CRITICAL = range(4)
+
+SCORE_LEVELS = {1: "差", 2: "普通", 3: "好", 4: "完美"}
+SCORE_EMOJIS = {1: "😞", 2: "😐", 3: "😊", 4: "😍"}
+
+# Default scoring returns the food's own ibd_score; foods without one are unscored
+UNSCORED = 0
+
+# IBDScorer
+ACUTE_FORBIDDEN = [
+    '生食', 'raw food', '高不溶性纖維', 'high fiber', '辛辣食物', 'spicy food',
+    '酒精', 'alcohol', '高脂肪食物', 'high fat', '碳酸飲料', 'carbonated drinks',
+    '咖啡因', 'caffeine', '生蔬菜', 'raw vegetables', '全穀類', 'whole grains',
+    '堅果種子', 'nuts seeds', '豆類', 'legumes', '油炸食物', 'fried food', '紅肉', 'red meat'
+]
+FLARE_RECOMMENDED = ['白粥', '蒸蛋', '去皮雞湯', '蒸魚', '香蕉', '白土司']
+REMISSION_AVOID = [
+    '油炸食物', 'fried food', '加工食品', 'processed food',
+    '辛辣食物', 'spicy food', '酒精', 'alcohol',
+    '碳酸飲料', 'carbonated drinks', '人工甜味劑', 'artificial sweeteners',
+    '高糖', 'high sugar'
+]
+REMISSION_CAUTION = ['紅肉', 'red meat', '乳製品', 'dairy', '高脂肪食物', 'high fat', '生食', 'raw food']
+REMISSION_GOOD = ['蒸', '煮', '燉', '清蒸', '水煮']
+REMISSION_RECOMMENDED = ['魚', '雞肉', '蒸蛋', '白飯', '麵條', '白粥', '粥']
+
+# ChemoScorer
+CHEMO_CRITICAL_RISKS = ['生食', '未殺菌乳製品', '軟起司', '生蛋', '生魚片', '豆芽菜']
+NAUSEA_TRIGGERS = ['油膩', '辛辣', '強烈氣味', '過甜']
+NAUSEA_FRIENDLY = ['清淡', '餅乾', '薑', '薄荷']
+MOUTH_SORE_TRIGGERS = ['酸性', '辛辣', '粗糙質地', '很熱']
+MOUTH_SORE_FRIENDLY = ['軟質', '溫涼', '滑順']
+HIGH_PROTEIN = ['蛋', '魚', '雞肉', '豆腐']
+HIGH_CALORIE = ['堅果', '酪梨', '橄欖油']
+
+# AllergyScorer
+CROSS_CONTAMINATION = {
+    '花生': ['堅果加工廠', '烘焙食品'],
+    '牛奶': ['乳製品加工', '烘焙食品'],
+    '小麥': ['麵粉加工', '燕麥產品'],
+    '雞蛋': ['烘焙食品', '麵食產品'],
+}
+
+# IBSScorer
+IBS_D_NAME_TRIGGERS = ['油', '辣']
+IBS_C_REFINED = ['白米', '白麵']
+FODMAP_TYPES = ['fructan', 'lactose', 'fructose', 'polyols', 'galactans']
+TOLERANCE_ADJUSTMENT = {'high': 1, 'medium': 0, 'low': -1}
+
+# Condition routing, as in MedicalScoringEngine / MultiConditionScorer
+IBD, CHEMO, ALLERGY, IBS = "ibd", "chemotherapy", "allergy", "ibs"
+SINGLE_CONDITION_ROUTES = {
+    'ibd': IBD, 'IBD': IBD, 'Crohns': IBD, 'UC': IBD,
+    'chemotherapy': CHEMO, '化療': CHEMO, 'Chemotherapy': CHEMO,
+    'allergy': ALLERGY, '過敏': ALLERGY, 'Food_Allergies': ALLERGY,
+    'ibs': IBS, 'IBS': IBS,
+}
+MULTI_CONDITION_ROUTES = {
+    'ibd': IBD, 'crohns': IBD, 'uc': IBD,
+    'chemotherapy': CHEMO, '化療': CHEMO,
+    'allergy': ALLERGY, '過敏': ALLERGY,
+    'ibs': IBS,
+}
+
+def js_round(values: np.ndarray) -> np.ndarray:
+    """JavaScript Math.round: halves round towards +infinity (np.round rounds to even)"""
+    return np.floor(values + 0.5)
+
+def clamp_score(values: np.ndarray) -> np.ndarray:
+    return np.clip(js_round(values), 1, 4).astype(np.int8)
+
+def _list(value: Any) -> List[Any]:
+    return value if isinstance(value, list) else []
+
+class FoodMatrix:
+    """Foods encoded column-wise for scoring; row n is foods[n]"""
+
+    def __init__(self, foods: Sequence[Dict[str, Any]]):
+        self.size = len(foods)
+        self.ids = [food.get("id") for food in foods]
+        self.names = [food.get("name_zh") or "" for food in foods]
+        self.categories = [food.get("category") or "" for food in foods]
+        scores = [food.get("medical_scores") or {} for food in foods]
+        self.risk_factors = [set(_list(s.get("ibd_risk_factors"))) for s in scores]
+        self.allergens = [set(_list(s.get("major_allergens"))) for s in scores]
+
+        self.fodmap_high = np.array([s.get("fodmap_level") == "high" for s in scores], dtype=bool)
+        self.fodmap_medium = np.array([s.get("fodmap_level") == "medium" for s in scores], dtype=bool)
+        self.chemo_avoid = np.array([s.get("chemo_safety") == "avoid" for s in scores], dtype=bool)
+        self.ibd_score = np.array(
+            [s["ibd_score"] if isinstance(s.get("ibd_score"), (int, float)) else UNSCORED for s in scores],
+            dtype=np.int8
+        )
+        # Masks over the fixed scorer term lists are memoized, so scorers sharing this matrix only pay for
+        # them once; per-profile vocabularies (triggers, allergies) pass memo=False so they are never retained
+        self._masks: Dict[Tuple[str, Tuple[str, ...]], np.ndarray] = {}
+
+    def _memo(self, kind: str, terms: Iterable[str], build: Callable[[List[str]], np.ndarray],
+              memo: bool = True) -> np.ndarray:
+        if not memo:
+            return build(list(terms))
+        key = (kind, tuple(terms))
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = self._masks[key] = build(list(key[1]))
+            mask.flags.writeable = False
+        return mask
+
+    def has_risk(self, terms: Iterable[str]) -> np.ndarray:
+        """(foods, terms) mask: ibd_risk_factors contains the term exactly"""
+        return self._memo("risk", terms, self._has_risk)
+
+    def _has_risk(self, terms: List[str]) -> np.ndarray:
+        mask = np.zeros((self.size, len(terms)), dtype=bool)
+        for row, risks in enumerate(self.risk_factors):
+            if risks:
+                mask[row] = [term in risks for term in terms]
+        return mask
+
+    def name_contains(self, terms: Iterable[str], memo: bool = True) -> np.ndarray:
+        """(foods, terms) mask: name_zh contains the term as a substring"""
+        return self._memo("name", terms, lambda terms: self._contains(self.names, terms), memo)
+
+    def category_contains(self, terms: Iterable[str]) -> np.ndarray:
+        return self._memo("category", terms, lambda terms: self._contains(self.categories, terms))
+
+    def _contains(self, values: List[str], terms: List[str]) -> np.ndarray:
+        return np.array([[term in value for term in terms] for value in values], dtype=bool).reshape(self.size, len(terms))
+
+    def has_allergen(self, allergens: Iterable[str], memo: bool = True) -> np.ndarray:
+        """(foods, allergens) mask: major_allergens contains the allergen exactly"""
+        return self._memo("allergen", allergens, self._has_allergen, memo)
+
+    def _has_allergen(self, allergens: List[str]) -> np.ndarray:
+        mask = np.zeros((self.size, len(allergens)), dtype=bool)
+        for row, present in enumerate(self.allergens):
+            if present:
+                mask[row] = [allergen in present for allergen in allergens]
+        return mask
+
+class ProfileMatrix:
+    """Medical profiles encoded as per-profile flags and membership masks"""
+
+    def __init__(self, profiles: Sequence[Dict[str, Any]]):
+        self.size = len(profiles)
+        self.ids = [profile.get("userId") or profile.get("id") for profile in profiles]
+        self.flare = np.array([profile.get("current_phase") == "active_flare" for profile in profiles], dtype=bool)
+
+        side_effects = [_list(profile.get("current_side_effects")) for profile in profiles]
+        self.nausea = np.array(['噁心' in effects for effects in side_effects], dtype=bool)
+        self.mouth_sores = np.array(['口腔潰瘍' in effects for effects in side_effects], dtype=bool)
+
+        subtypes = [profile.get("ibs_subtype") or "ibs_m" for profile in profiles]
+        self.ibs_d = np.array([subtype == "ibs_d" for subtype in subtypes], dtype=bool)
+        self.ibs_c = np.array([subtype == "ibs_c" for subtype in subtypes], dtype=bool)
+        self.fodmap_tolerance = [profile.get("fodmap_tolerance") or {} for profile in profiles]
+
+        # Vocabularies shared by all profiles; each profile is a row mask over them
+        self.triggers = sorted({t for p in profiles for t in _list(p.get("personal_triggers"))})
+        self.trigger_mask = self._mask(profiles, "personal_triggers", self.triggers)
+        self.allergies = sorted({a for p in profiles for a in _list(p.get("known_allergies"))})
+        self.allergy_mask = self._mask(profiles, "known_allergies", self.allergies)
+        self.cross_allergies = [allergy for allergy in CROSS_CONTAMINATION if allergy in self.allergies]
+        self.cross_mask = self.allergy_mask[:, [self.allergies.index(a) for a in self.cross_allergies]]
+
+        self.conditions = [self._route(profile) for profile in profiles]
+        self.allergy_override = np.array([
+            bool(_list(profile.get("known_allergies"))) and profile.get("primary_condition") != "Food_Allergies"
+            for profile in profiles
+        ], dtype=bool)
+        self.multi = np.array([bool(_list(profile.get("secondary_conditions"))) for profile in profiles], dtype=bool)
+
+    def _mask(self, profiles: Sequence[Dict[str, Any]], field: str, vocabulary: List[str]) -> np.ndarray:
+        mask = np.zeros((self.size, len(vocabulary)), dtype=bool)
+        position = {value: column for column, value in enumerate(vocabulary)}
+        for row, profile in enumerate(profiles):
+            for value in _list(profile.get(field)):
+                mask[row, position[value]] = True
+        return mask
+
+    @staticmethod
+    def _route(profile: Dict[str, Any]) -> List[str]:
+        """Scorers applied to a profile; [] means default scoring"""
+        secondary = _list(profile.get("secondary_conditions"))
+        primary = profile.get("primary_condition") or ""
+        if not secondary:
+            route = SINGLE_CONDITION_ROUTES.get(primary)
+            return [route] if route else []
+        routes = []
+        for condition in [primary] + secondary:
+            route = MULTI_CONDITION_ROUTES.get(str(condition).lower())
+            if route and route not in routes:
+                routes.append(route)
+        if not routes:
+            # MultiConditionScorer throws for every food in this case
+            raise ValueError(f"profile {profile.get('userId') or profile.get('id')}: no valid medical conditions")
+        return routes
+
+def _overlap(profile_mask: np.ndarray, food_mask: np.ndarray, p: np.ndarray, f: np.ndarray) -> np.ndarray:
+    """Count shared terms for every (profile, food) pair the index arrays broadcast to"""
+    if profile_mask.shape[1] == 0:
+        return np.zeros(np.broadcast(p, f).shape, dtype=np.int32)
+    return np.einsum("...t,...t->...", profile_mask[p].astype(np.int32), food_mask[f].astype(np.int32))
+
+class BatchScorer:
+    """Scores every profile against every food, or explicit (profile, food) pairs"""
+
+    def __init__(self, foods: Union[FoodMatrix, Sequence[Dict[str, Any]]], profiles: Sequence[Dict[str, Any]]):
+        # A prebuilt FoodMatrix can be shared by scorers for different profile sets
+        self.foods = foods if isinstance(foods, FoodMatrix) else FoodMatrix(foods)
+        self.profiles = ProfileMatrix(profiles)
+        self._encode()
+
+    def _encode(self):
+        """Precompute the food-side vectors; everything profile-independent happens once"""
+        foods, profiles = self.foods, self.profiles
+
+        # IBD
+        self.acute_forbidden = foods.has_risk(ACUTE_FORBIDDEN).any(axis=1)
+        self.flare_base = np.where(foods.name_contains(FLARE_RECOMMENDED).any(axis=1), 4.0, 2.0)
+        avoid = foods.has_risk(REMISSION_AVOID).any(axis=1)
+        caution = foods.has_risk(REMISSION_CAUTION).sum(axis=1)
+        base = np.where(avoid, 1.0, 3.0) - caution
+        base += foods.name_contains(REMISSION_GOOD).any(axis=1)
+        base += 0.5 * foods.name_contains(REMISSION_RECOMMENDED).any(axis=1)
+        self.remission_base = base
+        self.remission_urgency = np.where(caution > 0, MEDIUM, np.where(avoid, HIGH, LOW))
+        self.trigger_mask = foods.name_contains(profiles.triggers, memo=False)
+
+        # Chemo
+        self.chemo_critical = (
+            foods.chemo_avoid
+            | foods.name_contains(CHEMO_CRITICAL_RISKS).any(axis=1)
+            | foods.has_risk(CHEMO_CRITICAL_RISKS).any(axis=1)
+        )
+        self.nausea_adjustment = (
+            -2.0 * foods.name_contains(NAUSEA_TRIGGERS).any(axis=1)
+            + 0.5 * foods.name_contains(NAUSEA_FRIENDLY).any(axis=1)
+        )
+        self.mouth_sore_adjustment = (
+            -2.0 * foods.name_contains(MOUTH_SORE_TRIGGERS).any(axis=1)
+            + 0.5 * foods.name_contains(MOUTH_SORE_FRIENDLY).any(axis=1)
+        )
+        self.nutrition_bonus = (
+            0.3 * foods.name_contains(HIGH_PROTEIN).any(axis=1)
+            + 0.2 * foods.name_contains(HIGH_CALORIE).any(axis=1)
+        )
+
+        # Allergy
+        self.allergen_mask = foods.has_allergen(profiles.allergies, memo=False)
+        cross = np.zeros((foods.size, len(profiles.cross_allergies)), dtype=bool)
+        for column, allergy in enumerate(profiles.cross_allergies):
+            sources = CROSS_CONTAMINATION[allergy]
+            cross[:, column] = foods.name_contains(sources).any(axis=1) | foods.category_contains(sources).any(axis=1)
+        self.cross_mask = cross
+
+        # IBS
+        self.ibs_base = np.where(foods.fodmap_high, 1.0, np.where(foods.fodmap_medium, 2.0, 4.0))
+        self.ibs_urgency = np.where(foods.fodmap_high, HIGH, np.where(foods.fodmap_medium, MEDIUM, LOW))
+        high_fiber = foods.has_risk(['high fiber'])[:, 0]
+        self.ibs_d_adjustment = (
+            -1.0 * foods.name_contains(IBS_D_NAME_TRIGGERS).any(axis=1)
+            - 1.0 * (foods.name_contains(['纖維'])[:, 0] | high_fiber)
+        )
+        self.ibs_c_adjustment = 0.5 * high_fiber - 0.5 * foods.name_contains(IBS_C_REFINED).any(axis=1)
+        self.fodmap_type_mask = foods.name_contains(FODMAP_TYPES)
+        self.tolerance_adjustment = self._tolerance_adjustment()
+
+    def _tolerance_adjustment(self) -> np.ndarray:
+        """(profiles, foods) adjustment from the first FODMAP type both named and rated"""
+        profiles = self.profiles
+        adjustment = np.zeros((profiles.size, self.foods.size), dtype=np.float64)
+        for row, tolerance in enumerate(profiles.fodmap_tolerance):
+            decided = np.zeros(self.foods.size, dtype=bool)
+            for column, fodmap_type in enumerate(FODMAP_TYPES):
+                if tolerance.get(fodmap_type) not in TOLERANCE_ADJUSTMENT:
+                    continue
+                hit = self.fodmap_type_mask[:, column] & ~decided
+                adjustment[row, hit] = TOLERANCE_ADJUSTMENT[tolerance[fodmap_type]]
+                decided |= hit
+        return adjustment
+
+    def _ibd(self, p: np.ndarray, f: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        profiles = self.profiles
+        flare = profiles.flare[p]
+        triggered = _overlap(profiles.trigger_mask, self.trigger_mask, p, f)
+        base = np.where(flare, self.flare_base[f], self.remission_base[f]) - 3.0 * triggered
+        urgency = np.where(triggered > 0, HIGH, np.where(flare, LOW, self.remission_urgency[f]))
+        score = clamp_score(base)
+        acute = flare & self.acute_forbidden[f]
+        return np.where(acute, 1, score), np.where(acute, CRITICAL, urgency)
+
+    def _chemo(self, p: np.ndarray, f: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        profiles = self.profiles
+        side_effects = (
+            np.where(profiles.nausea[p], self.nausea_adjustment[f], 0.0)
+            + np.where(profiles.mouth_sores[p], self.mouth_sore_adjustment[f], 0.0)
+        )
+        score = clamp_score(4.0 + side_effects + self.nutrition_bonus[f])
+        critical = np.broadcast_to(self.chemo_critical[f], score.shape)
+        urgency = np.where(critical, CRITICAL, np.where(score <= 2, HIGH, LOW))
+        return np.where(critical, 1, score), urgency
+
+    def _allergy(self, p: np.ndarray, f: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        profiles = self.profiles
+        allergic = _overlap(profiles.allergy_mask, self.allergen_mask, p, f) > 0
+        cross = (_overlap(profiles.cross_mask, self.cross_mask, p, f) > 0).astype(np.float64)
+        score = clamp_score(4.0 - cross)
+        urgency = np.where(allergic, CRITICAL, np.where(score <= 2, HIGH, LOW))
+        return np.where(allergic, 1, score), urgency
+
+    def _ibs(self, p: np.ndarray, f: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        profiles = self.profiles
+        base = (
+            self.ibs_base[f]
+            + np.where(profiles.ibs_d[p], self.ibs_d_adjustment[f], 0.0)
+            + np.where(profiles.ibs_c[p], self.ibs_c_adjustment[f], 0.0)
+            + self.tolerance_adjustment[p, f]
+        )
+        score = clamp_score(base)
+        return score, np.broadcast_to(self.ibs_urgency[f], score.shape)
+
+    def _evaluate(self, p: np.ndarray, f: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Score the (profile, food) pairs p and f broadcast to"""
+        shape = np.broadcast(p, f).shape
+        scorers = {IBD: self._ibd, CHEMO: self._chemo, ALLERGY: self._allergy, IBS: self._ibs}
+        results = {name: scorer(p, f) for name, scorer in scorers.items()}
+
+        # A critical result always has score 1, so the multi-condition combination
+        # (critical first, else lowest score) reduces to min score / max urgency
+        score = np.full(shape, 4, dtype=np.int8)
+        urgency = np.full(shape, LOW, dtype=np.int8)
+        for route, (route_score, route_urgency) in results.items():
+            uses = np.array([route in conditions for conditions in self.profiles.conditions], dtype=bool)[p]
+            score = np.where(uses, np.minimum(score, route_score), score)
+            urgency = np.where(uses, np.maximum(urgency, route_urgency), urgency)
+
+        # Profiles without a recognised condition get the food's own ibd_score
+        default = np.array([not conditions for conditions in self.profiles.conditions], dtype=bool)[p]
+        score = np.where(default, self.foods.ibd_score[f], score)
+        urgency = np.where(default, LOW, urgency)
+
+        # Single-condition profiles always run the allergy check and take a score of 1 over their own
+        allergy_score, allergy_urgency = results[ALLERGY]
+        override = (~self.profiles.multi[p] & self.profiles.allergy_override[p]) & (allergy_score == 1)
+        score = np.where(override, allergy_score, score)
+        urgency = np.where(override, allergy_urgency, urgency)
+        return score.astype(np.int8), urgency.astype(np.int8)
+
+    def matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(profiles, foods) score and urgency matrices"""
+        p = np.arange(self.profiles.size)[:, None]
+        f = np.arange(self.foods.size)[None, :]
+        return self._evaluate(p, f)
+
+    def score_pairs(self, profile_rows: Sequence[int], food_rows: Sequence[int], chunk_size: int = 262144) -> Tuple[np.ndarray, np.ndarray]:
+        """Score aligned (profile row, food row) pairs, e.g. one per food_entries row"""
+        p_all = np.asarray(profile_rows, dtype=np.intp)
+        f_all = np.asarray(food_rows, dtype=np.intp)
+        scores = np.empty(len(p_all), dtype=np.int8)
+        urgency = np.empty(len(p_all), dtype=np.int8)
+        for start in range(0, len(p_all), chunk_size):
+            end = start + chunk_size
+            scores[start:end], urgency[start:end] = self._evaluate(p_all[start:end], f_all[start:end])
+        return scores, urgency
+
+def load_profiles(path: str) -> List[Dict[str, Any]]:
+    """medical-profiles.json is keyed by user id; a plain list or NDJSON is accepted too"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(".ndjson"):
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+    if isinstance(data, dict):
+        return [dict(profile, userId=profile.get("userId") or user_id) for user_id, profile in data.items()]
+    return data
+
+def load_foods(path: str) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data["foods"] if isinstance(data, dict) else data
+
+def rescore_history(entries: Sequence[Dict[str, Any]], profiles: Sequence[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """Rescore diary entries against their embedded foodData
+
+    Returns one {id, medical_score, level, emoji, urgency} row per entry whose
+    user has a profile, plus the number of entries skipped for lack of one.
+    """
+    profile_rows = {profile.get("userId"): row for row, profile in enumerate(profiles)}
+    foods: List[Dict[str, Any]] = []
+    food_rows: Dict[Any, int] = {}
+    pairs: List[Tuple[int, int]] = []
+    scored_entries = []
+    for entry in entries:
+        profile_row = profile_rows.get(entry.get("userId"))
+        food = entry.get("foodData")
+        if profile_row is None or not food:
+            continue
+        key = food.get("id") or json.dumps(food, sort_keys=True, ensure_ascii=False)
+        if key not in food_rows:
+            food_rows[key] = len(foods)
+            foods.append(food)
+        pairs.append((profile_row, food_rows[key]))
+        scored_entries.append(entry)
+
+    skipped = len(entries) - len(scored_entries)
+    if not pairs:
+        return [], skipped
+    scorer = BatchScorer(foods, profiles)
+    scores, urgency = scorer.score_pairs([p for p, _ in pairs], [f for _, f in pairs])
+    rows = []
+    for entry, score, level in zip(scored_entries, scores.tolist(), urgency.tolist()):
+        rows.append({
+            "id": entry.get("id"),
+            "medical_score": score if score != UNSCORED else None,
+            "level": SCORE_LEVELS.get(score),
+            "emoji": SCORE_EMOJIS.get(score),
+            "urgency": URGENCY_LEVELS[level],
+        })
+    return rows, skipped
+
+def verify_parity(path: str) -> List[str]:
+    """Compare against recorded TypeScript engine outputs; returns mismatch descriptions"""
+    with open(path, 'r', encoding='utf-8') as f:
+        fixture = json.load(f)
+    scorer = BatchScorer(fixture["foods"], fixture["profiles"])
+    scores, urgency = scorer.matrix()
+    mismatches = []
+    for row, profile in enumerate(fixture["profiles"]):
+        for column, food in enumerate(fixture["foods"]):
+            expected = fixture["expected"][row][column]
+            expected_score = expected["score"] if expected["score"] is not None else UNSCORED
+            actual = (int(scores[row, column]), URGENCY_LEVELS[urgency[row, column]])
+            if actual != (expected_score, expected["urgency"]):
+                mismatches.append(
+                    f"{profile.get('userId')} x {food.get('name_zh')}: "
+                    f"expected {expected_score}/{expected['urgency']}, got {actual[0]}/{actual[1]}"
+                )
+    return mismatches
+
+def main(argv: Optional[List[str]] = None) -> int:
+    root = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(description="Batch-score foods against medical profiles")
+    parser.add_argument("--foods", default=str(root / "data" / "taiwan-hk-foods.json"), help="food database JSON")
+    parser.add_argument("--profiles", default=str(root / "data" / "medical-profiles.json"), help="medical profiles JSON")
+    parser.add_argument("--history", help="rescore a user food history file instead of the food database")
+    parser.add_argument("--output", help="write rescored history entries as NDJSON")
+    parser.add_argument("--verify-parity", metavar="FIXTURE", nargs="?",
+                        const=str(root / "src" / "lib" / "medical" / "__tests__" / "fixtures" / "scoring-parity.json"),
+                        help="check results against recorded TypeScript engine outputs")
+    args = parser.parse_args(argv)
+
+    if args.verify_parity:
+        mismatches = verify_parity(args.verify_parity)
+        for mismatch in mismatches:
+            print(f"❌ {mismatch}")
+        if mismatches:
+            print(f"❌ {len(mismatches)} results differ from the TypeScript engine")
+            return 1
+        print("✅ Batch scorer matches the TypeScript engine on every fixture pair")
+        return 0
+
+    profiles = load_profiles(args.profiles)
+    if args.history:
+        with open(args.history, 'r', encoding='utf-8') as f:
+            entries = json.load(f)["entries"]
+        rows, skipped = rescore_history(entries, profiles)
+        previous = {entry.get("id"): (entry.get("medicalScore") or {}).get("score") for entry in entries}
+        changed = sum(1 for row in rows if previous.get(row["id"]) != row["medical_score"])
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        print(f"📊 Rescored {len(rows)} entries ({changed} changed, {skipped} without a profile)")
+        return 0
+
+    foods = load_foods(args.foods)
+    scorer = BatchScorer(foods, profiles)
+    scores, urgency = scorer.matrix()
+    print(f"📊 Scored {scores.shape[0]} profiles x {scores.shape[1]} foods")
+    for row, profile_id in enumerate(scorer.profiles.ids):
+        counts = np.bincount(scores[row].astype(np.intp), minlength=5)
+        print(f"   {profile_id}: " + ", ".join(f"{score}分 {counts[score]}" for score in range(1, 5)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+/**
+ * Parity fixture for the Python batch scorer (scripts/medical_batch_scorer.py)
+ * The fixture records MedicalScoringEngine outputs for every profile x food
+ * pair; the Python side checks itself against it with --verify-parity.
+ */
+
+import fixture from './fixtures/scoring-parity.json';
+import { medicalScoringEngine } from '../scoring-engine';
+
+describe('Medical Scoring Engine - batch scorer parity', () => {
+  fixture.profiles.forEach((profile, row) => {
+    test(`recorded scores still match for ${profile.userId}`, () => {
+      const actual = fixture.foods.map(food => {
+        const { medicalScore } = medicalScoringEngine.scoreFood(food as any, profile as any);
+        return { score: medicalScore.score ?? null, urgency: medicalScore.urgency };
+      });
+
+      expect(actual).toEqual(fixture.expected[row]);
+    });
+  });
+});
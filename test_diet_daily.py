@@ -4,15 +4,26 @@ Comprehensive testing suite for Diet Daily application
 Tests food diary, dashboard, and cross-page synchronization
 """
 
+import argparse
 import asyncio
 import json
 import time
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import Optional
 from playwright.async_api import async_playwright, Page, Browser, BrowserContext
 
 class DietDailyTester:
-    def __init__(self):
+    SCREEN_SIZES = [
+        {'name': 'mobile', 'width': 375, 'height': 667},
+        {'name': 'tablet', 'width': 768, 'height': 1024},
+        {'name': 'desktop', 'width': 1920, 'height': 1080}
+    ]
+
+    def __init__(self, concurrency: int = 1):
+        """concurrency > 1 runs independent suites in parallel over that many isolated browser contexts"""
         self.base_url = "http://localhost:3001"
+        self.concurrency = max(1, concurrency)
         self.test_results = {
             "timestamp": datetime.now().isoformat(),
             "test_summary": {},
@@ -24,6 +35,8 @@ class DietDailyTester:
         }
         self.browser = None
         self.context = None
+        self.contexts = []
+        self.context_pool = None
 
     async def setup(self):
         """Initialize browser and context"""
@@ -32,16 +45,43 @@ class DietDailyTester:
             headless=False,
             args=['--disable-web-security', '--disable-features=VizDisplayCompositor']
         )
-        self.context = await self.browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        )
+        # Each context has its own storage, so parallel suites cannot see each other's food records
+        self.contexts = [
+            await self.browser.new_context(
+                viewport={'width': 1920, 'height': 1080},
+                user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+            )
+            for _ in range(self.concurrency)
+        ]
+        self.context = self.contexts[0]
+        self.context_pool = asyncio.Queue()
+        for context in self.contexts:
+            self.context_pool.put_nowait(context)
 
     async def teardown(self):
         """Close browser"""
         if self.browser:
             await self.browser.close()
 
+    @asynccontextmanager
+    async def borrow_context(self):
+        """Hold one context from the pool for the duration of a suite"""
+        context = await self.context_pool.get()
+        try:
+            yield context
+        finally:
+            self.context_pool.put_nowait(context)
+
+    async def run_pooled(self, name: str, suite, *args):
+        """Run a suite on a borrowed context and record its duration"""
+        async with self.borrow_context() as context:
+            started = time.perf_counter()
+            try:
+                return await suite(*args, context=context)
+            finally:
+                self.test_results["test_summary"].setdefault("suite_seconds", {})[name] = round(
+                    time.perf_counter() - started, 2)
+
     async def take_screenshot(self, page: Page, name: str, full_page=True):
         """Take screenshot and record in results"""
         filename = f"/tmp/diet_daily_{name}_{int(time.time())}.png"
@@ -90,10 +130,10 @@ class DietDailyTester:
             await page.close()
             return None
 
-    async def test_food_diary_page(self):
+    async def test_food_diary_page(self, context: Optional[BrowserContext] = None):
         """Test Food Diary page functionality"""
         print("\n🍽️ Testing Food Diary Page...")
-        page = await self.context.new_page()
+        page = await (context or self.context).new_page()
 
         try:
             # Navigate to food diary page
@@ -291,10 +331,10 @@ class DietDailyTester:
             records_tests["error"] = str(e)
             return records_tests
 
-    async def test_dashboard_page(self):
+    async def test_dashboard_page(self, context: Optional[BrowserContext] = None):
         """Test Dashboard page functionality"""
         print("\n📊 Testing Dashboard Page...")
-        page = await self.context.new_page()
+        page = await (context or self.context).new_page()
 
         try:
             # Navigate to dashboard
@@ -442,14 +482,15 @@ class DietDailyTester:
             actions_tests["error"] = str(e)
             return actions_tests
 
-    async def test_cross_page_synchronization(self):
+    async def test_cross_page_synchronization(self, context: Optional[BrowserContext] = None):
         """Test data synchronization between pages"""
         print("\n🔄 Testing Cross-Page Data Synchronization...")
 
         try:
             # Open both pages in separate tabs
-            food_diary_page = await self.context.new_page()
-            dashboard_page = await self.context.new_page()
+            # Both tabs share one context so they share the app's storage
+            food_diary_page = await (context or self.context).new_page()
+            dashboard_page = await (context or self.context).new_page()
 
             # Navigate to both pages
             await food_diary_page.goto(f"{self.base_url}/food-diary", wait_until='networkidle')
@@ -513,43 +554,52 @@ class DietDailyTester:
             return sync_tests
 
     async def test_responsive_design(self):
-        """Test responsive design on different screen sizes"""
-        print("\n📱 Testing Responsive Design...")
-        page = await self.context.new_page()
+        """Test responsive design on different screen sizes
 
-        screen_sizes = [
-            {'name': 'mobile', 'width': 375, 'height': 667},
-            {'name': 'tablet', 'width': 768, 'height': 1024},
-            {'name': 'desktop', 'width': 1920, 'height': 1080}
-        ]
-
-        ui_tests = {}
+        In concurrent mode each screen size is a shard on its own pooled context.
+        """
+        print("\n📱 Testing Responsive Design...")
 
         try:
-            for size in screen_sizes:
-                print(f"  📐 Testing {size['name']} view ({size['width']}x{size['height']})...")
-
-                await page.set_viewport_size({'width': size['width'], 'height': size['height']})
-
-                # Test both pages at this size
-                await page.goto(f"{self.base_url}/food-diary", wait_until='networkidle')
-                await self.take_screenshot(page, f"responsive_{size['name']}_food_diary")
-
-                await page.goto(f"{self.base_url}/dashboard", wait_until='networkidle')
-                await self.take_screenshot(page, f"responsive_{size['name']}_dashboard")
-
-                # Test navigation and interactions
-                nav_tests = await self.test_navigation_responsive(page, size['name'])
+            if self.concurrency > 1:
+                results = await asyncio.gather(*(
+                    self.run_pooled(f"responsive_{size['name']}", self.test_screen_size, size)
+                    for size in self.SCREEN_SIZES
+                ))
+            else:
+                results = [await self.test_screen_size(size) for size in self.SCREEN_SIZES]
+
+            # Shards only return their results; they are merged here once all have finished
+            ui_tests = {}
+            for size, nav_tests in zip(self.SCREEN_SIZES, results):
                 ui_tests[f"{size['name']}_navigation"] = nav_tests
-
             self.test_results["ui_ux_tests"]["responsive_tests"] = ui_tests
-            await page.close()
 
             print("✅ Responsive design tests completed")
 
         except Exception as e:
             self.test_results["ui_ux_tests"]["responsive_error"] = str(e)
             print(f"❌ Responsive design error: {e}")
+
+    async def test_screen_size(self, size: dict, context: Optional[BrowserContext] = None):
+        """Test both pages and navigation at one screen size"""
+        print(f"  📐 Testing {size['name']} view ({size['width']}x{size['height']})...")
+        page = await (context or self.context).new_page()
+
+        try:
+            await page.set_viewport_size({'width': size['width'], 'height': size['height']})
+
+            # Test both pages at this size
+            await page.goto(f"{self.base_url}/food-diary", wait_until='networkidle')
+            await self.take_screenshot(page, f"responsive_{size['name']}_food_diary")
+
+            await page.goto(f"{self.base_url}/dashboard", wait_until='networkidle')
+            await self.take_screenshot(page, f"responsive_{size['name']}_dashboard")
+
+            # Test navigation and interactions
+            return await self.test_navigation_responsive(page, size['name'])
+
+        finally:
             await page.close()
 
     async def test_navigation_responsive(self, page: Page, size_name: str):
@@ -589,10 +639,10 @@ class DietDailyTester:
             nav_tests["error"] = str(e)
             return nav_tests
 
-    async def test_error_handling_and_loading_states(self):
+    async def test_error_handling_and_loading_states(self, context: Optional[BrowserContext] = None):
         """Test error handling and loading states"""
         print("\n⚠️ Testing Error Handling and Loading States...")
-        page = await self.context.new_page()
+        page = await (context or self.context).new_page()
 
         error_tests = {}
 
@@ -624,11 +674,12 @@ class DietDailyTester:
             await page.close()
 
     async def run_all_tests(self):
-        """Run all tests in sequence"""
+        """Run all tests, in sequence or concurrently depending on self.concurrency"""
         print("🚀 Starting Comprehensive Diet Daily Testing...")
         print("=" * 60)
 
         await self.setup()
+        started = time.perf_counter()
 
         try:
             # Test 1: Application accessibility
@@ -638,20 +689,25 @@ class DietDailyTester:
                 return
             await main_page.close()
 
-            # Test 2: Food diary page
-            await self.test_food_diary_page()
+            if self.concurrency > 1:
+                await self.run_concurrent_tests()
+            else:
+                # Test 2: Food diary page
+                await self.test_food_diary_page()
 
-            # Test 3: Dashboard page
-            await self.test_dashboard_page()
+                # Test 3: Dashboard page
+                await self.test_dashboard_page()
 
-            # Test 4: Cross-page synchronization
-            await self.test_cross_page_synchronization()
+                # Test 4: Cross-page synchronization
+                await self.test_cross_page_synchronization()
 
-            # Test 5: Responsive design
-            await self.test_responsive_design()
+                # Test 5: Responsive design
+                await self.test_responsive_design()
 
-            # Test 6: Error handling
-            await self.test_error_handling_and_loading_states()
+                # Test 6: Error handling
+                await self.test_error_handling_and_loading_states()
+
+            self.test_results["test_summary"]["wall_time_seconds"] = round(time.perf_counter() - started, 2)
 
             # Generate final report
             await self.generate_test_report()
@@ -659,6 +715,23 @@ class DietDailyTester:
         finally:
             await self.teardown()
 
+    async def run_concurrent_tests(self):
+        """Run tests 2-6 at the same time over the context pool
+
+        Each suite writes only its own keys of self.test_results, and the
+        event loop runs one suite step at a time, so results merge without
+        locking. The responsive shards share a section, so they return their
+        results instead and test_responsive_design merges them.
+        """
+        print(f"\n⚡ Running suites concurrently on {self.concurrency} browser contexts...")
+        await asyncio.gather(
+            self.run_pooled("food_diary", self.test_food_diary_page),
+            self.run_pooled("dashboard", self.test_dashboard_page),
+            self.run_pooled("cross_page_sync", self.test_cross_page_synchronization),
+            self.test_responsive_design(),
+            self.run_pooled("error_handling", self.test_error_handling_and_loading_states),
+        )
+
     async def generate_test_report(self):
         """Generate comprehensive test report"""
         print("\n📋 Generating Test Report...")
@@ -737,6 +810,14 @@ class DietDailyTester:
             print(f"  • 404 handling: {'✅' if error_tests.get('404_handling') else '❌'}")
             print(f"  • Loading states: {'✅' if error_tests.get('loading_indicators_found', 0) > 0 else '❌'}")
 
+        # Timing
+        summary = self.test_results["test_summary"]
+        if "wall_time_seconds" in summary:
+            mode = f"concurrent, {self.concurrency} contexts" if self.concurrency > 1 else "sequential"
+            print(f"\n⏱️ Wall time: {summary['wall_time_seconds']}s ({mode})")
+            for name, seconds in sorted(summary.get("suite_seconds", {}).items(), key=lambda item: -item[1]):
+                print(f"  • {name}: {seconds}s")
+
         # Screenshots
         screenshot_count = len(self.test_results.get("screenshots", []))
         print(f"\n📸 Screenshots captured: {screenshot_count}")
@@ -747,5 +828,9 @@ class DietDailyTester:
 
 # Run the tests
 if __name__ == "__main__":
-    tester = DietDailyTester()
+    parser = argparse.ArgumentParser(description="Diet Daily browser test suite")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="browser contexts for running suites in parallel (default: 1, sequential)")
+    args = parser.parse_args()
+    tester = DietDailyTester(concurrency=args.concurrency)
     asyncio.run(tester.run_all_tests())
\ No newline at end of file